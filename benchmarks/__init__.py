@@ -0,0 +1,9 @@
+"""
+Benchmarks for pestools, in the airspeed velocity (asv) format
+
+    asv run                       # benchmark the current commit
+    asv continuous master HEAD    # compare a branch against master
+
+The cases are the bundled Columbia model (cc/) and synthetic cases scaled
+up from it, see common.py.
+"""
@@ -0,0 +1,59 @@
+"""
+Import-time benchmarks
+
+The timeraw_ functions follow the airspeed velocity (asv) convention: each
+returns code that asv runs in a fresh interpreter.  Run this file directly
+for a quick check without asv, e.g. in CI:
+
+    python benchmarks/bench_import.py
+"""
+import subprocess
+import sys
+import time
+
+
+def timeraw_import_pestools():
+    return "import pestools"
+
+
+def timeraw_import_pest():
+    return "from pestools import Pest"
+
+
+def timeraw_import_jco():
+    return "from pestools.mat_handler import jco"
+
+
+def timeraw_import_res():
+    return "from pestools import Res"
+
+
+def timeraw_import_plots():
+    return "import pestools.plots"
+
+
+def track_heavy_modules_on_import():
+    """Number of heavy optional dependencies imported by import pestools
+    (should stay 0)
+    """
+    code = ("import sys, pestools; print(sum(m in sys.modules for m in "
+            "('matplotlib', 'scipy', 'pyemu', 'fiona', 'shapely')))")
+    return int(subprocess.check_output([sys.executable, '-c', code]))
+
+
+def _time_raw(code, repeat=5):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', code])
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    baseline = _time_raw('pass')
+    for name, func in sorted(globals().items()):
+        if name.startswith('timeraw_'):
+            print('{:<30s} {:8.3f} s'.format(name, _time_raw(func()) - baseline))
+    print('{:<30s} {:8d}'.format('heavy modules on import',
+                                 track_heavy_modules_on_import()))
@@ -0,0 +1,116 @@
+"""
+Benchmarks for the jacobian: binary I/O, sensitivities and correlation
+"""
+import os
+import numpy as np
+import pandas as pd
+from pestools.mat_handler import jco as Jco, cov as Cov
+from pestools.parsen import ParSen
+from pestools.obsen import ObSen
+from pestools.Cor import Cor
+from .common import scratch, synthetic_jco, synthetic_sensitivity_inputs
+
+# observations x parameters; the first is the size of the Columbia jacobian
+SHAPES = ['10489x597', '50000x200', '200000x100']
+
+
+def _shape(shape):
+    return tuple(int(n) for n in shape.split('x'))
+
+
+class TimeJcoBinary(object):
+    params = SHAPES
+    param_names = ['shape']
+    timeout = 600
+
+    def setup_cache(self):
+        folder = scratch('jco_binary')
+        jco_files = {}
+        for shape in self.params:
+            jco_files[shape] = os.path.join(folder, shape + '.jco')
+            synthetic_jco(*_shape(shape)).to_binary(jco_files[shape])
+        return folder, jco_files
+
+    def setup(self, cache, shape):
+        folder, jco_files = cache
+        self.jco_file = jco_files[shape]
+        self.jco = Jco()
+        self.jco.from_binary(self.jco_file)
+        self.out_file = os.path.join(folder, 'out.jco')
+
+    def time_from_binary(self, cache, shape):
+        Jco().from_binary(self.jco_file)
+
+    def time_to_binary(self, cache, shape):
+        self.jco.to_binary(self.out_file)
+
+
+class TimeSensitivity(object):
+    params = SHAPES
+    param_names = ['shape']
+    timeout = 600
+
+    def setup(self, shape):
+        jco_df, res_df, parameter_data = synthetic_sensitivity_inputs(*_shape(shape))
+        self.parsen = ParSen(jco_df=jco_df, res_df=res_df, parameter_data=parameter_data)
+        self.obsen = ObSen(jco_df=jco_df, res_df=res_df, parameter_data=parameter_data)
+
+    def time_parsen_calc_sensitivity(self, shape):
+        self.parsen.calc_sensitivity()
+
+    def time_obsen_calc_sensitivity(self, shape):
+        self.obsen.calc_sensitivity()
+
+
+class TimeParSenInit(object):
+    params = SHAPES[:2]
+    param_names = ['shape']
+    timeout = 600
+
+    def setup(self, shape):
+        self.inputs = synthetic_sensitivity_inputs(*_shape(shape))
+
+    def time_parsen_init(self, shape):
+        jco_df, res_df, parameter_data = self.inputs
+        ParSen(jco_df=jco_df, res_df=res_df, parameter_data=parameter_data,
+               drop_regul=True)
+
+
+class TimeParSenLarge(object):
+    # composite sensitivities of a large jacobian, dense and as pandas
+    # sparse columns
+    params = (['50000x1000'], [False, True])
+    param_names = ['shape', 'sparse']
+    timeout = 600
+
+    def setup(self, shape, sparse):
+        jco_df, res_df, parameter_data = synthetic_sensitivity_inputs(*_shape(shape))
+        if sparse:
+            jco_df = jco_df.astype(pd.SparseDtype('float64', 0.))
+        self.inputs = jco_df, res_df, parameter_data
+        self.parsen = ParSen(jco_df=jco_df, res_df=res_df, parameter_data=parameter_data)
+
+    def time_parsen_init(self, shape, sparse):
+        jco_df, res_df, parameter_data = self.inputs
+        ParSen(jco_df=jco_df, res_df=res_df, parameter_data=parameter_data,
+               drop_regul=True)
+
+    def time_calc_sensitivity(self, shape, sparse):
+        self.parsen.calc_sensitivity()
+
+    def time_keep_groups(self, shape, sparse):
+        self.parsen.keep_groups(['obgp0', 'obgp1'])
+
+
+class TimeCor(object):
+    params = [597, 2000]
+    param_names = ['n_par']
+
+    def setup(self, n_par):
+        rng = np.random.RandomState(0)
+        a = rng.standard_normal((n_par, n_par))
+        self.cov = Cov(x=np.dot(a, a.T) + n_par * np.eye(n_par),
+                       names=['par{}'.format(i) for i in range(n_par)])
+
+    def time_cor(self, n_par):
+        Cor(self.cov)
@@ -0,0 +1,85 @@
+"""
+Benchmarks for reading control and residual files
+"""
+import os
+from pestools.pest import Pest
+from pestools.pst_handler import pst as Pst, read_resfile
+from pestools.res import Res
+from pestools.synthetic import SyntheticCase
+from .common import scratch, columbia_case, scaled_res, synthetic_case
+
+
+class TimePstLoad(object):
+
+    def setup_cache(self):
+        return columbia_case(scratch('pst_load'))
+
+    def time_pst_load(self, basename):
+        Pst(basename + '.pst')
+
+
+class TimePstLoadSynthetic(object):
+    params = [10**4, 10**5, 10**6]
+    param_names = ['n_obs']
+    timeout = 600
+
+    def setup_cache(self):
+        folder = scratch('pst_load_synthetic')
+        return dict((n_obs, synthetic_case(os.path.join(folder, str(n_obs)), n_obs, 200,
+                                           n_iterations=1))
+                    for n_obs in self.params)
+
+    def time_pst_load(self, cases, n_obs):
+        Pst(cases[n_obs] + '.pst')
+
+
+class TimeResiduals(object):
+    # 0 is the Columbia residuals file as is (10489 observations)
+    params = [0, 10**5, 10**6]
+    param_names = ['n_obs']
+    timeout = 600
+
+    def setup_cache(self):
+        folder = scratch('residuals')
+        basename = columbia_case(folder)
+        res_files = {0: basename + '.res'}
+        for n_obs in self.params[1:]:
+            res_files[n_obs] = scaled_res(basename + '.res', n_obs,
+                                          os.path.join(folder, 'scaled_{}.res'.format(n_obs)))
+        return basename, res_files
+
+    def setup(self, cache, n_obs):
+        basename, res_files = cache
+        self.res_file = res_files[n_obs]
+        self.pest = Pest(basename)
+        self.pest.obs_groups
+
+    def time_load_resfile(self, cache, n_obs):
+        read_resfile(self.res_file)
+
+    def time_res_init(self, cache, n_obs):
+        Res(self.res_file, pest=self.pest)
+
+    def peakmem_res_init(self, cache, n_obs):
+        Res(self.res_file, pest=self.pest)
+
+
+class TimeReadResfile(object):
+    params = ([10**5, 10**6], [True, False])
+    param_names = ['n_obs', 'categorical']
+    timeout = 600
+
+    def setup_cache(self):
+        folder = scratch('read_resfile')
+        res_files = {}
+        for n_obs in self.params[0]:
+            case = SyntheticCase(os.path.join(folder, 'case_{}'.format(n_obs)), n_par=10,
+                                 n_obs=n_obs, n_obs_groups=2000)
+            res_files[n_obs] = case.write_res()
+        return res_files
+
+    def time_read_resfile(self, res_files, n_obs, categorical):
+        read_resfile(res_files[n_obs], categorical=categorical)
+
+    def peakmem_read_resfile(self, res_files, n_obs, categorical):
+        read_resfile(res_files[n_obs], categorical=categorical)
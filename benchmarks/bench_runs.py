@@ -0,0 +1,29 @@
+"""
+Benchmarks for the run record, run management record and interim
+residuals of the Columbia SVDA case
+"""
+import contextlib
+import io
+from pestools.rec import Rec
+from pestools.rmr import Rmr
+from pestools.rei import Rei
+from .common import scratch, columbia_case
+
+
+class TimeRunFiles(object):
+    timeout = 300
+
+    def setup_cache(self):
+        folder = scratch('run_files')
+        columbia_case(folder)
+        return folder + '/columbia_svda'
+
+    def time_rmr(self, basename):
+        Rmr(basename)
+
+    def time_rec(self, basename):
+        Rec(basename)
+
+    def time_rei_get_phi(self, basename):
+        with contextlib.redirect_stdout(io.StringIO()):
+            Rei(basename).get_phi()
@@ -0,0 +1,95 @@
+"""
+Test cases shared by the benchmarks
+
+The Columbia case in cc/ is copied to a scratch folder with consistent
+file names (the control file is Columbia.pst but the outputs are
+columbia.*), and larger synthetic cases are made by scaling it up or
+written with pestools.synthetic.
+"""
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+CC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cc')
+SEED = 0
+
+
+def scratch(name):
+    """Empty scratch folder for a benchmark case
+    """
+    folder = os.path.join(tempfile.gettempdir(), 'pestools_benchmarks', name)
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+    os.makedirs(folder)
+    return folder
+
+
+def columbia_case(folder):
+    """Copy the Columbia case (basename 'columbia') and the Columbia SVDA
+    case (basename 'columbia_svda') to folder.  Returns the basename of the
+    Columbia case
+    """
+    shutil.copy(os.path.join(CC, 'Columbia.pst'), os.path.join(folder, 'columbia.pst'))
+    shutil.copy(os.path.join(CC, 'Columbia_SVDA.pst'), os.path.join(folder, 'columbia_svda.pst'))
+    for f in os.listdir(CC):
+        if f.startswith('columbia.') or f.startswith('columbia_svda.'):
+            shutil.copy(os.path.join(CC, f), os.path.join(folder, f))
+    return os.path.join(folder, 'columbia')
+
+
+def scaled_res(res_file, n_obs, out_file):
+    """Write a residuals file with n_obs observations by repeating the rows
+    of res_file with numbered observation names
+    """
+    with open(res_file) as f:
+        header = f.readline()
+        rows = [line.split(None, 1) for line in f if len(line.strip()) > 0]
+    with open(out_file, 'w') as f:
+        f.write(header)
+        for i in range(n_obs):
+            name, rest = rows[i % len(rows)]
+            f.write(' {:<20s} {}'.format('{}_{}'.format(name, i // len(rows)), rest))
+    return out_file
+
+
+def synthetic_jco(n_obs, n_par, density=0.05, obs_names=None, par_names=None):
+    """Random sparse jacobian as a mat_handler.jco
+    """
+    from pestools.mat_handler import jco as Jco
+    rng = np.random.RandomState(SEED)
+    x = rng.standard_normal((n_obs, n_par))
+    x[rng.random_sample((n_obs, n_par)) > density] = 0.
+    if obs_names is None:
+        obs_names = ['ob{}'.format(i) for i in range(n_obs)]
+    if par_names is None:
+        par_names = ['par{}'.format(j) for j in range(n_par)]
+    return Jco(x=x, row_names=list(obs_names), col_names=list(par_names))
+
+
+def synthetic_sensitivity_inputs(n_obs, n_par, n_groups=10, density=0.05):
+    """jco_df, res_df and parameter_data for ParSen and ObSen
+    """
+    rng = np.random.RandomState(SEED)
+    jco = synthetic_jco(n_obs, n_par, density=density)
+    groups = np.array(['obgp{}'.format(i) for i in range(n_groups - 1)] + ['regul_gp'])
+    res_df = pd.DataFrame({'name': jco.row_names,
+                           'group': groups[rng.randint(0, n_groups, n_obs)],
+                           'residual': rng.standard_normal(n_obs),
+                           'weight': rng.random_sample(n_obs)})
+    parameter_data = pd.DataFrame({'parnme': jco.col_names,
+                                   'pargp': ['pargp{}'.format(j % 7) for j in range(n_par)]})
+    return jco.to_dataframe(), res_df, parameter_data
+
+
+def synthetic_case(folder, n_obs, n_par, **kwargs):
+    """Write a complete synthetic case (basename 'case') to folder with
+    pestools.synthetic.SyntheticCase.  Returns the basename
+    """
+    from pestools.synthetic import SyntheticCase
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    basename = os.path.join(folder, 'case')
+    SyntheticCase(basename, n_par=n_par, n_obs=n_obs, seed=SEED, **kwargs).write()
+    return basename
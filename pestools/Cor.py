@@ -7,7 +7,6 @@ Created on Sat Jan 17 22:54:50 2015
 import numpy as np
 import pandas as pd
 import os
-from . import plots
 from .mat_handler import matrix as Matrix
 from .pst_handler import pst as Pst
 
@@ -88,6 +87,7 @@ class Cor(object):
         Matplotlib plot
             Heatmap (pcolormesh) of correlation coefficient matrix
         '''
+        from . import plots
         if par_list is None:
             df = self.df
         else:
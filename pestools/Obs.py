@@ -1,12 +1,10 @@
 __author__ = 'aleaf'
 
-import sys
-sys.path.append('../pst_tools')
-from pst import *
-from res import *
+import numpy as np
 import pandas as pd
+from .pest import Pest
+from .res import Res
 
-import numpy as np
 
 class Obs(Pest):
     """
@@ -16,46 +14,257 @@ class Obs(Pest):
     * replacing observation data in pest control file with a new observation dataset from an external file
     * interactively adjust weighting and visualize changes to the objective function
 
+    Parameters
+    ----------
+    basename : str
+        basename for pest run (including path)
+
+    res_file : str, optional
+        residuals file; default is the .res file for basename (or .rei if
+        there isn't one)
 
     Attributes
     ----------
+    res : Res
+        residuals from the PEST run
 
-    """
+    groups : list
+        observation groups that aren't regularisation
 
-    def __init__(self, basename):
+    weights : Series
+        current weight of each observation in the residuals file
 
-        Pest.__init__(self, basename)
+    phi : float
+        objective function with the current weights
+
+    phi_by_group : Series
+        objective function contribution of each group with the current weights
+
+    Notes
+    ------
+    The residuals are fixed, so phi only changes with the weights.  Sums of the
+    squared residuals, squared weights and squared weighted residuals are kept for
+    each group, and updated by each change to the weights.  Setting or scaling the
+    weight of a whole group updates its phi from these sums; scaling or setting the
+    weights of individual observations only visits the observations changed.
+
+    """
 
-        self._read_obs_data()
+    def __init__(self, basename, res_file=None, **kwargs):
+
+        Pest.__init__(self, basename, **kwargs)
 
         self._new_obs_data = pd.DataFrame()
 
         # get residuals information from PEST run
-        self.res = Res(basename + '.res')
+        if res_file is None:
+            res_file = self._res_file
+        self.res = Res(res_file, pest=self)
+
+        df = self.res._df
+        self._names = pd.Index(df['Name'].values)
+        codes, uniques = pd.factorize(df['Group'])
+        self._codes = codes
+        self._group_names = pd.Index(np.asarray(uniques, dtype=str), name='Group')
+        self._residual = df['Residual'].values.astype(np.float64)
+        self._initial_weights = df['Weight'].values.astype(np.float64)
 
-        # copy observation data for weight adjustment
-        self.df = self.res.df.copy()
+        # positions of the observations in each group
+        order = np.argsort(codes, kind='mergesort')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self._group_positions = [order[bounds[i]:bounds[i + 1]] for i in range(len(uniques))]
+        self._sum_sq_residuals = np.bincount(codes, self._residual**2, minlength=len(uniques))
 
         # get list of groups that aren't regularisation
-        self.groups = np.unique(self.obsdata.OBGNME)
+        self.groups = [g for g in self._group_names if not g.startswith('regul')]
 
+        self.reset()
 
-    def plot_objective_contrib(self):
-        self.res.plot_objective_contrib(self.df)
+    def reset(self):
+        ''' Restore the weights in the residuals file and recompute the group sums
+        '''
+        self._weight = self._initial_weights.copy()
+        n = len(self._group_names)
+        self._sum_sq_weights = np.bincount(self._codes, self._weight**2, minlength=n)
+        self._group_phi = np.bincount(self._codes, (self._weight * self._residual)**2,
+                                      minlength=n)
 
-        return
+    def _positions(self, obs):
+        """positions of observations given by name(s), boolean mask or positions
+        """
+        if isinstance(obs, str):
+            obs = [obs]
+        obs = np.asarray(obs)
+        if obs.dtype == bool:
+            return np.flatnonzero(obs)
+        if obs.dtype.kind in 'iu':
+            return obs
+        positions = self._names.get_indexer([o.lower() for o in obs])
+        if (positions < 0).any():
+            raise KeyError('observations not in the residuals file: {}'
+                           .format(list(obs[positions < 0])))
+        return positions
 
+    def _group_code(self, group):
+        code = self._group_names.get_indexer([group.lower()])[0]
+        if code < 0:
+            raise KeyError('observation group {} not in the residuals file'.format(group))
+        return code
 
-    def objective_contrib(self):
-        self.res.objective_contrib(self.df)
+    def set_weights(self, obs, weights):
+        ''' Set the weights of observations
 
-        return
+        Parameters
+        ----------
+        obs : str, list, or array
+            observation name(s), positions, or a boolean mask over the observations
 
-    def mikes_weighting_routine(self):
-        # Not implemented yet
-        return
+        weights : float or array
+            new weight(s). If an observation is given more than once, its
+            last weight is used.
+        '''
+        positions = self._positions(obs)
+        new = np.broadcast_to(np.asarray(weights, dtype=np.float64), positions.shape)
+        # keep the last weight given for each observation, so that each
+        # change is counted once in the group sums
+        unique, last = np.unique(positions[::-1], return_index=True)
+        positions, new = unique, new[::-1][last]
+        old = self._weight[positions]
+        codes = self._codes[positions]
+        n = len(self._group_names)
+        self._sum_sq_weights += np.bincount(codes, new**2 - old**2, minlength=n)
+        self._group_phi += np.bincount(codes, (new**2 - old**2) * self._residual[positions]**2,
+                                       minlength=n)
+        self._weight[positions] = new
+
+    def scale_weights(self, obs, multiplier):
+        ''' Multiply the weights of observations
+
+        Parameters
+        ----------
+        obs : str, list, or array
+            observation name(s), positions, or a boolean mask over the observations
+
+        multiplier : float or array
+            weight multiplier(s)
+        '''
+        positions = self._positions(obs)
+        self.set_weights(positions, self._weight[positions] * multiplier)
 
+    def set_group_weight(self, group, weight):
+        ''' Set the weight of every observation in a group
+        '''
+        code = self._group_code(group)
+        positions = self._group_positions[code]
+        self._weight[positions] = weight
+        self._sum_sq_weights[code] = len(positions) * weight**2
+        self._group_phi[code] = weight**2 * self._sum_sq_residuals[code]
+
+    def scale_group(self, group, multiplier):
+        ''' Multiply the weights of every observation in a group
+        '''
+        code = self._group_code(group)
+        self._weight[self._group_positions[code]] *= multiplier
+        self._sum_sq_weights[code] *= multiplier**2
+        self._group_phi[code] *= multiplier**2
+
+    def balance_groups(self, targets=None, groups=None):
+        ''' Scale the group weights so that each group contributes a target
+        fraction of the measurement objective function (phi of the groups
+        that aren't regularisation); the total is unchanged.
+
+        Parameters
+        ----------
+        targets : dict, optional
+            fraction of phi for each group. Fractions are normalized to sum
+            to 1. Default is an equal share for each group with non-zero phi.
+
+        groups : list, optional
+            groups to balance; default is Obs.groups (or the keys of targets)
+
+        Returns
+        -------
+        pandas Series
+            weight multiplier applied to each group
+        '''
+        if groups is None:
+            groups = list(targets.keys()) if targets is not None else self.groups
+        codes = np.array([self._group_code(g) for g in groups], dtype=int)
+        phi = self._group_phi[codes]
+        if targets is None:
+            fractions = (phi > 0).astype(float)
+        else:
+            fractions = np.array([targets[g] for g in groups], dtype=float)
+        fractions = fractions / fractions.sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            multipliers = np.where(phi > 0, np.sqrt(fractions * phi.sum() / phi), 1.)
+        for group, multiplier in zip(groups, multipliers):
+            self.scale_group(group, multiplier)
+        return pd.Series(multipliers, index=pd.Index(groups, name='Group'))
+
+    @property
+    def weights(self):
+        return pd.Series(self._weight.copy(), index=self._names, name='Weight')
+
+    @property
+    def phi(self):
+        return self._group_phi.sum()
+
+    @property
+    def phi_by_group(self):
+        return pd.Series(self._group_phi.copy(), index=self._group_names, name='Phi')
+
+    @property
+    def sum_sq_weights(self):
+        return pd.Series(self._sum_sq_weights.copy(), index=self._group_names,
+                         name='Sum_Sq_Weights')
+
+    @property
+    def df(self):
+        ''' Residuals DataFrame with the current weights
+        '''
+        df = self.res.df.copy()
+        df['Weight'] = self._weight
+        df['Weighted_Residual'] = df['Residual'] * df['Weight']
+        df['Weighted_Absolute_Residual'] = df['Absolute_Residual'] * df['Weight']
+        df['Weighted_Sq_Residual'] = df['Weighted_Residual']**2
+        return df
+
+    def export_weights(self, observation_data=None, inplace=True):
+        ''' Write the current weights to the observation data of the control file
+
+        Parameters
+        ----------
+        observation_data : DataFrame, optional
+            observation data to update; default is pst.observation_data of this
+            case. Observations not in the residuals file keep their weights.
+
+        inplace : bool, default True
+            update observation_data itself; otherwise a copy is updated and
+            observation_data is unchanged
+
+        Returns
+        -------
+        pandas DataFrame
+            the updated observation data
+        '''
+        if observation_data is None:
+            observation_data = self.pst.observation_data
+        if not inplace:
+            observation_data = observation_data.copy()
+        positions = self._names.get_indexer(observation_data['obsnme'].str.lower())
+        found = positions >= 0
+        weight = observation_data['weight'].values.astype(np.float64)
+        weight[found] = self._weight[positions[found]]
+        observation_data['weight'] = weight
+        return observation_data
+
+    def plot_objective_contrib(self, drop_regul=False):
+        return self.res.plot_objective_contrib(self.df, drop_regul=drop_regul)
+
+    def objective_contrib(self, return_data=False):
+        return self.res.objective_contrib(self.df, return_data=return_data)
 
     def widget_method_for_group_weighting(self):
         # ?? Not implemented yet
-        return
\ No newline at end of file
+        return
@@ -43,14 +43,42 @@ Mapping Class
 .. automodule:: maps
 
 """
-from .pest import Pest
-from .parsen import ParSen
+import importlib
+
+# Cor is imported here because the class has the same name as its module;
+# importing the module (e.g. from pest.py) would otherwise replace a lazily
+# loaded class attribute with the module.  It only needs numpy and pandas.
 from .Cor import Cor
-from .res import Res
-from .rei import Rei
-from .identpar import IdentPar
-from .plots import *
-from .maps import *
-from .mat_handler import *
-from .pst_handler import pst
 
+# public names and the submodules they are loaded from on first access, so
+# that importing pestools doesn't import matplotlib, scipy, pyemu or the GIS
+# packages
+_lazy = {'Pest': 'pest', 'ParSen': 'parsen', 'Res': 'res', 'Rei': 'rei',
+         'IdentPar': 'identpar', 'pst': 'pst_handler'}
+_lazy.update((name, 'plots') for name in
+             ['Plot', 'Hist', 'ScatterPlot', 'SpatialPlot', 'One2onePlot',
+              'HexbinPlot', 'BarPloth', 'HeatMap', 'IdentBar', 'Normalized_cmap'])
+_lazy.update((name, 'maps') for name in
+             ['point_shapefile', 'read_shapefile', 'Shapefile', 'PyShpfile'])
+_lazy.update((name, 'mat_handler') for name in
+             ['concat', 'get_common_elements', 'matrix', 'jco', 'cov', 'test'])
+
+_submodules = ['pest', 'parsen', 'obsen', 'res', 'rei', 'rec', 'rmr', 'par',
+               'follow', 'synthetic', 'store', 'metrics', 'identpar', 'plots', 'maps', 'mat_handler',
+               'pst_handler', 'Obs']
+
+__all__ = ['Cor'] + sorted(_lazy)
+
+
+def __getattr__(name):
+    if name in _lazy:
+        value = getattr(importlib.import_module('.' + _lazy[name], __name__), name)
+        globals()[name] = value
+        return value
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy) | set(_submodules))
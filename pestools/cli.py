@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Command line interface for batch analysis of PEST runs
+
+Examples
+--------
+    pestools phi cc/columbia --out phi.csv
+    pestools parsen cc/columbia --drop-regul --out parsen.parquet
+    pestools obsen cc/columbia --out obsen.csv
+    pestools cor cc/columbia --pars kz1 kz2 --out cor.csv --plot cor.png
+    pestools jco cc/columbia.jco --out columbia.jco.parquet
+    pestools rmr cc/columbia_svda --out nodes.csv
+
+Tables are written as CSV or Parquet depending on the extension of --out,
+or printed as CSV when --out isn't given.  matplotlib is only imported when
+a --plot file is requested.
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+
+def _write(df, out=None, index=True):
+    """Write a DataFrame to csv or parquet according to the extension of out,
+    or to stdout as csv
+    """
+    if out is None:
+        df.to_csv(sys.stdout, index=index)
+    elif out.lower().endswith('.parquet'):
+        df.to_parquet(out, index=index)
+    else:
+        df.to_csv(out, index=index)
+
+
+def _read_table(filename):
+    if filename.lower().endswith('.parquet'):
+        return pd.read_parquet(filename)
+    return pd.read_csv(filename, index_col=0)
+
+
+def _pyplot():
+    """matplotlib.pyplot with a non-interactive backend, for saving plots
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _pest(args):
+    from .pest import Pest
+    return Pest(args.case)
+
+
+def phi(args):
+    """phi by observation group from the residuals file
+    """
+    from .pst_handler import read_resfile
+    if args.res is not None:
+        res_df = read_resfile(args.res)
+    else:
+        res_df = _pest(args).res_df
+    wss = (res_df['residual'].values * res_df['weight'].values)**2
+    df = pd.Series(wss, index=res_df['group'].values)\
+        .groupby(level=0, observed=True).agg(['count', 'sum'])
+    df.columns = ['n_obs', 'phi']
+    df['percent'] = df['phi'] / df['phi'].sum() * 100.
+    df.index.name = 'group'
+    return df.sort_values('phi', ascending=False)
+
+
+def parsen(args):
+    """composite parameter sensitivities
+    """
+    pest = _pest(args)
+    sen = pest.ParSen(drop_regul=args.drop_regul, drop_groups=args.drop_groups,
+                      keep_groups=args.keep_groups)
+    if args.plot is not None:
+        plt = _pyplot()
+        sen.plot(n=args.n)
+        plt.savefig(args.plot)
+    df = sen.df.sort_values('Sensitivity', ascending=False)
+    if args.n is not None:
+        df = df.head(args.n)
+    df.index.name = 'Parameter'
+    return df
+
+
+def obsen(args):
+    """observation sensitivities
+    """
+    pest = _pest(args)
+    sen = pest.ObSen()
+    df = sen.df.sort_values('Sensitivity', ascending=False)
+    if args.n is not None:
+        df = df.head(args.n)
+    df.index.name = 'Observation'
+    return df
+
+
+def cor(args):
+    """parameter correlation coefficient matrix, or the most correlated
+    parameter pairs with --pairs
+    """
+    cor = _pest(args).cor
+    df = cor.df
+    if args.pars is not None:
+        df = cor.pars([p.lower() for p in args.pars])
+    if args.plot is not None:
+        plt = _pyplot()
+        cor.plot_heatmap(par_list=None if args.pars is None else list(df.index))
+        plt.savefig(args.plot)
+    if args.pairs is not None:
+        i, j = np.triu_indices(len(df), k=1)
+        values = df.values[i, j]
+        pairs = pd.DataFrame({'par1': df.index[i], 'par2': df.columns[j],
+                              'correlation': values})
+        order = np.argsort(-np.abs(values), kind='mergesort')
+        df = pairs.iloc[order[:args.pairs]].reset_index(drop=True)
+    return df
+
+
+def jco(args):
+    """convert a jacobian between binary (.jco), ascii matrix (.mat), csv and
+    parquet.  The output is not rewritten if it is newer than the input,
+    so it can serve as a cache of a slow-to-read binary file
+    """
+    from .mat_handler import jco as Jco
+    if args.out is not None and not args.force and os.path.exists(args.out) \
+            and os.path.getmtime(args.out) >= os.path.getmtime(args.case):
+        return None
+
+    ext = os.path.splitext(args.case)[1].lower()
+    j = Jco()
+    if ext in ('.jco', '.jcb'):
+        j.from_binary(args.case)
+    else:
+        df = _read_table(args.case)
+        j = Jco(x=df.values, row_names=[str(n) for n in df.index],
+                col_names=[str(n) for n in df.columns])
+
+    out_ext = '' if args.out is None else os.path.splitext(args.out)[1].lower()
+    if out_ext in ('.jco', '.jcb'):
+        j.to_binary(args.out)
+    elif out_ext == '.mat':
+        j.to_ascii(args.out)
+    else:
+        return j.to_dataframe()
+    return None
+
+
+def rmr(args):
+    """run times by node from the run management record, or every run with
+    --runs
+    """
+    from .rmr import Rmr
+    r = Rmr(args.case)
+    if args.runs:
+        return r.runs
+    df = r.runs.groupby('Node')['Runtime'].agg(['count', 'mean', 'min', 'max', 'std'])
+    df.columns = ['Runs', 'Average Runtime', 'Min Runtime', 'Max Runtime', 'Std Runtime']
+    return df
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='pestools',
+                                     description='Batch analysis of PEST runs')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    def add(name, func, help):
+        sub = subparsers.add_parser(name, help=help, description=func.__doc__)
+        sub.add_argument('case', help='PEST case (basename or control file, including path)')
+        sub.add_argument('--out', help='output file (.csv or .parquet); default prints csv')
+        sub.set_defaults(func=func)
+        return sub
+
+    sub = add('phi', phi, 'phi by observation group')
+    sub.add_argument('--res', help='residuals (.res or .rei) file; default is case.res')
+
+    sub = add('parsen', parsen, 'parameter sensitivities')
+    sub.add_argument('--drop-regul', action='store_true',
+                     help='exclude regularisation observations')
+    sub.add_argument('--drop-groups', nargs='+', help='observation groups to exclude')
+    sub.add_argument('--keep-groups', nargs='+', help='only use these observation groups')
+    sub.add_argument('-n', type=int, help='number of most sensitive parameters to report')
+    sub.add_argument('--plot', help='save a bar plot to this file')
+
+    sub = add('obsen', obsen, 'observation sensitivities')
+    sub.add_argument('-n', type=int, help='number of most sensitive observations to report')
+
+    sub = add('cor', cor, 'parameter correlation coefficients')
+    sub.add_argument('--pars', nargs='+', help='only these parameters')
+    sub.add_argument('--pairs', type=int,
+                     help='report the N most correlated parameter pairs instead of the matrix')
+    sub.add_argument('--plot', help='save a heatmap to this file')
+
+    sub = add('jco', jco, 'convert or cache a jacobian')
+    sub.add_argument('--force', action='store_true',
+                     help='rewrite the output even if it is newer than the input')
+
+    sub = add('rmr', rmr, 'run management statistics by node')
+    sub.add_argument('--runs', action='store_true', help='report every run')
+    return parser
+
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    df = args.func(args)
+    if df is not None:
+        _write(df, args.out, index=not (args.command == 'rmr' and args.runs)
+               and not (args.command == 'cor' and args.pairs is not None))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
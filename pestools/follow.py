@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Follow the output files of a running PEST case
+"""
+import glob
+import os
+import time
+import pandas as pd
+from .rec import Rec
+from .rmr import Rmr
+from .pst_handler import read_resfile
+
+
+class Follow(object):
+    def __init__(self, basename):
+        ''' Follow the .rec, .rmr and .rei.N files of a running PEST case
+
+        Parameters
+        ----------
+        basename : str
+            Basename for the PEST control file, if full path not provided the
+            current working directory is assumed
+
+        Attributes
+        ----------
+        rec : Rec
+            Record file reader, None until the .rec file exists
+
+        rmr : Rmr
+            Run management record reader, None until the .rmr file exists
+
+        rei : dict
+            Interim residual DataFrames read so far, keyed by iteration number
+
+        Notes
+        ------
+        Each poll() only reads what was appended to the .rec and .rmr files
+        since the previous poll.  An interim residuals file (.rei.N) is read
+        once, when its size is unchanged between two polls or the file for
+        the next iteration has appeared.
+
+        '''
+        self.basename = os.path.split(basename)[-1].split('.')[0]
+        self.directory = os.path.split(basename)[0]
+        if len(self.directory) == 0:
+            self.directory = os.getcwd()
+        self._base = os.path.join(self.directory, self.basename)
+
+        self.rec = None
+        self.rmr = None
+        self.rei = {}
+        self._rei_sizes = {}
+
+    def poll(self):
+        ''' Read any new output of the running case
+
+        Returns
+        -------
+        dict
+            'iterations' : DataFrame of the new (or still incomplete)
+                iterations in the .rec file, joined with their phi components
+            'runs' : DataFrame of model runs completed since the last poll
+            'rei' : dict of new interim residual DataFrames keyed by
+                iteration number
+        '''
+        return {'iterations': self._poll_rec(),
+                'runs': self._poll_rmr(),
+                'rei': self._poll_rei()}
+
+    def follow(self, interval=5., max_polls=None):
+        ''' Poll the case every interval seconds, yielding the results of
+        each poll that found new output
+
+        Parameters
+        ----------
+        interval : float, default 5.
+            Seconds between polls
+
+        max_polls : int, optional
+            Stop after this many polls.  By default polling continues until
+            the generator is closed.
+        '''
+        n = 0
+        while max_polls is None or n < max_polls:
+            events = self.poll()
+            if len(events['iterations']) > 0 or len(events['runs']) > 0 \
+                    or len(events['rei']) > 0:
+                yield events
+            n += 1
+            if max_polls is not None and n >= max_polls:
+                break
+            time.sleep(interval)
+
+    def _poll_rec(self):
+        rec_file = self._base + '.rec'
+        if self.rec is None:
+            if not os.path.exists(rec_file):
+                return pd.DataFrame()
+            self.rec = Rec(rec_file=rec_file)
+            parsed = self.rec.iterations.index.tolist()
+        else:
+            parsed = self.rec.update()
+        if len(parsed) == 0:
+            return pd.DataFrame()
+        return self.rec.iterations.loc[parsed].join(
+            self.rec.phi_components.loc[parsed])
+
+    def _poll_rmr(self):
+        if self.rmr is None:
+            if not os.path.exists(self._base + '.rmr'):
+                return pd.DataFrame()
+            self.rmr = Rmr(self._base)
+            return self.rmr.runs
+        return self.rmr.update()
+
+    def _poll_rei(self):
+        new = {}
+        files = dict((int(f.split('.')[-1]), f)
+                     for f in glob.glob(self._base + '.rei.*')
+                     if f.split('.')[-1].isdigit())
+        for i in sorted(files.keys()):
+            if i in self.rei:
+                continue
+            size = os.path.getsize(files[i])
+            if size > 0 and (size == self._rei_sizes.get(i) or i + 1 in files):
+                self.rei[i] = read_resfile(files[i])
+                new[i] = self.rei[i]
+            else:
+                self._rei_sizes[i] = size
+        return new
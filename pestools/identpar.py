@@ -9,12 +9,15 @@ from . import plots
 
 class IdentPar:
 
-    def __init__(self, jco, par_info_file=None):
+    def __init__(self, jco, par_info_file=None, pest=None):
         """Computes parameter identifiability for a PEST jco file,
-        using the ErrVar class in pyemu (https://github.com/jtwhite79/pyemu)
+        using the ErrVar class in pyemu (https://github.com/jtwhite79/pyemu).
+        An existing Pest context can be shared with pest.
         """
 
-        self._Pest = Pest(jco, par_info_file=par_info_file)
+        self._Pest = pest
+        if self._Pest is None:
+            self._Pest = Pest(jco, par_info_file=par_info_file)
         self.parinfo = self._Pest.parinfo
 
         self.la = ErrVar(jco)
@@ -2,7 +2,7 @@ import copy
 import struct
 import numpy as np
 import pandas
-import scipy.linalg as la
+
 #import .pst_handler as phand
 
 def concat(mats):
@@ -428,6 +428,7 @@ class matrix(object):
         Raises:
             Exception is SVD process fails
         """
+        import scipy.linalg as la
         if self.isdiagonal:
             x = np.diag(self.x.flatten())
         else:
@@ -571,6 +572,7 @@ class matrix(object):
         Raises:
             None
         """
+        import scipy.linalg as la
         if self.isdiagonal:
             return type(self)(x=1.0 / self.__x, isdiagonal=True,
                               row_names=self.row_names,
@@ -591,6 +593,7 @@ class matrix(object):
         Raises:
             None
         """
+        import scipy.linalg as la
         if self.isdiagonal:
             return type(self)(x=np.sqrt(self.__x), isdiagonal=True,
                               row_names=self.row_names,
@@ -852,25 +855,17 @@ class matrix(object):
         icount = row_idxs + 1 + col_idxs * self.shape[0]
         #--flatten the array
         flat = self.x[row_idxs, col_idxs].flatten()
-        #--zip up the index position and value pairs
-        data = np.array(zip(icount, flat), dtype=self.binary_rec_dt)
+        #--pair up the index position and value
+        data = np.zeros(len(flat), dtype=self.binary_rec_dt)
+        data['j'] = icount
+        data['dtemp'] = flat
         #--write
         data.tofile(f)
 
         for name in self.col_names:
-            if len(name) > self.par_length:
-                name = name[:self.par_length - 1]
-            elif len(name) < self.par_length:
-                for i in range(len(name), self.par_length):
-                    name = name + ' '
-            f.write(name)
+            f.write(name[:self.par_length].ljust(self.par_length).encode())
         for name in self.row_names:
-            if len(name) > self.obs_length:
-                name = name[:self.obs_length - 1]
-            elif len(name) < self.obs_length:
-                for i in range(len(name), self.obs_length):
-                    name = name + ' '
-            f.write(name)
+            f.write(name[:self.obs_length].ljust(self.obs_length).encode())
         f.close()
 
 
@@ -895,18 +890,18 @@ class matrix(object):
         #--read all data records
         #--using this a memory hog, but really fast
         data = np.fromfile(f, self.binary_rec_dt, icount)
-        icols = ((data['j'] - 1) / nrow) + 1
+        icols = ((data['j'] - 1) // nrow) + 1
         irows = data['j'] - ((icols - 1) * nrow)
         self.__x[irows - 1, icols - 1] = data["dtemp"]
         #--read obs and parameter names
-        for j in xrange(self.shape[1]):
+        for j in range(self.shape[1]):
             name = struct.unpack(str(self.par_length) + "s",
                                  f.read(self.par_length))[0].strip().lower()
-            self.col_names.append(name)
-        for i in xrange(self.shape[0]):
+            self.col_names.append(name.decode())
+        for i in range(self.shape[0]):
             name = struct.unpack(str(self.obs_length) + "s",
                                  f.read(self.obs_length))[0].strip().lower()
-            self.row_names.append(name)
+            self.row_names.append(name.decode())
         f.close()
         assert len(self.row_names) == self.shape[0],\
           "matrix.from_binary() len(row_names) (" + str(len(self.row_names)) +\
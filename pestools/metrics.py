@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Goodness-of-fit metrics for residuals, computed for all groups at once
+
+group_metrics() takes a residuals DataFrame (columns as in Res.df:
+Measured, Modelled, Residual and Weight) and a grouping key, and returns one
+row of metrics per group.  Every metric is computed with grouped sums
+(numpy bincount) over integer group codes, so the cost doesn't depend on
+the number of groups.
+
+Weighted metrics weight each observation by its PEST weight squared (the
+inverse of the measurement variance), consistent with phi.
+"""
+import numpy as np
+import pandas as pd
+
+
+def pct_diff(measured, modelled, residual=None):
+    """Relative percent difference of residual compared to measured.
+
+    pct_diff = 100 * Residual / Measured
+
+    Residuals for values Measured at zero are given arbitrary differences
+    of -100 (Modelled non-zero) and those Modelled at zero 100; both at
+    zero give 0. Convention follows PEST: Measured - Modelled (negative
+    residuals indicate higher modelled values).
+    """
+    measured = np.asarray(measured, dtype=np.float64)
+    modelled = np.asarray(modelled, dtype=np.float64)
+    if residual is None:
+        residual = measured - modelled
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = 100. * np.asarray(residual, dtype=np.float64) / measured
+    pct[measured == 0] = -100.
+    pct[modelled == 0] = 100.
+    pct[(measured == 0) & (modelled == 0)] = 0.
+    return pct
+
+
+def _summary(name, values, codes, n_groups, counts, ddof, stats):
+    """mean, standard deviation, min, max and range of values by group
+    """
+    sums = np.bincount(codes, values, minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sums / counts
+        deviation = values - mean[codes]
+        var = np.bincount(codes, deviation**2, minlength=n_groups) / (counts - ddof)
+    extremes = pd.Series(values).groupby(codes).agg(['min', 'max'])\
+        .reindex(np.arange(n_groups))
+    stats[name + '_Mean'] = mean
+    stats[name + '_Std'] = np.sqrt(var)
+    stats[name + '_Min'] = extremes['min'].values
+    stats[name + '_Max'] = extremes['max'].values
+    stats[name + '_Range'] = stats[name + '_Max'] - stats[name + '_Min']
+    return mean, deviation
+
+
+def group_metrics(df, by='Group', ddof=1, quantiles=(0.25, 0.5, 0.75),
+                  normality=False):
+    """Goodness-of-fit metrics of the residuals for each group
+
+    Args:
+        df (DataFrame) : residuals, with a Residual column and (optionally)
+            Measured, Modelled and Weight columns
+        by (str or array) : column of df, or array of keys, to group by
+        ddof (int) : delta degrees of freedom of the standard deviations
+        quantiles (sequence) : residual quantiles to include
+        normality (bool) : include the Shapiro-Wilk test p-value of the
+            residuals (needs scipy)
+    Returns:
+        pandas.DataFrame with one row per group (index) and columns:
+            n,
+            Residual_, Absolute_Residual_ and Weighted_Residual_ Mean, Std,
+            Min, Max and Range, Residual quantiles (e.g. Residual_25%),
+            Measured_ and Modelled_ Mean, Std, Min, Max and Range,
+            Pct_Diff_Mean and Abs_Pct_Diff_Mean,
+            Bias (mean residual), MAE, RMSE, RMSE/Measured_Range,
+            NSE (Nash-Sutcliffe efficiency), KGE (Kling-Gupta efficiency),
+            R2 (squared correlation of measured and modelled),
+            Weighted_Bias, Weighted_MAE, Weighted_RMSE, Weighted_NSE,
+            Phi (sum of squared weighted residuals),
+            Normality_p (if normality)
+        Metrics whose columns aren't in df are left out.
+    Note:
+        Rows with a nan residual are ignored.
+    """
+    keys = df[by].values if isinstance(by, str) else np.asarray(by)
+    residual = df['Residual'].values.astype(np.float64)
+    valid = ~np.isnan(residual)
+    codes, uniques = pd.factorize(keys[valid], sort=True)
+    valid_codes = codes >= 0
+    codes = codes[valid_codes]
+    rows = np.flatnonzero(valid)[valid_codes]
+    residual = residual[rows]
+    n_groups = len(uniques)
+    counts = np.bincount(codes, minlength=n_groups).astype(np.float64)
+
+    def group_sum(values):
+        return np.bincount(codes, values, minlength=n_groups)
+
+    stats = {'n': counts.astype(int)}
+    _summary('Residual', residual, codes, n_groups, counts, ddof, stats)
+    if len(quantiles) > 0:
+        q = pd.Series(residual).groupby(codes).quantile(list(quantiles)).unstack()\
+            .reindex(np.arange(n_groups))
+        for quantile in quantiles:
+            stats['Residual_{:g}%'.format(quantile * 100)] = q[quantile].values
+    _summary('Absolute_Residual', np.abs(residual), codes, n_groups, counts, ddof, stats)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats['Bias'] = group_sum(residual) / counts
+        stats['MAE'] = group_sum(np.abs(residual)) / counts
+        stats['RMSE'] = np.sqrt(group_sum(residual**2) / counts)
+
+        if 'Measured' in df.columns and 'Modelled' in df.columns:
+            measured = df['Measured'].values[rows].astype(np.float64)
+            modelled = df['Modelled'].values[rows].astype(np.float64)
+            mean_m, dm = _summary('Measured', measured, codes, n_groups, counts, ddof, stats)
+            mean_s, ds = _summary('Modelled', modelled, codes, n_groups, counts, ddof, stats)
+            pct = pct_diff(measured, modelled, residual)
+            stats['Pct_Diff_Mean'] = group_sum(pct) / counts
+            stats['Abs_Pct_Diff_Mean'] = group_sum(np.abs(pct)) / counts
+            stats['RMSE/Measured_Range'] = stats['RMSE'] / stats['Measured_Range']
+
+            ss_m = group_sum(dm**2)
+            ss_s = group_sum(ds**2)
+            r = group_sum(dm * ds) / np.sqrt(ss_m * ss_s)
+            stats['NSE'] = 1. - group_sum(residual**2) / ss_m
+            stats['KGE'] = 1. - np.sqrt((r - 1.)**2 + (np.sqrt(ss_s / ss_m) - 1.)**2 +
+                                        (mean_s / mean_m - 1.)**2)
+            stats['R2'] = r**2
+
+        if 'Weight' in df.columns:
+            weight = df['Weight'].values[rows].astype(np.float64)
+            _summary('Weighted_Residual', weight * residual, codes, n_groups, counts, ddof,
+                     stats)
+            omega = weight**2
+            sum_omega = group_sum(omega)
+            stats['Weighted_Bias'] = group_sum(omega * residual) / sum_omega
+            stats['Weighted_MAE'] = group_sum(omega * np.abs(residual)) / sum_omega
+            phi = group_sum(omega * residual**2)
+            stats['Weighted_RMSE'] = np.sqrt(phi / sum_omega)
+            if 'Measured' in df.columns and 'Modelled' in df.columns:
+                mean_w = group_sum(omega * measured) / sum_omega
+                stats['Weighted_NSE'] = 1. - phi / group_sum(omega * (measured - mean_w[codes])**2)
+            stats['Phi'] = phi
+
+    if normality:
+        from scipy.stats import shapiro
+        order = np.argsort(codes, kind='mergesort')
+        starts = np.searchsorted(codes[order], np.arange(n_groups))
+        stops = np.append(starts[1:], len(order))
+        sorted_residual = residual[order]
+        stats['Normality_p'] = np.array([shapiro(sorted_residual[i:j])[1] if j - i > 2 else np.nan
+                                         for i, j in zip(starts, stops)])
+
+    index = pd.Index(np.asarray(uniques), name=by if isinstance(by, str) else None)
+    return pd.DataFrame(stats, index=index)
@@ -8,9 +8,8 @@ Created on Fri Sep 04 12:45:11 2015
 import numpy as np
 import pandas as pd
 import os
-import plots
-from mat_handler import jco as Jco
-from pst_handler import pst as Pst
+from .mat_handler import jco as Jco
+from .pst_handler import pst as Pst
 
 
 
@@ -89,11 +88,10 @@ class ObSen(object):
         if res_df is None:
             res_file = os.path.join(self.directory, self.basename + '.res')
             pst = Pst(filename=None, load=False, resfile=res_file)
-            self.res_df = pst.load_resfile(res_file)
-        else:
-            self.res_df = res_df
-        # Set index of res_df
-        self.res_df.set_index('name', drop=False, inplace = True)
+            res_df = pst.load_resfile(res_file)
+        # Set index of res_df, on a new frame so that a res_df passed in
+        # (e.g. the one cached by Pest) isn't changed
+        self.res_df = res_df.set_index('name', drop=False)
 
         # Build _obs_data
         weights = []
@@ -118,14 +116,14 @@ class ObSen(object):
         sensitivities = []
         n_pars = self.jco_df.shape[1]
         for row in self.jco_df.iterrows():
-            weight = self._obs_data.ix[row[0]]['ObSen_Weight']
+            weight = self._obs_data.loc[row[0], 'ObSen_Weight']
             sen = (weight*(np.linalg.norm(row[1].values)))/n_pars
             sensitivities.append(sen)
 
         # Build Group Array
         ob_groups = []
         for ob in self.jco_df.index:
-            ob_group = self._obs_data.ix[ob]['OBGNME']
+            ob_group = self._obs_data.loc[ob, 'OBGNME']
             ob_groups.append(ob_group)
             
         # Build pandas data frame of parameter sensitivities
@@ -148,7 +146,7 @@ class ObSen(object):
             Series of n_tail least sensitive observations
 
         '''
-        return self.df.sort(columns='Sensitivity', ascending=False)\
+        return self.df.sort_values(by='Sensitivity', ascending=False)\
             .tail(n=n_tail)['Sensitivity']
 
     def head(self, n_head):
@@ -163,7 +161,7 @@ class ObSen(object):
         pandas Series
             Series of n_head most sensitive obsservations
         '''
-        return self.df.sort(columns='Sensitivity', ascending=False)\
+        return self.df.sort_values(by='Sensitivity', ascending=False)\
             .head(n=n_head)['Sensitivity']
 
     def ob(self, observation):
@@ -206,12 +204,12 @@ class ObSen(object):
             n_head = n
 
         if n_head > 0:
-            sensitivity = self.df.sort(columns='Sensitivity',
-                                       ascending = False).ix[self.df['Observation Group'] == group].head(n=n_head)
+            sensitivity = self.df.sort_values(by='Sensitivity',
+                                       ascending = False).loc[self.df['Observation Group'] == group].head(n=n_head)
         if n_head < 0:
             n_head = abs(n_head)
-            sensitivity = self.df.sort(columns='Sensitivity',
-                                       ascending = False).ix[self.df['Observation Group'] == group].tail(n=n_head)
+            sensitivity = self.df.sort_values(by='Sensitivity',
+                                       ascending = False).loc[self.df['Observation Group'] == group].tail(n=n_head)
 
         sensitivity.index.name = 'Observation'
         return sensitivity
@@ -223,8 +221,8 @@ class ObSen(object):
         -------
         Pandas DataFrame
         '''
-        sen_grouped = self.df.groupby(['Observation Group'])\
-            .aggregate(np.sum).sort(columns='Sensitivity', ascending=False)
+        sen_grouped = self.df.groupby(['Observation Group'], observed=True)\
+            .aggregate('sum').sort_values(by='Sensitivity', ascending=False)
         return sen_grouped
 
     def plot(self, n=None, group=None, color_dict=None, alt_labels=None, **kwds):
@@ -253,6 +251,7 @@ class ObSen(object):
         Matplotlib plot
             Bar plot  of sensitivity of observations
         '''
+        from . import plots
         if n is None:
             n_head = len(self.df.index)
         else:
@@ -261,22 +260,22 @@ class ObSen(object):
         if group is None:
 
             if n_head > 0:
-                sensitivity = self.df.sort(columns='Sensitivity',
+                sensitivity = self.df.sort_values(by='Sensitivity',
                                            ascending=False).head(n=n_head)
             if n_head < 0:
                 n_head = abs(n_head)
-                sensitivity = self.df.sort(columns='Sensitivity',
+                sensitivity = self.df.sort_values(by='Sensitivity',
                                            ascending=False).tail(n=n_head)
 
         if group is not None:
             group = group.lower()
             if n_head > 0:
-                sensitivity = self.df.sort(columns='Sensitivity',
-                                           ascending=False).ix[self.df['Observation Group'] == group].head(n=n_head)         
+                sensitivity = self.df.sort_values(by='Sensitivity',
+                                           ascending=False).loc[self.df['Observation Group'] == group].head(n=n_head)         
             if n_head < 0:
                 n_head = abs(n_head)
-                sensitivity = self.df.sort(columns='Sensitivity',
-                                           ascending=False).ix[self.df['Observation Group'] == group].tail(n=n_head)
+                sensitivity = self.df.sort_values(by='Sensitivity',
+                                           ascending=False).loc[self.df['Observation Group'] == group].tail(n=n_head)
 
         if 'ylabel' not in kwds:
             kwds['ylabel'] = 'Observation'
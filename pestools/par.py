@@ -5,10 +5,13 @@ Created on Wed Sep 09 13:16:06 2015
 @author: egc
 """
 
+import glob
 import numpy as np
 import pandas as pd
 import os
-from pest import Pest
+from concurrent.futures import ThreadPoolExecutor
+from .pest import Pest, _pest_context
+from .pst_handler import read_par_file
 
 
 class Par(object):
@@ -17,7 +20,7 @@ class Par(object):
     def __init__(self, basename=None, par_set=None,  obs_info_file=None, name_col='Name',
                  x_col='X', y_col='Y', type_col='Type',
                  basename_col='basename', datetime_col='datetime', group_cols=[],
-                 obs_info_kwds={}, 
+                 obs_info_kwds={}, pest=None,
                 **kwds):
 
         ''' Create Par class that works with data from a .par file
@@ -32,6 +35,9 @@ class Par(object):
             .par file number if multiple .par files writen with PEST.  If not
             provided then uses basename.par for the par file.  If provided uses
             basename.par.par_set as the par file
+
+        pest : Pest, optional
+            existing Pest context to share instead of creating a new one
             
         Attributes
         ----------
@@ -55,31 +61,301 @@ class Par(object):
             self.par_file = os.path.join(self.directory, self.basename + '.par')
          
         self.df = self.load_par_file()
+        self._bounds = None
         
         # Expose the Pest class for convience but not all attributes make sense
         # when dealing with the Par class alone so make private        
-        self._Pest = Pest(basename, obs_info_file=obs_info_file, name_col=name_col,
-                                           x_col=x_col, y_col=y_col, type_col=type_col,
-                                           basename_col=basename_col, datetime_col=datetime_col,
-                                           group_cols=group_cols, obs_info_kwds=obs_info_kwds)
+        self._Pest = _pest_context(pest, basename, obs_info_file=obs_info_file, name_col=name_col,
+                                   x_col=x_col, y_col=y_col, type_col=type_col,
+                                   basename_col=basename_col, datetime_col=datetime_col,
+                                   group_cols=group_cols, obs_info_kwds=obs_info_kwds)
         
     def load_par_file(self):        
-        f = open(self.par_file, 'r')
-        header = f.readline()
-        df = pd.read_csv(f, header = None, names = ['parnme', 'parval', 'scale', 'offset'],
-                         sep="\s+")
-        df.index = df.parnme
-        return df
+        return read_par_file(self.par_file)
     def parval(self, parnme):
-        parval = self.df.ix[parnme]['parval']
+        parval = self.df.loc[parnme.lower(), 'parval']
         return parval
     @property    
     def at_bounds(self):
-        bound_df = pd.merge(self.df, self._Pest.parameter_data, on = 'parnme')[['parnme','parval','parlbnd', 'parubnd']]
-        bound_df['at_upper'] = (bound_df['parubnd']-bound_df['parval']) == 0.0
-        bound_df['at_lower'] = (bound_df['parval']-bound_df['parlbnd']) == 0.0
-        bound_df = bound_df[(bound_df['at_lower'] == True) | (bound_df['at_upper'] == True)].sort('at_upper', ascending = False)
+        return self.get_at_bounds()
+
+    def get_at_bounds(self, rtol=1.0e-5, atol=0.0):
+        ''' Parameters at their lower or upper bounds
+
+        Parameters
+        ----------
+        rtol, atol : float
+            relative and absolute tolerances, see at_bounds()
+
+        Returns
+        -------
+        DataFrame
+            parnme, parval, parlbnd, parubnd, at_upper and at_lower of the
+            parameters at a bound, upper bound hits first
+        '''
+        if self._bounds is None:
+            # bounds are cached so the control file is only parsed once
+            self._bounds = bound_arrays(self._Pest.parameter_data, self.df.parnme.values)
+        lower, upper, log = self._bounds
+        hits = at_bounds(self.df.parval.values, lower, upper, rtol=rtol,
+                         atol=atol, log=log)
+        bound_df = pd.DataFrame({'parnme': self.df.parnme.values,
+                                 'parval': self.df.parval.values,
+                                 'parlbnd': lower, 'parubnd': upper,
+                                 'at_upper': hits == 1, 'at_lower': hits == -1},
+                                index=self.df.index)
+        bound_df = bound_df[hits != 0].sort_values('at_upper', ascending=False,
+                                                   kind='mergesort')
         return bound_df
-        
-            
-            
\ No newline at end of file
+
+
+def bound_arrays(parameter_data, parnme):
+    ''' Lower and upper bounds and log-transform flags aligned to a list
+    of parameter names
+
+    Parameters
+    ----------
+    parameter_data : DataFrame
+        parameter data section of the control file
+
+    parnme : array-like
+        parameter names (lower case)
+
+    Returns
+    -------
+    tuple of ndarray
+        lower bounds, upper bounds and log-transform flags; bounds are nan
+        for parameters not in parameter_data
+    '''
+    idx = pd.Index(parameter_data.parnme.str.lower().values).get_indexer(parnme)
+    found = idx >= 0
+    lower = np.full(len(idx), np.nan)
+    upper = np.full(len(idx), np.nan)
+    log = np.zeros(len(idx), dtype=bool)
+    lower[found] = parameter_data.parlbnd.values.astype(float)[idx[found]]
+    upper[found] = parameter_data.parubnd.values.astype(float)[idx[found]]
+    log[found] = (parameter_data.partrans.str.lower().values == 'log')[idx[found]]
+    return lower, upper, log
+
+
+def at_bounds(values, lower, upper, rtol=1.0e-5, atol=0.0, log=None):
+    ''' Find parameter values at their bounds
+
+    A value is at a bound when abs(value - bound) <= atol + rtol * abs(bound).
+    For log-transformed parameters the comparison is made on the log10 of the
+    value and bound, as PEST does when estimating them: atol is in log10
+    units and rtol is still a relative difference of the value.  Values past
+    a bound count as at the bound.
+
+    Parameters
+    ----------
+    values : ndarray
+        parameter values, 1-D (parameters) or 2-D (sets x parameters)
+
+    lower, upper : ndarray
+        lower and upper bounds, 1-D (parameters)
+
+    rtol, atol : float
+        relative and absolute tolerances
+
+    log : ndarray of bool, optional
+        log-transform flags, 1-D (parameters)
+
+    Returns
+    -------
+    ndarray of int
+        same shape as values; -1 at the lower bound, 1 at the upper bound
+        and 0 otherwise
+    '''
+    values = np.asarray(values, dtype=float)
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    tol_lower = atol + rtol * np.abs(lower)
+    tol_upper = atol + rtol * np.abs(upper)
+    if log is not None and np.any(log):
+        log = np.asarray(log, dtype=bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(log, np.log10(values), values)
+            lower = np.where(log, np.log10(lower), lower)
+            upper = np.where(log, np.log10(upper), upper)
+        # rtol is a relative difference in the value itself
+        tol_lower = np.where(log, atol + np.log10(1. + rtol), tol_lower)
+        tol_upper = np.where(log, atol + np.log10(1. + rtol), tol_upper)
+    hits = np.zeros(values.shape, dtype=int)
+    with np.errstate(invalid='ignore'):
+        hits[values <= lower + tol_lower] = -1
+        hits[values >= upper - tol_upper] = 1
+    return hits
+
+
+def find_par_files(basename, ext='par'):
+    ''' Find the numbered parameter files written by PEST for a case
+
+    Parameters
+    ----------
+    basename : str
+        basename for PEST control file, including path
+
+    ext : str, default 'par'
+        'par' for the .par.N files written each iteration or 'bpa' for the
+        .bpa.N best parameter files
+
+    Returns
+    -------
+    list
+        Parameter files sorted by their number
+    '''
+    basename = os.path.splitext(basename)[0]
+    files = [f for f in glob.glob(basename + '.' + ext + '.*')
+             if f.split('.')[-1].isdigit()]
+    return sorted(files, key=lambda f: int(f.split('.')[-1]))
+
+
+class ParSets(object):
+    def __init__(self, par_files, parameter_data=None, max_workers=None):
+        ''' Load many parameter files into one array aligned to the
+        parameter data of the control file
+
+        Parameters
+        ----------
+        par_files : list
+            Parameter (.par, .par.N or .bpa.N) files, see find_par_files()
+
+        parameter_data : DataFrame, optional
+            parameter data section of the control file (Pest.parameter_data).
+            Defines the parameter order and bounds.  If not provided the
+            parameters of the first file are used and bounds are not
+            available.
+
+        max_workers : int, optional
+            Number of threads used to read the files
+
+        Attributes
+        ----------
+        values : ndarray
+            (sets x parameters) parameter values, nan where a parameter is
+            not in a file
+
+        df : DataFrame
+            values with the set (file suffix number, or file name) as the
+            index and parameter names as the columns
+        '''
+        self.par_files = list(par_files)
+        self.parameter_data = parameter_data
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            dfs = list(pool.map(read_par_file, self.par_files))
+
+        if parameter_data is not None:
+            self.parnme = pd.Index(parameter_data.parnme.str.lower().values)
+        else:
+            self.parnme = pd.Index(dfs[0].parnme.values)
+
+        if parameter_data is not None:
+            self.lower, self.upper, self.log = bound_arrays(parameter_data,
+                                                            self.parnme)
+
+        self.values = np.full((len(dfs), len(self.parnme)), np.nan)
+        for i, df in enumerate(dfs):
+            idx = self.parnme.get_indexer(df.parnme.values)
+            found = idx >= 0
+            self.values[i, idx[found]] = df.parval.values[found]
+
+        sets = [f.split('.')[-1] for f in self.par_files]
+        if all(n.isdigit() for n in sets):
+            sets = [int(n) for n in sets]
+        else:
+            sets = [os.path.split(f)[-1] for f in self.par_files]
+        self.sets = pd.Index(sets, name='set')
+
+    @property
+    def df(self):
+        return pd.DataFrame(self.values, index=self.sets,
+                            columns=pd.Index(self.parnme, name='parnme'))
+
+    def trajectory(self, parnme):
+        ''' Values of one or more parameters across the parameter sets
+
+        Parameters
+        ----------
+        parnme : str or list
+            parameter name(s)
+
+        Returns
+        -------
+        DataFrame
+            sets x parameters
+        '''
+        if isinstance(parnme, str):
+            parnme = [parnme]
+        idx = self.parnme.get_indexer([p.lower() for p in parnme])
+        if np.any(idx < 0):
+            raise KeyError('Parameters not found: {}'.format(
+                ', '.join(np.array(parnme)[idx < 0])))
+        return pd.DataFrame(self.values[:, idx], index=self.sets,
+                            columns=self.parnme[idx])
+
+    def differences(self, reference=None, relative=False):
+        ''' Differences between parameter sets
+
+        Parameters
+        ----------
+        reference : int, optional
+            Position of the set to difference all sets against.  By default
+            each set is differenced against the previous set (the first row
+            is nan).
+
+        relative : bool, default False
+            Divide the differences by the absolute value of the reference
+
+        Returns
+        -------
+        DataFrame
+            sets x parameters
+        '''
+        if reference is None:
+            ref = np.vstack([np.full((1, self.values.shape[1]), np.nan),
+                             self.values[:-1]])
+        else:
+            ref = self.values[reference][np.newaxis, :]
+        diff = self.values - ref
+        if relative:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                diff = diff / np.abs(ref)
+        return pd.DataFrame(diff, index=self.sets, columns=self.parnme)
+
+    @property
+    def at_bounds(self):
+        return self.get_at_bounds()
+
+    def get_at_bounds(self, rtol=1.0e-5, atol=0.0):
+        ''' Parameters at their bounds in each set
+
+        Parameters
+        ----------
+        rtol, atol : float
+            relative and absolute tolerances, see par.at_bounds()
+
+        Returns
+        -------
+        DataFrame
+            sets x parameters; -1 at the lower bound, 1 at the upper bound
+            and 0 otherwise
+        '''
+        if self.parameter_data is None:
+            raise ValueError('parameter_data is needed for parameter bounds')
+        hits = at_bounds(self.values, self.lower, self.upper, rtol=rtol,
+                         atol=atol, log=self.log)
+        return pd.DataFrame(hits, index=self.sets, columns=self.parnme)
+
+    @property
+    def n_at_bounds(self):
+        return self.get_n_at_bounds()
+
+    def get_n_at_bounds(self, rtol=1.0e-5, atol=0.0):
+        ''' Number of parameters at their lower and upper bounds in each set
+        '''
+        hits = self.get_at_bounds(rtol=rtol, atol=atol).values
+        return pd.DataFrame({'at_lower': (hits == -1).sum(axis=1),
+                             'at_upper': (hits == 1).sum(axis=1)},
+                            index=self.sets)
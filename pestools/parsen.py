@@ -7,7 +7,6 @@
 import numpy as np
 import pandas as pd
 import os
-from . import plots
 from .mat_handler import jco as Jco
 from .pst_handler import pst as Pst
 
@@ -116,14 +115,12 @@ class ParSen(object):
         if res_df is None:
             res_file = os.path.join(self.directory, self.basename + '.res')
             pst = Pst(filename=None, load=False, resfile=res_file)
-            self.res_df = pst.load_resfile(res_file)
-        else:
-            self.res_df = res_df
-        # Set index of res_df
-
-        if 'Name' in self.res_df.columns:
-            self.res_df.columns = [i.lower() for i in self.res_df.columns]
-        self.res_df.set_index('name', drop=False, inplace = True)
+            res_df = pst.load_resfile(res_file)
+        # Set index of res_df, on a new frame so that a res_df passed in
+        # (e.g. the one cached by Pest) isn't changed
+        if 'Name' in res_df.columns:
+            res_df = res_df.rename(columns=str.lower)
+        self.res_df = res_df.set_index('name', drop=False)
 
         
         if parameter_data is None:
@@ -136,22 +133,20 @@ class ParSen(object):
        
         # Build pars_dict
         # key is PARNME value is PARGP
-        self._pars_dict = {}
-        for index, row in self.parameter_data.iterrows():
-            self._pars_dict[row['parnme'].lower()] = row['pargp'].lower()
-
-        # Build _obs_data
-        weights = []
-        ob_groups = []
-        obs = []
-        for ob in self.jco_df.index:
-            weight = self.res_df.loc[ob.lower()]['weight']
-            ob_group = self.res_df.loc[ob.lower()]['group']
-            weights.append(weight)
-            ob_groups.append(ob_group)
-            obs.append(ob)
-        self._obs_data = pd.DataFrame({'OBSNME': obs, 'OBGNME': ob_groups, 'WEIGHT': weights, 'ParSen_Weight' : weights})
-        self._obs_data.set_index('OBSNME', inplace=True)
+        self._pars_dict = dict(zip(self.parameter_data['parnme'].str.lower(),
+                                   self.parameter_data['pargp'].str.lower()))
+
+        # Build _obs_data, aligning the residuals to the jacobian rows with
+        # a single reindex
+        obs_res = self.res_df.reindex([ob.lower() for ob in self.jco_df.index])
+        missing = obs_res['name'].isnull().values
+        if missing.any():
+            raise KeyError('observations in the jacobian not in the residuals: {}'
+                           .format(list(self.jco_df.index[missing][:10])))
+        weights = obs_res['weight'].values.astype(np.float64)
+        self._obs_data = pd.DataFrame({'OBGNME': obs_res['group'].astype(str).values,
+                                       'WEIGHT': weights, 'ParSen_Weight': weights.copy()},
+                                      index=pd.Index(self.jco_df.index, name='OBSNME'))
         
         if drop_regul is True:
             self.drop_regul(calc_sensitivity=False)
@@ -167,84 +162,94 @@ class ParSen(object):
         # Fill DataFrame
         self.df = self.calc_sensitivity()
 
-    def calc_sensitivity(self):
-        # Get count of non-zero weights
-        weights = self._obs_data['ParSen_Weight'].values
-        n_nonzero_weights = np.count_nonzero(weights)
+    def calc_sensitivity(self, chunksize=10000):
+        ''' Composite sensitivity of each parameter: the norm of its weighted
+        jacobian column divided by the number of non-zero weights
 
-        # Calculate sensitivities
-        # Could probally speed this up with some of the Matix class methods
-        # - for another time..
-        sensitivities = []
-        for col in self.jco_df:
-            sen = np.linalg.norm(np.asarray(self.jco_df[col])*weights)/n_nonzero_weights
-            sensitivities.append(sen)
+        Parameters
+        ----------
+        chunksize : int, optional
+            number of jacobian rows to square at a time (dense jacobians)
+
+        Notes
+        ------
+        The squared weights are multiplied into the squared jacobian in one
+        matrix product (rows with zero weight are skipped).  A jacobian of
+        pandas sparse columns is converted to a scipy sparse matrix first.
+        '''
+        # Get count of non-zero weights
+        weights = self._obs_data['ParSen_Weight'].values.astype(np.float64)
+        nonzero = np.flatnonzero(weights)
+        n_nonzero_weights = len(nonzero)
+        sq_weights = weights[nonzero]**2
+
+        if len(self.jco_df.columns) > 0 and \
+                all(isinstance(t, pd.SparseDtype) for t in self.jco_df.dtypes):
+            jco = self.jco_df.sparse.to_coo().tocsr()[nonzero]
+            sum_sq = jco.multiply(jco).T.dot(sq_weights)
+        else:
+            jco = self.jco_df.values
+            sum_sq = np.zeros(jco.shape[1])
+            for i in range(0, n_nonzero_weights, chunksize):
+                rows = nonzero[i:i + chunksize]
+                sum_sq += np.dot(sq_weights[i:i + chunksize], jco[rows].astype(np.float64)**2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sensitivities = np.sqrt(sum_sq) / n_nonzero_weights
 
         # Build Group Array
-        par_groups = []
-        for par in self.jco_df.columns:
-            par_group = self._pars_dict[par]
-            par_groups.append(par_group)
+        par_groups = pd.Series(self._pars_dict).reindex(self.jco_df.columns).values
 
         # Build pandas data frame of parameter sensitivities
         sen_data = {'Sensitivity': sensitivities, 'Parameter Group': par_groups}
         df = pd.DataFrame(sen_data, index=self.jco_df.columns)
         return df
 
+    def _zero_weights(self, mask, calc_sensitivity):
+        """set the ParSen weights of the observations in mask to zero
+        """
+        self._obs_data.loc[mask, 'ParSen_Weight'] = 0.0
+        if calc_sensitivity is True:
+            self.df = self.calc_sensitivity()
+
     def drop_regul(self, calc_sensitivity = True):
         '''
         Recalculate sensitivity without regularization observations
         '''
-        for index, row in self._obs_data.iterrows():    
-            # Set weights for regularization info to zero
-            if 'regul' in row['OBGNME'].lower():
-                self._obs_data.set_value(index, 'ParSen_Weight', 0.0)
-        if calc_sensitivity is True:
-            self.df = self.calc_sensitivity()
+        # Set weights for regularization info to zero
+        groups = self._obs_data['OBGNME'].str.lower()
+        self._zero_weights(groups.str.contains('regul').values, calc_sensitivity)
         
     def drop_groups(self, drop_groups, calc_sensitivity = True):
         '''
         Recalculate sensitivity without groups
         '''
-        for index, row in self._obs_data.iterrows():    
-            # Set weights for obs in groups to zero
-            if row['OBGNME'].lower() in drop_groups:
-                self._obs_data.set_value(index, 'ParSen_Weight', 0.0)
-        if calc_sensitivity is True:
-            self.df = self.calc_sensitivity()
+        # Set weights for obs in groups to zero
+        groups = self._obs_data['OBGNME'].str.lower()
+        self._zero_weights(groups.isin(drop_groups).values, calc_sensitivity)
 
     def keep_groups(self, keep_groups, calc_sensitivity = True):
         '''
         Recalculate sensitivity with only groups
         '''
-        for index, row in self._obs_data.iterrows():
-            # Set weights for obs not in groups to zero
-            if row['OBGNME'].lower() not in keep_groups:
-                self._obs_data.set_value(index, 'ParSen_Weight', 0.0)
-        if calc_sensitivity is True:
-            self.df = self.calc_sensitivity()
+        # Set weights for obs not in groups to zero
+        groups = self._obs_data['OBGNME'].str.lower()
+        self._zero_weights(~groups.isin(keep_groups).values, calc_sensitivity)
         
     def keep_obs(self, keep_obs, calc_sensitivity = True):
         '''
         Recalculate sensitvity with only obs
         '''
-        for index, row in self._obs_data.iterrows():
-            # Set weights for obs not in keep_obs to zero
-            if index.lower() not in keep_obs:
-                self._obs_data.set_value(index, 'ParSen_Weight', 0.0)
-        if calc_sensitivity is True:
-            self.df = self.calc_sensitivity()
+        # Set weights for obs not in keep_obs to zero
+        obs = self._obs_data.index.str.lower()
+        self._zero_weights(~obs.isin(keep_obs), calc_sensitivity)
         
     def remove_obs(self, remove_obs, calc_sensitivity = True):
         '''
         Recalculate sensitivity without obs
         '''
-        for index, row in self._obs_data.iterrows():
-            # Set weights for obs in obs to zero
-            if index.lower() in remove_obs:
-                self._obs_data.set_value(index, 'ParSen_Weight', 0.0)
-        if calc_sensitivity is True:
-            self.df = self.calc_sensitivity()
+        # Set weights for obs in obs to zero
+        obs = self._obs_data.index.str.lower()
+        self._zero_weights(obs.isin(remove_obs), calc_sensitivity)
            
 
     def tail(self, n_tail):
@@ -319,11 +324,11 @@ class ParSen(object):
 
         if n_head > 0:
             sensitivity = self.df.sort_values(by='Sensitivity',
-                                       ascending = False).ix[self.df['Parameter Group'] == group].head(n=n_head)
+                                       ascending = False).loc[self.df['Parameter Group'] == group].head(n=n_head)
         if n_head < 0:
             n_head = abs(n_head)
             sensitivity = self.df.sort_values(by='Sensitivity',
-                                       ascending = False).ix[self.df['Parameter Group'] == group].tail(n=n_head)
+                                       ascending = False).loc[self.df['Parameter Group'] == group].tail(n=n_head)
 
         sensitivity.index.name = 'Parameter'
         return sensitivity
@@ -335,8 +340,8 @@ class ParSen(object):
         -------
         Pandas DataFrame
         '''
-        sen_grouped = self.df.groupby(['Parameter Group'])\
-            .aggregate(np.sum).sort_values(by='Sensitivity', ascending=False)
+        sen_grouped = self.df.groupby(['Parameter Group'], observed=True)\
+            .aggregate('sum').sort_values(by='Sensitivity', ascending=False)
         return sen_grouped
 
     def plot(self, n=None, group=None, color_dict=None, alt_labels=None, **kwds):
@@ -365,6 +370,7 @@ class ParSen(object):
         Matplotlib plot
             Bar plot of mean of sensitivity by parameter group
         '''
+        from . import plots
         if n is None:
             n_head = len(self.df.index)
         else:
@@ -384,11 +390,11 @@ class ParSen(object):
             group = group.lower()
             if n_head > 0:
                 sensitivity = self.df.sort_values(by='Sensitivity',
-                                           ascending=False).ix[self.df['Parameter Group'] == group].head(n=n_head)         
+                                           ascending=False).loc[self.df['Parameter Group'] == group].head(n=n_head)         
             if n_head < 0:
                 n_head = abs(n_head)
                 sensitivity = self.df.sort_values(by='Sensitivity',
-                                           ascending=False).ix[self.df['Parameter Group'] == group].tail(n=n_head)
+                                           ascending=False).loc[self.df['Parameter Group'] == group].tail(n=n_head)
 
         if 'ylabel' not in kwds:
             kwds['ylabel'] = 'Parameter'
@@ -413,8 +419,9 @@ class ParSen(object):
         Matplotlib plot
             Bar plot of mean of sensitivity by parameter group
         '''
-        sen_grouped = self.df.groupby(['Parameter Group'])\
-            .aggregate(np.mean).sort_values(by='Sensitivity', ascending=False)
+        from . import plots
+        sen_grouped = self.df.groupby(['Parameter Group'], observed=True)\
+            .aggregate('mean').sort_values(by='Sensitivity', ascending=False)
 
         if 'ylabel' not in kwds:
             kwds['ylabel'] = 'Parameter Group'
@@ -437,9 +444,9 @@ class ParSen(object):
         Matplotlib plot
             Bar plot of sum of sensitivity by parameter group
         '''
-
-        sen_grouped = self.df.groupby(['Parameter Group'])\
-            .aggregate(np.sum).sort_values(by='Sensitivity', ascending=False)
+        from . import plots
+        sen_grouped = self.df.groupby(['Parameter Group'], observed=True)\
+            .aggregate('sum').sort_values(by='Sensitivity', ascending=False)
 
         if 'ylabel' not in kwds:
             kwds['ylabel'] = 'Parameter Group'
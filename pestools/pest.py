@@ -13,6 +13,28 @@ from .pst_handler import pst as Pst
 from .Cor import Cor
 
 
+def _stamp(filename):
+    """modification time and size of a file, None if it doesn't exist
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _pest_context(pest, basename, obs_info_file=None, **kwargs):
+    """Pest context for a Res, Par, Rei or IdentPar object: the shared pest
+    if one is passed (reading obs_info_file into it if it is a new file),
+    otherwise a new Pest for basename
+    """
+    if pest is None:
+        return Pest(basename, obs_info_file=obs_info_file, **kwargs)
+    if obs_info_file is not None and obs_info_file != pest.obs_info_file:
+        pest.obs_info_file = obs_info_file
+        pest._read_obs_info_file(obs_info_file, **kwargs)
+    return pest
+
 
 class Pest(object):
     """
@@ -25,8 +47,21 @@ class Pest(object):
 
     basename : string
     pest basename or pest control file (includes path)
+
+    Objects read from the run files (pst, res_df, _jco, _cov, ...) are built
+    on first access and reused until one of the files they are built from
+    (directly or through another object) is modified, or refresh() is
+    called.  The cached objects are shared, so copy them before modifying.
     """
 
+    # cached objects: (files they are read from, objects they are built from)
+    _dependencies = {'pst': (['pstfile'], []),
+                     'res_df': (['_res_file'], ['pst']),
+                     '_jco': (['_jco_file'], []),
+                     'jco_df': ([], ['_jco']),
+                     '_cov': ([], ['_jco', 'res_df']),
+                     'cor': ([], ['_cov'])}
+
     def __init__(self, basename, obs_info_file=None, par_info_file=None,
                  name_col='Name', x_col='X', y_col='Y', type_col='Type',
                  error_col='Error', basename_col='basename', datetime_col='datetime', group_cols=[],
@@ -38,6 +73,8 @@ class Pest(object):
             self.run_folder = os.getcwd()
 
         self.pstfile = os.path.join(self.run_folder, self.basename + '.pst')
+        self._jco_file = os.path.join(self.run_folder, self.basename + '.jco')
+        self._cache = {}
         
         # Thinking this will get pass along later to the Res class or similar
         self.obs_info_file = obs_info_file
@@ -56,14 +93,44 @@ class Pest(object):
         else:
             self.parinfo = pd.DataFrame()
 
+    @property
+    def _res_file(self):
+        res_file = os.path.join(self.run_folder, self.basename + '.res')
+        if not os.path.exists(res_file):
+            res_file = res_file[:-4] + '.rei'
+        return res_file
+
+    def _key(self, name):
+        files, depends = self._dependencies[name]
+        return tuple(_stamp(getattr(self, f)) for f in files) + \
+            tuple(self._key(d) for d in depends)
+
+    def _cached(self, name, build):
+        '''
+        Return the cached object, building it if it hasn't been built yet or
+        its source files have changed since
+        '''
+        key = self._key(name)
+        cached = self._cache.get(name)
+        if cached is None or cached[1] != key:
+            cached = (build(), key)
+            self._cache[name] = cached
+        return cached[0]
+
+    def refresh(self):
+        '''
+        Discard all cached objects so they are read again on next access
+        '''
+        self._cache.clear()
+
     def IdentPar(self, jco=None, par_info_file=None):
         '''
         IdentPar class
         '''
-        from identpar import IdentPar
+        from .identpar import IdentPar
         if jco is None:
-            jco = self.pstfile.strip('pst')+'jco'
-        identpar = IdentPar(jco, par_info_file)
+            jco = self._jco_file
+        identpar = IdentPar(jco, par_info_file, pest=self)
         return identpar
     
     @property    
@@ -71,31 +138,31 @@ class Pest(object):
         '''
         Matrix class of jco
         '''
-        jco = Jco()
-        jco.from_binary(os.path.splitext(self.pstfile)[0]+'.jco')
-        return jco
+        def build():
+            jco = Jco()
+            jco.from_binary(self._jco_file)
+            return jco
+        return self._cached('_jco', build)
     @property
     def jco_df(self):
         '''
         DataFrame of jco
         '''
-        jco_df = self._jco.to_dataframe()
-        return jco_df
+        return self._cached('jco_df', lambda: self._jco.to_dataframe())
 
     @property
     def pst(self):
         '''
         Pst Class
         '''
-        pst = Pst(self.pstfile)
-        return pst
+        return self._cached('pst', lambda: Pst(self.pstfile))
         
 
     def ParSen(self, **kwargs):
         '''
         ParSen class
         '''
-        from parsen import ParSen
+        from .parsen import ParSen
         parsen = ParSen(basename=self.pstfile, jco_df = self.jco_df,
                         res_df = self.res_df, 
                         parameter_data = self.parameter_data, **kwargs)
@@ -105,7 +172,7 @@ class Pest(object):
         '''
         ObSen class
         '''
-        from obsen import ObSen
+        from .obsen import ObSen
         obsen = ObSen(basename=self.pstfile, jco_df = self.jco_df,
                         res_df = self.res_df, 
                         parameter_data = self.parameter_data, **kwargs)
@@ -115,10 +182,20 @@ class Pest(object):
         '''
         rmr class
         '''
-        from rmr import Rmr
+        from .rmr import Rmr
         rmr = Rmr(basename = self.pstfile)
         
         return rmr
+
+    @property
+    def rec(self):
+        '''
+        rec class
+        '''
+        from .rec import Rec
+        rec = Rec(basename = self.pstfile)
+
+        return rec
         
     
     def res(self, res_file, obs_info_file = None):
@@ -131,9 +208,9 @@ class Pest(object):
            The extension of the residual file to load.  Assumes basename
            from Pest.basename.  For exmaple 'rei' or 'res'
         '''
-        from res import Res
+        from .res import Res
         #res_file = self.pstfile.rstrip('pst')+res_extension
-        res = Res(res_file, obs_info_file)
+        res = Res(res_file, obs_info_file, pest=self)
 
         return res
     
@@ -142,16 +219,16 @@ class Pest(object):
         '''
         Residual DataFrame
         '''
-        res = self.pst.res
-        return res
+        return self._cached('res_df',
+                            lambda: self.pst.load_resfile(self._res_file))
 
     @property
     def par(self, **kwargs):
-        from par import Par
         '''
         DataFrame of data from .par file
         '''
-        par = Par(basename = self.pstfile)
+        from .par import Par
+        par = Par(basename = self.pstfile, pest=self)
         return par
 
     @property
@@ -167,9 +244,8 @@ class Pest(object):
         '''
         DataFrame of observation data
         '''
-        observation_data = self.pst.observation_data
-        observation_data.index = observation_data.obsnme
-        return observation_data
+        # indexed on a new frame, the pst observation data is shared
+        return self.pst.observation_data.set_index('obsnme', drop=False)
 
     @property
     def obs_groups(self):
@@ -181,27 +257,42 @@ class Pest(object):
         
     @property
     def _cov(self):
-        weights = self.res_df['weight'].values
-        phi = self.pst.phi
-        pars = self._jco.col_names
+        return self._cached('_cov', self._calc_cov)
+
+    def _calc_cov(self):
+        res_df = self.res_df
+        # phi of the observations, as pst.phi; prior information doesn't count
+        observed = np.isin(res_df['name'].values,
+                           self.pst.observation_data['obsnme'].str.lower().values)
+        phi = np.sum((res_df['residual'].values[observed] * res_df['weight'].values[observed])**2)
+        jco = self._jco
+        # weights in the order of the jco rows
+        rows = pd.Index(res_df['name'].values).get_indexer([n.lower() for n in jco.row_names])
+        if (rows < 0).any():
+            missing = np.asarray(jco.row_names)[rows < 0]
+            raise KeyError('observations in the jacobian not in the residuals: {}'
+                           .format(list(missing[:10])))
+        weights = res_df['weight'].values[rows]
+        pars = jco.col_names
         
         # Calc Covariance Matrix
         # See eq. 2.17 in PEST Manual
         # Note: Number of observations are number of non-zero weighted observations
-        q = np.diag(np.diag(np.tile(weights**2, (len(weights), 1))))
+        # (J^T Q J with Q = diag(weights**2), without forming Q)
+        xtqx = np.dot(jco.x.T * weights**2, jco.x)
         cov = np.dot((phi/(np.count_nonzero(weights)-len(pars))),
-                     (np.linalg.inv(np.dot(np.dot(self._jco.x.T, q),self._jco.x))))
+                     (np.linalg.inv(xtqx)))
         cov = Cov(x=cov, names = pars)
         return cov
 
     @property
     def cov_df(self):
-        cov_df = self.cov.to_dataframe()
+        cov_df = self._cov.to_dataframe()
         return cov_df
         
     @property
     def cor(self):
-        return Cor(self._cov)
+        return self._cached('cor', lambda: Cor(self._cov))
 
     def _read_obs_info_file(self, obs_info_file, name_col='Name', x_col='X', y_col='Y', type_col='Type',
                             error_col='Error', basename_col='basename', datetime_col='datetime', group_cols=[],
@@ -212,7 +303,12 @@ class Pest(object):
             self.obsinfo.index = [n.strip().lower() for n in self.obsinfo.index]
     
             # remap observation info columns to default names
-            self.obsinfo.rename(columns={x_col: 'X', y_col: 'Y', type_col: 'Type', error_col: 'Error'}, inplace=True)
+            self.obsinfo.rename(columns={x_col: 'X', y_col: 'Y', type_col: 'Type', error_col: 'Error',
+                                         basename_col: 'basename', datetime_col: 'datetime'}, inplace=True)
+            if 'datetime' in self.obsinfo.columns:
+                self.obsinfo['datetime'] = pd.to_datetime(self.obsinfo['datetime'])
+            if 'basename' in self.obsinfo.columns:
+                self.obsinfo['basename'] = self.obsinfo['basename'].astype(str).str.strip().str.lower()
     
             # make a dataframe of observation type for each group
             if 'Type' in self.obsinfo.columns:
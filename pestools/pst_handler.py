@@ -1,9 +1,328 @@
 import os
 import copy
+import warnings
 import numpy as np
 import pandas
 pandas.options.display.max_colwidth=100
 
+
+def _fortran_floats(values, names, filename):
+    """convert a column of strings to floats, including Fortran exponents
+    without 'E' (1.0-100) or with 'D' (1.0D-100).  Values that still
+    can't be read are set to nan with a warning naming the observations
+    """
+    text = values.str.strip().str.replace(r"[dD]", "e", regex=True)\
+        .str.replace(r"^([+-]?(?:\d+\.?\d*|\.\d+))([+-]\d+)$", r"\1e\2",
+                     regex=True)
+    floats = pandas.to_numeric(text, errors="coerce")
+    bad = floats.isnull().values & values.notnull().values
+    if bad.any():
+        warnings.warn("unreadable values in " + str(values.name) + " column of " +
+                      filename + " set to nan for " + str(np.count_nonzero(bad)) +
+                      " observation(s): " +
+                      ", ".join(["{0} ({1})".format(n, v) for n, v in
+                                 zip(names.values[bad][:10], values.values[bad][:10])]))
+    return floats.values.astype(np.float64)
+
+
+def read_resfile(resfile, lowercase_columns=True, categorical=True):
+    """read a residual (.res) or interim residual (.rei) file
+    Args:
+        resfile (str) : residual file
+        lowercase_columns (bool) : lower case the column names; otherwise
+            they are kept as written in the header (e.g. Name, Group)
+        categorical (bool) : read the observation groups as a categorical
+    Returns:
+        pandas.DataFrame with lower case observation names and groups
+    Raises:
+        Exception if the header is not found
+        UserWarning naming the observations with values that can't be read
+            (set to nan)
+    Note:
+        The file is opened once: the header is located and the rest of the
+        file is parsed from the same handle by the C engine with explicit
+        dtypes, and names and groups are lower cased column-wise (for the
+        groups, on the categories only).
+    """
+    with open(resfile, 'rb') as f:
+        while True:
+            line = f.readline()
+            if line == b'':
+                raise Exception("pst.get_residuals: EOF before finding "+
+                                "header in resfile: " + resfile)
+            if b"name" in line.lower() and b"residual" in line.lower():
+                header = line.decode().strip().split()
+                break
+        if lowercase_columns:
+            header = [c.lower() for c in header]
+        name, group = header[:2]
+        dtype = dict((c, np.float64) for c in header[2:])
+        dtype[name] = str
+        dtype[group] = "category" if categorical else str
+        start = f.tell()
+        try:
+            res_df = pandas.read_csv(f, header=None, names=header, sep=r"\s+",
+                                     dtype=dtype, na_values=["na"], engine="c")
+        except ValueError:
+            # numbers that aren't readable as floats, e.g. Fortran exponents
+            # written without 'E' (1.0-100) or with 'D'
+            f.seek(start)
+            res_df = pandas.read_csv(f, header=None, names=header, sep=r"\s+",
+                                     dtype=dict((c, str) for c in header),
+                                     na_values=["na"], engine="c")
+            res_df[group] = res_df[group].astype(dtype[group])
+            for c in header[2:]:
+                res_df[c] = _fortran_floats(res_df[c], res_df[name], resfile)
+    res_df[name] = res_df[name].str.lower()
+    if categorical:
+        categories = res_df[group].cat.categories.str.lower()
+        if categories.is_unique:
+            res_df[group] = res_df[group].cat.rename_categories(categories)
+        else:
+            res_df[group] = res_df[group].str.lower().astype("category")
+    else:
+        res_df[group] = res_df[group].str.lower()
+    return res_df
+
+
+def read_par_file(parfile):
+    """read a parameter value (.par, .par.N or .bpa.N) file
+    Args:
+        parfile (str) : parameter file
+    Returns:
+        pandas.DataFrame with parnme, parval, scale and offset columns,
+        indexed by lower case parameter name
+    """
+    df = pandas.read_csv(parfile, header=None, skiprows=1, sep=r"\s+",
+                         names=["parnme", "parval", "scale", "offset"],
+                         dtype={"parnme": str, "parval": np.float64,
+                                "scale": np.float64, "offset": np.float64})
+    df["parnme"] = df.parnme.str.lower()
+    df.index = df.parnme
+    return df
+
+
+class prior(object):
+    """sparse representation of the prior information equations.  Each
+    equation is a row of a (nprior x npar) coefficient matrix over the
+    parameter names, with a log-transform flag for each parameter and the
+    right-hand side, weight and group of each equation
+    """
+    def __init__(self, prior_information=None, par_names=None):
+        """constructor of prior object
+        Args:
+            prior_information (pandas.DataFrame) : pst prior information
+                with pilbl, equation, obgnme and weight columns
+            par_names (list of str) : parameter names for the columns of
+                the coefficient matrix.  If None, the parameters referenced
+                by the equations are used
+        Returns:
+            None
+        Raises:
+            None
+        """
+        from scipy import sparse
+        self.pilbl = np.array([], dtype=object)
+        self.obgnme = np.array([], dtype=object)
+        self.weight = np.array([], dtype=np.float64)
+        self.rhs = np.array([], dtype=np.float64)
+        self.par_names = [] if par_names is None else\
+            [str(p).lower() for p in par_names]
+        self.islog = np.zeros(len(self.par_names), dtype=bool)
+        self.coef = sparse.csr_matrix((0, len(self.par_names)))
+        if prior_information is not None:
+            self.from_dataframe(prior_information, par_names=par_names)
+
+
+    @property
+    def nprior(self):
+        """number of prior information equations
+        """
+        return self.coef.shape[0]
+
+
+    def from_dataframe(self, prior_information, par_names=None):
+        """parse the equations of a pst prior information dataframe
+        Args:
+            prior_information (pandas.DataFrame) : pst prior information
+            par_names (list of str) : parameter names for the columns of
+                the coefficient matrix.  If None, the parameters referenced
+                by the equations are used
+        Returns:
+            None
+        Raises:
+            Exception if an equation can't be parsed, references a
+                parameter not in par_names or references a parameter both
+                with and without log transformation
+        """
+        from scipy import sparse
+        nprior = prior_information.shape[0]
+        self.pilbl = prior_information["pilbl"].values.astype(object)
+        self.obgnme = prior_information["obgnme"].values.astype(object)
+        self.weight = prior_information["weight"].values.astype(np.float64)
+        if nprior == 0:
+            self.rhs = np.array([], dtype=np.float64)
+            self.par_names = [] if par_names is None else\
+                [str(p).lower() for p in par_names]
+            self.islog = np.zeros(len(self.par_names), dtype=bool)
+            self.coef = sparse.csr_matrix((0, len(self.par_names)))
+            return
+
+        equation = pandas.Series(prior_information["equation"].values,
+                                 index=np.arange(nprior)).str.lower()
+        sides = equation.str.split("=", n=1, expand=True)
+        if sides.shape[1] != 2 or sides[1].isnull().any():
+            raise Exception("prior.from_dataframe(): no '=' in equation " +
+                            "for: " + str(self.pilbl[sides.iloc[:, -1]
+                                                     .isnull().values][0]))
+        self.rhs = pandas.to_numeric(sides[1].str.strip()
+                                     .str.replace('d', 'e')).values
+
+        # terms are "factor * parnme" separated by "+" or "-"
+        tokens = sides[0].str.split().explode()
+        irow = tokens.index.values
+        tokens = tokens.values.astype(str)
+        position = pandas.Series(irow).groupby(irow).cumcount().values % 4
+        bad = (np.bincount(irow, minlength=nprior) + 1) % 4 != 0
+        bad[irow[(position == 1) & (tokens != '*')]] = True
+        bad[irow[(position == 3) & ~np.isin(tokens, ['+', '-'])]] = True
+        if bad.any():
+            raise Exception("prior.from_dataframe(): can't parse equation " +
+                            "for: " + str(self.pilbl[bad][0]))
+        ifactor = np.nonzero(position == 0)[0]
+        factor = pandas.to_numeric(pandas.Series(tokens[ifactor])
+                                   .str.replace('d', 'e')).values
+        follows_op = np.zeros(len(ifactor), dtype=bool)
+        follows_op[1:] = irow[ifactor[1:]] == irow[ifactor[1:] - 1]
+        negative = np.zeros(len(ifactor), dtype=bool)
+        negative[follows_op] = tokens[ifactor[follows_op] - 1] == '-'
+        factor[negative] *= -1.0
+        names = pandas.Series(tokens[ifactor + 2])
+        term_islog = (names.str.startswith("log(") &
+                      names.str.endswith(")")).values
+        names[term_islog] = names[term_islog].str.slice(4, -1)
+
+        if par_names is None:
+            self.par_names = list(pandas.unique(names.values))
+        else:
+            self.par_names = [str(p).lower() for p in par_names]
+        icol = pandas.Index(self.par_names).get_indexer(names.values)
+        if np.any(icol < 0):
+            raise Exception("prior.from_dataframe(): parameter not found: " +
+                            str(names.values[icol < 0][0]))
+        nlog = np.bincount(icol[term_islog], minlength=len(self.par_names))
+        nlin = np.bincount(icol[~term_islog], minlength=len(self.par_names))
+        if np.any((nlog > 0) & (nlin > 0)):
+            raise Exception("prior.from_dataframe(): parameter referenced " +
+                            "with and without log transformation: " +
+                            str(np.array(self.par_names)[(nlog > 0) &
+                                                         (nlin > 0)][0]))
+        self.islog = nlog > 0
+        self.coef = sparse.csr_matrix((factor, (irow[ifactor], icol)),
+                                      shape=(nprior, len(self.par_names)))
+
+
+    def to_dataframe(self):
+        """get a pst prior information dataframe of the equations
+        Args:
+            None
+        Returns:
+            pandas.DataFrame with pilbl, equation, obgnme and weight columns
+        Raises:
+            None
+        """
+        coo = self.coef.tocoo()
+        order = np.lexsort((coo.col, coo.row))
+        irow, icol, factor = coo.row[order], coo.col[order], coo.data[order]
+        names = np.array(self.par_names, dtype=object)[icol]
+        names[self.islog[icol]] = "log(" + names[self.islog[icol]] + ")"
+        first = np.ones(len(irow), dtype=bool)
+        first[1:] = irow[1:] != irow[:-1]
+        sign = np.where(factor < 0.0, "- ", "+ ").astype(object)
+        sign[first] = np.where(factor[first] < 0.0, "-", "")
+        terms = pandas.Series(sign + np.abs(factor).astype(str).astype(object) +
+                              " * " + names)
+        lhs = terms.groupby(irow).agg(' '.join)\
+            .reindex(np.arange(self.nprior), fill_value='')
+        equation = lhs.values + " = " + self.rhs.astype(str).astype(object)
+        return pandas.DataFrame({"pilbl": self.pilbl,
+                                 "equation": equation,
+                                 "obgnme": self.obgnme,
+                                 "weight": self.weight})
+
+
+    def keep(self, par_names):
+        """get the equations that only reference parameters in par_names
+        Args:
+            par_names (list of str) : parameter names
+        Returns:
+            numpy.ndarray of bool, True for equations to keep
+        Raises:
+            None
+        """
+        dropped = ~np.isin(self.par_names, [str(p).lower()
+                                            for p in par_names])
+        return np.diff(self.coef[:, np.nonzero(dropped)[0]].indptr) == 0
+
+
+    def get(self, par_names):
+        """get a new prior object with the equations that only reference
+        parameters in par_names
+        Args:
+            par_names (list of str) : parameter names
+        Returns:
+            new prior instance with columns for par_names
+        Raises:
+            None
+        """
+        from scipy import sparse
+        par_names = [str(p).lower() for p in par_names]
+        keep = self.keep(par_names)
+        new_prior = prior(par_names=par_names)
+        new_prior.pilbl = self.pilbl[keep]
+        new_prior.obgnme = self.obgnme[keep]
+        new_prior.weight = self.weight[keep]
+        new_prior.rhs = self.rhs[keep]
+        icol = pandas.Index(self.par_names).get_indexer(par_names)
+        new_prior.islog = (icol >= 0) & self.islog[icol]
+        # the kept equations only reference columns in par_names
+        new_icol = pandas.Index(par_names).get_indexer(self.par_names)
+        coo = self.coef[np.nonzero(keep)[0], :].tocoo()
+        new_prior.coef = sparse.csr_matrix(
+            (coo.data, (coo.row, new_icol[coo.col])),
+            shape=(coo.shape[0], len(par_names)))
+        return new_prior
+
+
+    def residuals(self, par_values):
+        """evaluate the prior information equations for a parameter set
+        Args:
+            par_values (pandas.Series or dict{parameter name:value}) :
+                untransformed parameter values
+        Returns:
+            pandas.DataFrame of group, measured (right-hand side), modelled,
+            residual and weight indexed by pilbl.  Residuals are
+            measured - modelled
+        Raises:
+            None
+        """
+        par_values = pandas.Series(par_values, dtype=np.float64)
+        par_values.index = [str(p).lower() for p in par_values.index]
+        x = par_values.reindex(self.par_names).values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x[self.islog] = np.log10(x[self.islog])
+        modelled = self.coef.dot(np.where(np.isnan(x), 0.0, x))
+        # equations referencing a missing parameter can't be evaluated
+        unknown = abs(self.coef).dot(np.isnan(x).astype(np.float64)) > 0.0
+        modelled[unknown] = np.nan
+        return pandas.DataFrame({"group": self.obgnme,
+                                 "measured": self.rhs,
+                                 "modelled": modelled,
+                                 "residual": self.rhs - modelled,
+                                 "weight": self.weight},
+                                index=self.pilbl)
+
+
 class pst(object):
     """basic class for handling pest control files to support linear analysis
     as well as replicate some of the functionality of the pest utilities
@@ -26,14 +345,16 @@ class pst(object):
 
         self.resfile = resfile
         self.__res = None
+        self.__prior = None
+        self.__name_index = {}
 
         self.sfmt = lambda x: "{0:>20s}".format(str(x))
         self.sfmt_long = lambda x: "{0:>50s}".format(str(x))
         self.ifmt = lambda x: "{0:>10d}".format(int(x))
         self.ffmt = lambda x: "{0:>15.6E}".format(float(x))
 
-        self.par_dtype = np.dtype([("parnme", "a20"),("parval1", np.float),
-                                   ("scale", np.float),("offset", np.float)])
+        self.par_dtype = np.dtype([("parnme", "a20"),("parval1", np.float64),
+                                   ("scale", np.float64),("offset", np.float64)])
         self.par_fieldnames = "PARNME PARTRANS PARCHGLIM PARVAL1 PARLBND " +\
                               "PARUBND PARGP SCALE OFFSET DERCOM"
         self.par_fieldnames = self.par_fieldnames.lower().strip().split()
@@ -78,26 +399,57 @@ class pst(object):
 
         """
 
-        # calculate phi components for each obs group
-        components = {}
-        ogroups = self.observation_data.groupby("obgnme").groups
-        rgroups = self.res.groupby("group").groups
-        for og in list(ogroups.keys()):
-            assert og in list(rgroups.keys()),"pst.adjust_weights_res() obs group " +\
-                "not found: " + str(og)
-            og_res_df = self.res.ix[rgroups[og]]
-            og_res_df.index = og_res_df.name
-            og_df = self.observation_data.ix[ogroups[og]]
-            og_df.index = og_df.obsnme
-            assert og_df.shape[0] == og_res_df.shape[0],\
-            " pst.phi_components error: group residual dataframe row lenght" +\
-            "doesn't match observation data group dataframe row length" + \
-                str(og_df.shape) + " vs. " + str(og_res_df.shape)
-            components[og] = np.sum((og_res_df["residual"] *
-                                     og_df["weight"]) ** 2)
+        return self.get_phi_components()
+
+
+    def get_phi_components(self, by_obs=False):
+        """ get the phi components from a single join of the residuals and
+        the observation data weights by observation name
+        Args:
+            by_obs (bool) : flag to also return the contribution of each
+                observation
+        Returns:
+            Dict{observation group : contribution}
+            if by_obs, also a dataframe of residual, weight and phi
+                contribution indexed by observation name
+        Raises:
+            Assertion error if observations in self.observation_data are
+            not found in self.res
+        """
+        obs = self.observation_data
+        obs_phi = pandas.DataFrame({"obgnme": obs["obgnme"].values,
+                                    "residual": self.__get_obs_residuals(),
+                                    "weight": obs["weight"].values},
+                                   index=obs["obsnme"].values)
+        obs_phi["phi"] = (obs_phi["residual"] * obs_phi["weight"]) ** 2
+        components = obs_phi.groupby("obgnme")["phi"].sum().to_dict()
+        if by_obs:
+            return components, obs_phi
         return components
 
 
+    def __get_obs_residuals(self):
+        """get the residuals aligned to the rows of self.observation_data
+        Args:
+            None
+        Returns:
+            numpy.ndarray of residuals
+        Raises:
+            Assertion error if observations in self.observation_data are
+            not found in self.res
+        """
+        obs = self.observation_data
+        res = self.res
+        residual = pandas.Series(res["residual"].values,
+                                 index=res["name"].values)
+        residual = residual.reindex(obs["obsnme"].values)
+        missing = residual.isnull().values
+        assert not missing.any(), "pst.phi_components() obs not found " +\
+            "in residuals for groups: " +\
+            ','.join([str(g) for g in obs.loc[missing, "obgnme"].unique()])
+        return residual.values
+
+
     @property
     def res(self):
         """get the residuals dataframe
@@ -118,6 +470,39 @@ class pst(object):
             return self.__res
 
 
+    @property
+    def prior(self):
+        """get the prior information equations as a prior object with a
+        sparse coefficient matrix over self.par_names.  The parsed equations
+        are reused until prior_information or parameter_data are replaced
+        """
+        if self.__prior is None or\
+                self.__prior[0] is not self.prior_information or\
+                self.__prior[1] is not self.parameter_data:
+            self.__prior = (self.prior_information, self.parameter_data,
+                            prior(self.prior_information,
+                                  par_names=self.par_names))
+        return self.__prior[2]
+
+
+    def prior_residuals(self, par_values=None):
+        """evaluate the prior information equations for a parameter set
+        Args:
+            par_values (pandas.Series or dict{parameter name:value}) :
+                untransformed parameter values.  If None, parval1 from
+                self.parameter_data is used
+        Returns:
+            pandas.DataFrame of prior information residuals indexed by pilbl
+        Raises:
+            None
+        """
+        if par_values is None:
+            par_values = pandas.Series(
+                self.parameter_data["parval1"].values,
+                index=self.parameter_data["parnme"].values)
+        return self.prior.residuals(par_values)
+
+
     @property
     def nprior(self):
         """number of prior information equations
@@ -206,21 +591,7 @@ class pst(object):
     def load_resfile(self,resfile):
         """load the residual file
         """
-        pass
-        converters = {"name": str.lower, "group": str.lower}
-        f = open(resfile, 'r')
-        while True:
-            line = f.readline()
-            if line == '':
-                raise Exception("pst.get_residuals: EOF before finding "+
-                                "header in resfile: " + resfile)
-            if "name" in line.lower():
-                header = line.lower().strip().split()
-                break
-        res_df = pandas.read_csv(f, header=None, names=header, sep="\s+",
-                                 converters=converters)
-        f.close()
-        return res_df
+        return read_resfile(resfile)
 
 
     def load(self, filename):
@@ -295,6 +666,15 @@ class pst(object):
             return
 
 
+    def __section_string(self, df, columns, formatters):
+        """format the columns of a dataframe as a control file section,
+        one row per line
+        """
+        return df.loc[:, columns].to_string(col_space=0, formatters=formatters,
+                                            justify="right", header=False,
+                                            index=False) + '\n'
+
+
     def write(self,new_filename):
         """write a pest control file
         Args:
@@ -306,7 +686,7 @@ class pst(object):
             Exception if self.filename pst is not the correct format
         """
         pass
-        assert "tied" not in self.parameter_data.partrans,\
+        assert "tied" not in self.parameter_data.partrans.values,\
             "tied parameters not supported in pst.write()"
         f_in = open(self.filename, 'r')
         f_out = open(new_filename, 'w')
@@ -314,7 +694,9 @@ class pst(object):
             f_out.write(f_in.readline())
         raw = f_in.readline().strip().split()
         npar_gp = len(self.par_groups)
-        nobs_gp = len(self.obs_groups) + len(self.prior_groups)
+        obs_groups = self.obs_groups + [g for g in self.prior_groups
+                                        if g not in self.obs_groups]
+        nobs_gp = len(obs_groups)
         line = "{0:7d} {1:7d} {2:7d} {3:7d} {4:7d}\n"\
             .format(self.npar, self.nobs, npar_gp, self.nprior, nobs_gp)
         f_out.write(line)
@@ -349,14 +731,9 @@ class pst(object):
                             " relative  0.01 0.0 switch 2.0 parabolic\n")
 
         f_out.write(line)
-        self.parameter_data.index = self.parameter_data.parnme
-        self.parameter_data.pop("parnme")
-        f_out.write(self.parameter_data.to_string(colSpace=0,
-                                                  formatters=self.par_format,
-                                                  justify="right",
-                                                  header=False,
-                                                  index_names=False) + '\n')
-        self.parameter_data["parnme"] = self.parameter_data.index
+        f_out.write(self.__section_string(self.parameter_data,
+                                          self.par_fieldnames,
+                                          self.par_format))
         #--read f_in past parameter data
         while True:
             line = f_in.readline()
@@ -367,9 +744,7 @@ class pst(object):
                 f_out.write(line)
                 break
 
-        for group in self.obs_groups:
-            f_out.write(group+'\n')
-        for group in self.prior_groups:
+        for group in obs_groups:
             f_out.write(group+'\n')
 
         while True:
@@ -381,14 +756,9 @@ class pst(object):
             if "* observation" in line.lower():
                 f_out.write(line)
                 break
-        self.observation_data.index = self.observation_data.obsnme
-        self.observation_data.pop("obsnme")
-        f_out.write(self.observation_data.to_string(colSpace=0,
-                                                  formatters=self.obs_format,
-                                                  justify="right",
-                                                  header=False,
-                                                  index_names=False) + '\n')
-        self.observation_data["obsnme"] = self.observation_data.index
+        f_out.write(self.__section_string(self.observation_data,
+                                          self.obs_fieldnames,
+                                          self.obs_format))
 
         #--read f_in past observation data
         while True:
@@ -406,15 +776,11 @@ class pst(object):
             f_out.write(line)
         if self.nprior > 0:
             f_out.write("* prior information\n")
-            self.prior_information.index = self.prior_information.pilbl
-
-            self.prior_information.pop("pilbl")
-            f_out.write(self.prior_information.to_string(colSpace=0,
-                                              formatters=self.prior_format,
-                                              justify="right",
-                                              header=False,
-                                              index_names=False) + '\n')
-            self.prior_information["pilbl"] = self.prior_information.index
+            # the equations are written from the parsed prior information
+            f_out.write(self.__section_string(self.prior.to_dataframe(),
+                                              ["pilbl", "equation",
+                                               "weight", "obgnme"],
+                                              self.prior_format))
         #--read past an option prior information section
         while True:
             line = f_in.readline()
@@ -435,65 +801,92 @@ class pst(object):
 
 
     def get(self, par_names=None, obs_names=None):
-        """get a new pst object with subset of parameters and observations
+        """get a new pst object with subset of parameters and observations.
+        No deep copies are made: dataframes that aren't subset are shared
+        with this pst through shallow copies and the residuals, if loaded,
+        are carried over to the new pst
         Args:
             par_names (list of str) : parameter names
             obs_names (list of str) : observation names
         Returns:
             new pst instance
         Raises:
-            None
+            Assertion error if par_names or obs_names are not found
         """
         pass
-        if par_names is None and obs_names is None:
-            return copy.deepcopy(self)
-        new_par = copy.deepcopy(self.parameter_data)
-        if par_names is not None:
-            new_par.index = new_par.parnme
-            new_par = new_par.loc[par_names, :]
-        new_obs = copy.deepcopy(self.observation_data)
-        new_res = None
-
-
-
-        if obs_names is not None:
-            new_obs.index = new_obs.obsnme
-            new_obs = new_obs.loc[obs_names]
-            if self.res is not None:
-                new_res = copy.deepcopy(self.res)
-                new_res.index = new_res.name
-                new_res = new_res.loc[obs_names,:]
-
         new_pst = pst(self.filename, resfile=self.resfile, load=False)
-        new_pst.parameter_data = new_par
-        new_pst.observation_data = new_obs
-        new_pst.__res = new_res
-        # this is too slow, just drop the prior info
-        # new_prior = copy.deepcopy(self.prior_information)
-        # if par_names is not None:
-        #     # need to drop all prior information that mentions parameters that
-        #     # are not in the new pst
-        #     dropped = []
-        #     for p in self.par_names:
-        #         if p not in par_names:
-        #             dropped.append(p)
-        #     if len(dropped) > 0:
-        #         # this is painful
-        #         keep_idx = []
-        #         for d in dropped:
-        #             for row in new_prior.iterrows():
-        #                 if d not in row[1].equation.lower():
-        #                     keep_idx.append(row[1].index)
-        #         new_prior = new_prior.loc[keep_idx, :]
-        if par_names is not None:
-            print("pst.get() warning: dropping all prior information in " + \
-                  " new pst instance")
-        new_pst.prior_information = self.null_prior
         new_pst.mode = self.mode
         new_pst.estimation = self.estimation
+
+        if par_names is None:
+            new_pst.parameter_data = self.parameter_data.copy(deep=False)
+            new_pst.prior_information = self.prior_information.copy(deep=False)
+        else:
+            new_pst.parameter_data = self.__take(self.parameter_data,
+                                                 "parnme", par_names)
+            if self.nprior > 0:
+                keep = self.prior.keep(par_names)
+                new_pst.prior_information = self.prior_information.loc[keep, :]
+            else:
+                new_pst.prior_information = self.null_prior
+
+        res = self.__res
+        if obs_names is None:
+            new_pst.observation_data = self.observation_data.copy(deep=False)
+            if res is not None:
+                res = res.copy(deep=False)
+        else:
+            new_pst.observation_data = self.__take(self.observation_data,
+                                                   "obsnme", obs_names)
+            # load the residuals once in this pst for all subsets
+            if res is None:
+                res = self.res
+            ridx = self.__get_name_index(res, "name")\
+                .get_indexer([str(o).lower() for o in obs_names])
+            res = res.iloc[ridx[ridx >= 0], :]
+            res.index = res["name"]
+        new_pst.__res = res
         return new_pst
 
 
+    def __take(self, df, name_col, names):
+        """get the rows of a dataframe for a list of names
+        Args:
+            df (pandas.DataFrame) : parameter or observation data
+            name_col (str) : column of names in df
+            names (list of str) : names of the rows to get
+        Returns:
+            pandas.DataFrame indexed by name_col
+        Raises:
+            Assertion error if names are not found in df
+        """
+        names = [str(n).lower() for n in names]
+        idx = self.__get_name_index(df, name_col).get_indexer(names)
+        assert np.all(idx >= 0), "pst.get(): " + name_col + " not found: " +\
+            ','.join(np.array(names)[idx < 0][:10])
+        new_df = df.iloc[idx, :]
+        new_df.index = new_df[name_col]
+        return new_df
+
+
+    def __get_name_index(self, df, name_col):
+        """get an index of the names in a dataframe, cached until the
+        dataframe is replaced
+        Args:
+            df (pandas.DataFrame) : dataframe with a column of names
+            name_col (str) : column of names in df
+        Returns:
+            pandas.Index
+        Raises:
+            None
+        """
+        cached = self.__name_index.get(name_col)
+        if cached is None or cached[0] is not df:
+            cached = (df, pandas.Index(df[name_col].values))
+            self.__name_index[name_col] = cached
+        return cached[1]
+
+
     def zero_order_tikhonov(self,parbounds=True):
         """setup preferred-value regularization
         Args:
@@ -506,23 +899,21 @@ class pst(object):
         """
         pass
         obs_group = "regul"
-        pilbl, obgnme, weight, equation = [], [], [], []
-        for idx, row in self.parameter_data.iterrows():
-            if row["partrans"].lower() not in ["tied", "fixed"]:
-                pilbl.append(row["parnme"])
-                weight.append(1.0)
-                obgnme.append(obs_group)
-                parnme = row["parnme"]
-                parval1 = row["parval1"]
-                if row["partrans"].lower() == "log":
-                    parnme = "log(" + parnme + ")"
-                    parval1 = np.log10(parval1)
-                eq = "1.0 * " + parnme + " ={0:15.6E}".format(parval1)
-                equation.append(eq)
-        self.prior_information = pandas.DataFrame({"pilbl": pilbl,
-                                                   "equation": equation,
-                                                   "obgnme": obs_group,
-                                                   "weight": weight})
+        partrans = self.parameter_data["partrans"].str.lower().values
+        adjustable = ~np.isin(partrans, ["tied", "fixed"])
+        pdata = self.parameter_data.loc[adjustable, :]
+        islog = partrans[adjustable] == "log"
+        parnme = pdata["parnme"].values.astype(object)
+        parval1 = pdata["parval1"].values.astype(np.float64)
+        parval1[islog] = np.log10(parval1[islog])
+        parnme[islog] = "log(" + parnme[islog] + ")"
+        equation = "1.0 * " + parnme + " =" +\
+            np.char.mod("%15.6E", parval1).astype(object)
+        self.prior_information = pandas.DataFrame(
+            {"pilbl": pdata["parnme"].values,
+             "equation": equation,
+             "obgnme": obs_group,
+             "weight": np.ones(pdata.shape[0])})
         if parbounds:
             self.regweight_from_parbound()
 
@@ -533,18 +924,21 @@ class pst(object):
         """
         self.parameter_data.index = self.parameter_data.parnme
         self.prior_information.index = self.prior_information.pilbl
-        for idx, parnme in enumerate(self.prior_information.pilbl):
-            if parnme in self.parameter_data.index:
-                row =  self.parameter_data.loc[parnme, :]
-                lbnd,ubnd = row["parlbnd"], row["parubnd"]
-                if row["partrans"].lower() == "log":
-                    weight = 1.0 / (np.log10(ubnd) - np.log10(lbnd))
-                else:
-                    weight = 1.0 / (ubnd - lbnd)
-                self.prior_information.loc[parnme, "weight"] = weight
-            else:
-                print("prior information name does not correspond" +\
-                      " to a parameter: " + str(parnme))
+        pilbl = self.prior_information.pilbl.values
+        found = self.parameter_data.index.get_indexer(pilbl)
+        for parnme in pilbl[found < 0]:
+            print("prior information name does not correspond" +\
+                  " to a parameter: " + str(parnme))
+        isfound = found >= 0
+        pdata = self.parameter_data.iloc[found[isfound], :]
+        lbnd = pdata["parlbnd"].values.astype(np.float64)
+        ubnd = pdata["parubnd"].values.astype(np.float64)
+        islog = (pdata["partrans"].str.lower() == "log").values
+        lbnd[islog] = np.log10(lbnd[islog])
+        ubnd[islog] = np.log10(ubnd[islog])
+        weight = self.prior_information["weight"].values.astype(np.float64)
+        weight[isfound] = 1.0 / (ubnd - lbnd)
+        self.prior_information["weight"] = weight
 
 
     def parrep(self,parfile=None):
@@ -562,14 +956,9 @@ class pst(object):
             parfile = self.filename.replace(".pst", ".par")
         assert os.path.exists(parfile), "pst.parrep(): parfile not found: " +\
                                         str(parfile)
-        f = open(parfile, 'r')
-        header = f.readline()
-        par_df = pandas.read_csv(f, header=None,
-                                 names=["parnme", "parval1", "scale", "offset"],
-                                 sep="\s+")
+        par_df = read_par_file(parfile)
         self.parameter_data.index = self.parameter_data.parnme
-        par_df.index = par_df.parnme
-        self.parameter_data.parval1 = par_df.parval1
+        self.parameter_data.parval1 = par_df.parval
 
 
     def adjust_weights_recfile(self,recfile=None):
@@ -644,6 +1033,9 @@ class pst(object):
         if False in list(nz_groups.keys()):
             nzobs = len(nz_groups[False])
 
+        # scale a copy of the weights so pst instances from get()
+        # don't share the update
+        weight = obs["weight"].values.astype(np.float64)
         ogroups = obs.groupby("obgnme").groups
         for ogroup, idxs in ogroups.items():
             if self.mode.startswith("regul") and "regul" in ogroup.lower():
@@ -660,7 +1052,8 @@ class pst(object):
                                 " but phi > 0 for group:" + str(ogroup))
             if og_phi > 0:
                 factor = np.sqrt(float(og_nzobs) / float(og_phi))
-                obs.weight[idxs] *= factor
+                weight[obs.index.get_indexer(idxs)] *= factor
+        obs["weight"] = weight
         self.observation_data = obs
 
 
@@ -673,115 +1066,145 @@ class pst(object):
         Raises:
             None
         """
-        iiter = 1
-        iters = {}
-        f = open(recfile,'r')
-        while True:
-            line = f.readline()
-            if line == '':
-                break
-            if "starting phi for this iteration" in line.lower():
-                contributions = {}
-                while True:
-                    line = f.readline()
-                    if line == '':
-                        break
-                    if "contribution to phi" not in line.lower():
-                        iters[iiter] = contributions
-                        iiter += 1
-                        break
-                    raw = line.strip().split()
-                    val = float(raw[-1])
-                    group = raw[-3].lower().replace('\"', '')
-                    contributions[group] = val
-        return iters
-
-
-    def __reset_weights(self, target_phis, res_idxs, obs_idxs):
-        """reset weights based on target phi vals for each group
+        from .rec import Rec
+        return Rec(rec_file=recfile).get_phi_components()
+
+
+    def __get_weight_targets(self, obs_dict=None, obsgrp_dict=None,
+                             obsgrp_suffix_dict=None, obsgrp_prefix_dict=None,
+                             obsgrp_phrase_dict=None):
+        """build the target phi contributions and a sparse
+        (target x observation) membership matrix for reweighting
         Args:
-            target_phis (dict) : target phi contribution for groups to reweight
-            res_idxs (dict) : the index positions of each group of interest
-                 in the res dataframe
-            obs_idxs (dict) : the index positions of each group of interest
-                in the observation data dataframe
+            see pst.adjust_weights_by_group()
+        Returns:
+            target_phis (numpy.ndarray) : target phi contributions
+            members (scipy.sparse.csr_matrix) : membership of the
+                observations (columns) in each target (rows)
+        Raises:
+            Assertion error if a key does not match any observations
         """
-        pass
-        for item in list(target_phis.keys()):
-            assert item in list(res_idxs.keys()),\
-                "pst.__reset_weights(): "  + str(item) +\
-                " not in residual group indices"
-            assert item in list(obs_idxs.keys()), \
-                "pst.__reset_weights(): " + str(item) +\
-                " not in observation group indices"
-            actual_phi = ((self.res.loc[res_idxs[item],"residual"] *
-                           self.observation_data.loc
-                           [obs_idxs[item],"weight"] )**2).sum()
-            weight_mult = np.sqrt(target_phis[item] / actual_phi)
-            self.observation_data.loc[obs_idxs[item],"weight"] *= weight_mult
+        from scipy import sparse
+        obs = self.observation_data
+        nobs = obs.shape[0]
+        # group the observation positions by observation group once
+        codes, ugroups = pandas.factorize(obs["obgnme"].values)
+        ugroups = pandas.Series(ugroups)
+        order = np.argsort(codes, kind="mergesort")
+        bounds = np.searchsorted(codes[order], np.arange(len(ugroups) + 1))
+
+        target_phis, rows, cols = [], [], []
+
+        def add_target(idxs, phi):
+            rows.append(np.zeros(len(idxs), dtype=int) + len(target_phis))
+            cols.append(idxs)
+            target_phis.append(float(phi))
+
+        def add_group_matches(match, phi):
+            gidxs = np.nonzero(match)[0]
+            add_target(np.concatenate([order[bounds[g]:bounds[g + 1]]
+                                       for g in gidxs]), phi)
+
+        if obsgrp_dict is not None:
+            gidxs = pandas.Index(ugroups).get_indexer(list(obsgrp_dict.keys()))
+            for gidx, (group, phi) in zip(gidxs, obsgrp_dict.items()):
+                assert gidx >= 0, "pst.adjust_weights_by_group(): " +\
+                    "obs group \'" + str(group) + "\' not found in " +\
+                    "observation_data"
+                add_target(order[bounds[gidx]:bounds[gidx + 1]], phi)
+        if obs_dict is not None:
+            oidxs = pandas.Index(obs["obsnme"].values)\
+                .get_indexer(list(obs_dict.keys()))
+            for oidx, (name, phi) in zip(oidxs, obs_dict.items()):
+                assert oidx >= 0, "pst.adjust_weights_by_group(): " +\
+                    "obs \'" + str(name) + "\' not found in observation_data"
+                add_target(np.array([oidx]), phi)
+        patterns = [("suffix", obsgrp_suffix_dict, ugroups.str.endswith),
+                    ("prefix", obsgrp_prefix_dict, ugroups.str.startswith),
+                    ("phrase", obsgrp_phrase_dict,
+                     lambda x: ugroups.str.contains(x, regex=False))]
+        for kind, pattern_dict, matcher in patterns:
+            if pattern_dict is None:
+                continue
+            for pattern, phi in pattern_dict.items():
+                match = matcher(pattern).values
+                assert match.any(), "pst.adjust_weights_by_group(): " +\
+                    "obs group " + kind + " \'" + str(pattern) +\
+                    "\' not found in observation_data"
+                add_group_matches(match, phi)
+
+        if len(target_phis) == 0:
+            return np.array([]), sparse.csr_matrix((0, nobs))
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        members = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                    shape=(len(target_phis), nobs))
+        return np.array(target_phis), members
 
 
     def adjust_weights_by_group(self,obs_dict=None,
                               obsgrp_dict=None,obsgrp_suffix_dict=None,
-                              obsgrp_prefix_dict=None,obsgrp_phrase_dict=None):
+                              obsgrp_prefix_dict=None,obsgrp_phrase_dict=None,
+                              max_iter=25, tol=1.0e-6):
         """reset the weights of observation groups to contribute a specified
-        amount to the composite objective function
+        amount to the composite objective function.  All of the weight
+        multipliers are solved in one pass.  If an observation belongs to
+        more than one entry (e.g. a group matched by both a prefix and a
+        suffix), its weight is scaled by the geometric mean of the
+        multipliers of those entries and the pass is repeated until all
+        contributions are within tol of their targets.
         Args:
             obs_dict (dict{obs name:new contribution})
             obsgrp_dict (dict{obs group name:contribution})
             obsgrp_suffic_dict (dict{obs group suffix:contribution})
             obsgrp_prefix_dict (dict{obs_group prefix:contribution})
             obsgrp_phrase_dict (dict{obs group phrase:contribution})
+            max_iter (int) : maximum number of passes for overlapping entries
+            tol (float) : relative tolerance of the target contributions
         Returns:
             None
         Raises:
             Exception if a key is not found in the obs or obs groups
+            UserWarning if entries have zero phi, or if the contributions
+                aren't within tol of their targets after max_iter passes
         """
-        if obsgrp_dict is not None:
-            res_groups = self.res.groupby("group").groups
-            obs_groups = self.observation_data.groupby("obgnme").groups
-            self.__reset_weights(obsgrp_dict,res_groups,obs_groups)
-        if obs_dict is not None:
-            res_groups = self.res.groupby("name").groups
-            obs_groups = self.observation_data.groupby("obsnme").groups
-            self.__reset_weights(obs_dict,res_groups, obs_groups)
-        if obsgrp_suffix_dict is not None:
-            self.res.index = self.res.group
-            self.observation_data.index = self.observation_data.obgnme
-            res_idxs, obs_idxs = {}, {}
-            for suffix,phi in obsgrp_suffix_dict.items():
-                res_groups = self.res.groupby(lambda x:
-                                              x.endswith(suffix)).groups
-                assert True in list(res_groups.keys()),\
-                    "pst.adjust_weights_by_phi(): obs group suffix \'" +\
-                    str(suffix)+"\' not found in res"
-                obs_groups = self.observation_data.groupby(
-                    lambda x: x.endswith(suffix)).groups
-                assert True in list(obs_groups.keys()),\
-                    "pst.adjust_weights_by_phi(): obs group suffix \'" +\
-                    str(suffix) + "\' not found in observation_data"
-                res_idxs[suffix] = res_groups[True]
-                obs_idxs[suffix] = obs_groups[True]
-            self.__reset_weights(obsgrp_suffix_dict, res_idxs, obs_idxs)
-        if obsgrp_prefix_dict is not None:
-            self.res.index = self.res.group
-            self.observation_data.index = self.observation_data.obgnme
-            res_idxs, obs_idxs = {}, {}
-            for prefix, phi in obsgrp_prefix_dict.items():
-                res_groups = self.res.groupby(
-                    lambda x: x.startswith(prefix)).groups
-                assert True in list(res_groups.keys()),\
-                    "pst.adjust_weights_by_phi(): obs group prefix \'" +\
-                    str(prefix) + "\' not found in res"
-                obs_groups = self.observation_data.groupby(
-                    lambda x:x.startswith(prefix)).groups
-                assert True in list(obs_groups.keys()),\
-                    "pst.adjust_weights_by_phi(): obs group prefix \'" +\
-                    str(prefix) + "\' not found in observation_data"
-                res_idxs[prefix] = res_groups[True]
-                obs_idxs[prefix] = obs_groups[True]
-            self.__reset_weights(obsgrp_prefix_dict, res_idxs, obs_idxs)
-
+        target_phis, members = self.__get_weight_targets(
+            obs_dict=obs_dict, obsgrp_dict=obsgrp_dict,
+            obsgrp_suffix_dict=obsgrp_suffix_dict,
+            obsgrp_prefix_dict=obsgrp_prefix_dict,
+            obsgrp_phrase_dict=obsgrp_phrase_dict)
+        if len(target_phis) == 0:
+            return
+        residuals = self.__get_obs_residuals()
+        weights = self.observation_data["weight"].values.astype(np.float64)
+        nmember = np.asarray(members.sum(axis=0)).ravel()
+        adjust = nmember > 0
+        for iiter in range(max_iter):
+            actual_phis = members.dot((residuals * weights) ** 2)
+            active = actual_phis > 0.0
+            if iiter == 0 and np.any(~active & (target_phis > 0.0)):
+                warnings.warn("pst.adjust_weights_by_group(): " +
+                              str(np.count_nonzero(~active & (target_phis > 0.0))) +
+                              " entries have zero phi and can't be reweighted")
+            ratio = np.ones_like(target_phis)
+            ratio[active] = target_phis[active] / actual_phis[active]
+            if np.all(np.abs(ratio - 1.0) <= tol):
+                break
+            with np.errstate(divide="ignore"):
+                log_mult = 0.5 * np.log(ratio)
+            obs_log_mult = members.T.dot(log_mult)
+            weights[adjust] *= np.exp(obs_log_mult[adjust] / nmember[adjust])
+        else:
+            actual_phis = members.dot((residuals * weights) ** 2)
+            active = actual_phis > 0.0
+            error = np.abs(target_phis[active] / actual_phis[active] - 1.0)
+            if np.any(error > tol):
+                warnings.warn("pst.adjust_weights_by_group(): contributions " +
+                              "did not converge in " + str(max_iter) +
+                              " passes (largest relative error " +
+                              "{0:.3g}); overlapping entries may have "
+                              .format(error.max()) +
+                              "incompatible targets")
+        self.observation_data["weight"] = weights
 
 
 
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Reader for the PEST run record (.rec) file
+"""
+import mmap
+import os
+import re
+import numpy as np
+import pandas as pd
+
+
+_ITERATION_HEADER = b'OPTIMISATION ITERATION NO.'
+
+_model_calls = re.compile(r'Model calls so far\s*:\s*(\d+)')
+_meas_phi = re.compile(r'Current value of measurement objective function\s*:\s*(\S+)')
+_regul_phi = re.compile(r'Current value of regularisation objective function\s*:\s*(\S+)')
+_starting_phi = re.compile(r'Starting phi for this iteration\s*:\s*(\S+)[^\n]*\n'
+                           r'((?:[ \t]*Contribution to phi from[^\n]*\n)*)')
+_contribution = re.compile(r'Contribution to phi from[^"]*"([^"]+)"\s*:\s*(\S+)')
+_lambda = re.compile(r'Lambda\s*=\s*(\S+)\s*----->[^\n]*\n((?:[^\n]*=[^\n]*\n)*)')
+_lambda_phi = re.compile(r'Phi\s*=\s*(\S+)\s*\(\s*(\S+)')
+_lambda_meas = re.compile(r'Meas\. fn\.\s*=\s*(\S+)')
+_lambda_regul = re.compile(r'Regul\. fn\.\s*=\s*(\S+)')
+_parameters = re.compile(r'Current parameter values[^\n]*\n'
+                         r'((?:[ \t]+(?!Maximum )\S+[ \t]+\S+[^\n]*\n)+)')
+_max_change = re.compile(r'Maximum (relative|factor) change:\s*(\S+)\s*\["([^"]+)"\]')
+
+
+def _float(value):
+    """Convert a number written by PEST to float, returning nan for
+    Fortran numbers that can't be read (e.g. 3-digit exponents without 'E')
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+class Rec(object):
+    def __init__(self, basename=None, rec_file=None):
+        ''' Create Rec class
+
+        Parameters
+        ----------
+        basename : str, optional
+            Basename for the PEST control file, if full path not provided the
+            current working directory is assumed
+
+        rec_file : str, optional
+            Path to the record file.  Default is basename + '.rec'
+
+        Attributes
+        ----------
+        iterations : DataFrame
+            Summary of each optimisation iteration: byte offset of the
+            iteration block in the record file, model calls so far, runs
+            made during the iteration, starting phi, measurement and
+            regularisation objective functions, number of lambdas
+            tested and the maximum relative or factor parameter change
+
+        phi_components : DataFrame
+            Starting phi contribution of each observation group (columns)
+            for each iteration (index)
+
+        lambdas : DataFrame
+            Marquardt lambdas tested in each iteration with the resulting
+            phi, ratio to starting phi and measurement and regularisation
+            objective functions
+
+        parameters : DataFrame
+            Parameter values (columns) at the end of each iteration (index)
+
+        Notes
+        ------
+        The record file is scanned once for the start of each iteration block
+        and the byte offsets are kept.  Calling update() when the file has
+        grown parses only the last (possibly incomplete) iteration and any
+        new iterations.
+
+        '''
+        if rec_file is None:
+            self.basename = os.path.split(basename)[-1].split('.')[0]
+            self.directory = os.path.split(basename)[0]
+            if len(self.directory) == 0:
+                self.directory = os.getcwd()
+            rec_file = os.path.join(self.directory, self.basename + '.rec')
+        self.rec_file = rec_file
+
+        self._reset()
+        self.update()
+
+    def _reset(self):
+        # byte offsets and numbers of the iteration blocks
+        self._offsets = []
+        self._iteration_numbers = []
+        self._size = 0
+        self._mtime_ns = None
+        self._blocks = {}
+
+    def update(self):
+        ''' Index and parse iterations written to the record file since the
+        last update
+
+        Returns
+        -------
+        list
+            Iteration numbers that are new or were re-parsed because they
+            were incomplete at the last update
+
+        Notes
+        ------
+        A record file that shrank, was rewritten at the same size, or no
+        longer has iteration headers at the indexed offsets (e.g. PEST was
+        restarted) is indexed again from the start.
+        '''
+        stat = os.stat(self.rec_file)
+        size = stat.st_size
+        if size == 0 or (size == self._size and stat.st_mtime_ns == self._mtime_ns):
+            return []
+        if size <= self._size:
+            self._reset()
+
+        with open(self.rec_file, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                header = len(_ITERATION_HEADER)
+                if len(self._offsets) > 0 and \
+                        (mm[self._offsets[0]:self._offsets[0] + header] != _ITERATION_HEADER or
+                         mm[self._offsets[-1]:self._offsets[-1] + header] != _ITERATION_HEADER or
+                         mm.find(_ITERATION_HEADER) != self._offsets[0]):
+                    self._reset()
+                # the last block may have been incomplete; re-index from it
+                if len(self._offsets) > 0:
+                    start = self._offsets[-1]
+                    self._offsets.pop()
+                    self._iteration_numbers.pop()
+                else:
+                    start = 0
+                first_new = len(self._offsets)
+                pos = mm.find(_ITERATION_HEADER, start)
+                while pos >= 0:
+                    line_end = mm.find(b'\n', pos)
+                    if line_end < 0:
+                        # header line not complete yet
+                        break
+                    number = mm[pos:line_end].split(b':')[-1].strip()
+                    self._offsets.append(pos)
+                    self._iteration_numbers.append(int(number))
+                    pos = mm.find(_ITERATION_HEADER, line_end)
+
+                ends = self._offsets[first_new + 1:] + [size]
+                parsed = []
+                for i in range(first_new, len(self._offsets)):
+                    text = mm[self._offsets[i]:ends[i - first_new]]\
+                        .decode('ascii', 'replace')
+                    self._blocks[self._iteration_numbers[i]] = \
+                        self._parse_iteration(text)
+                    parsed.append(self._iteration_numbers[i])
+            finally:
+                mm.close()
+        self._size = size
+        self._mtime_ns = stat.st_mtime_ns
+        return parsed
+
+    def _parse_iteration(self, text):
+        ''' Parse the text of one optimisation iteration block
+        '''
+        block = {'model_calls': np.nan, 'starting_phi': np.nan,
+                 'meas_phi': np.nan, 'regul_phi': np.nan,
+                 'phi_components': {}, 'lambdas': [], 'parameters': {},
+                 'max_change': np.nan, 'max_change_type': None,
+                 'max_change_par': None}
+
+        match = _model_calls.search(text)
+        if match is not None:
+            block['model_calls'] = int(match.group(1))
+        match = _meas_phi.search(text)
+        if match is not None:
+            block['meas_phi'] = _float(match.group(1))
+        match = _regul_phi.search(text)
+        if match is not None:
+            block['regul_phi'] = _float(match.group(1))
+
+        match = _starting_phi.search(text)
+        if match is not None:
+            block['starting_phi'] = _float(match.group(1))
+            block['phi_components'] = dict(
+                (group.lower(), _float(phi))
+                for group, phi in _contribution.findall(match.group(2)))
+
+        for lam, lines in _lambda.findall(text):
+            phi = _lambda_phi.search(lines)
+            meas = _lambda_meas.search(lines)
+            regul = _lambda_regul.search(lines)
+            block['lambdas'].append(
+                (_float(lam),
+                 np.nan if phi is None else _float(phi.group(1)),
+                 np.nan if phi is None else _float(phi.group(2)),
+                 np.nan if meas is None else _float(meas.group(1)),
+                 np.nan if regul is None else _float(regul.group(1))))
+
+        match = _parameters.search(text)
+        if match is not None:
+            for line in match.group(1).splitlines():
+                raw = line.split()
+                block['parameters'][raw[0].lower()] = _float(raw[1])
+
+        match = _max_change.search(text)
+        if match is not None:
+            block['max_change_type'] = match.group(1)
+            block['max_change'] = _float(match.group(2))
+            block['max_change_par'] = match.group(3).lower()
+        return block
+
+    @property
+    def iterations(self):
+        iterations = sorted(self._blocks.keys())
+        offsets = dict(zip(self._iteration_numbers, self._offsets))
+        df = pd.DataFrame({'offset': [offsets[i] for i in iterations],
+                           'model_calls': [self._blocks[i]['model_calls'] for i in iterations],
+                           'starting_phi': [self._blocks[i]['starting_phi'] for i in iterations],
+                           'meas_phi': [self._blocks[i]['meas_phi'] for i in iterations],
+                           'regul_phi': [self._blocks[i]['regul_phi'] for i in iterations],
+                           'n_lambdas': [len(self._blocks[i]['lambdas']) for i in iterations],
+                           'max_change': [self._blocks[i]['max_change'] for i in iterations],
+                           'max_change_type': [self._blocks[i]['max_change_type'] for i in iterations],
+                           'max_change_par': [self._blocks[i]['max_change_par'] for i in iterations]},
+                          index=pd.Index(iterations, name='Pest iteration'))
+        # runs made during each iteration, from the model call count at the
+        # start of the next iteration
+        df['runs'] = df['model_calls'].shift(-1) - df['model_calls']
+        return df
+
+    @property
+    def phi_components(self):
+        iterations = sorted(self._blocks.keys())
+        df = pd.DataFrame([self._blocks[i]['phi_components'] for i in iterations],
+                          index=pd.Index(iterations, name='Pest iteration'))
+        return df
+
+    @property
+    def lambdas(self):
+        records = [(i,) + lam for i in sorted(self._blocks.keys())
+                   for lam in self._blocks[i]['lambdas']]
+        return pd.DataFrame(records, columns=['Pest iteration', 'lambda', 'phi',
+                                              'phi_ratio', 'meas_phi', 'regul_phi'])
+
+    @property
+    def parameters(self):
+        iterations = sorted(self._blocks.keys())
+        df = pd.DataFrame([self._blocks[i]['parameters'] for i in iterations],
+                          index=pd.Index(iterations, name='Pest iteration'))
+        return df
+
+    def get_phi_components(self):
+        ''' Starting phi components of each iteration
+
+        Returns
+        -------
+        dict
+            {iteration number: {observation group: contribution}}
+            for the iterations with starting phi components
+        '''
+        return dict((i, self._blocks[i]['phi_components'])
+                    for i in sorted(self._blocks.keys())
+                    if len(self._blocks[i]['phi_components']) > 0)
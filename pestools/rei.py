@@ -4,8 +4,7 @@ import os
 import numpy as np
 import pandas as pd
 from .res import Res
-from .pest import Pest
-from matplotlib.backends.backend_pdf import PdfPages
+from .pest import Pest, _pest_context
 
 
 class Rei(object):
@@ -33,6 +32,13 @@ class Rei(object):
         column in obs_info_file containing observation types (e.g. heads, fluxes, etc). A single
         type ('observation') is assigned in the absence of type information
 
+    pest : Pest, optional
+        existing Pest context to share; it is also passed to the Res object made for each
+        rei file, so the control file and observation information are only read once
+
+    float32 : bool, default False
+        store the values of each rei file as float32 (see Res)
+
     Attributes
     ----------
     df : DataFrame
@@ -76,14 +82,21 @@ class Rei(object):
     def __init__(self, basename, obs_info_file=None, name_col='Name',
                  x_col='X', y_col='Y', type_col='Type',
                  basename_col='basename', datetime_col='datetime', group_cols=[],
-                 **kwds):
+                 pest=None, float32=False, **kwds):
 
         #Pest.__init__(self, basename, obs_info_file=obs_info_file)
         self.basename = basename
-        self._Pest = Pest(basename, obs_info_file=obs_info_file)
+        self._float32 = float32
+        self._Pest = _pest_context(pest, basename, obs_info_file=obs_info_file)
+        self.run_folder = self._Pest.run_folder
         self.obsinfo = self._Pest.obsinfo
         self.obs_groups = self._Pest.obs_groups
         self._obstypes = pd.DataFrame({'Type': ['observation'] * len(self.obs_groups)}, index=self.obs_groups)
+        if 'Type' in self.obsinfo.columns and 'Group' in self.obsinfo.columns:
+            types = self.obsinfo.drop_duplicates(subset='Group').set_index('Group')['Type']
+            self._obstypes.loc[types.index.intersection(self._obstypes.index), 'Type'] = types
+        self.reggroups = [g for g in self.obs_groups if g.startswith('regul')]
+        self.obsgroups = [g for g in self.obs_groups if not g.startswith('regul')]
 
         #self.phi = self.obsinfo.copy()
         self.phi = pd.DataFrame()
@@ -92,7 +105,7 @@ class Rei(object):
         self.phi_by_component = pd.DataFrame()
 
         # list rei files for run
-        reifiles = [f for f in os.listdir(os.path.split(basename)[0])
+        reifiles = [f for f in os.listdir(self.run_folder)
                     if os.path.split(basename)[1] + '.rei' in f]
 
         # sort by iteration number (may not be the most elegant approach)
@@ -106,9 +119,26 @@ class Rei(object):
         # for SVDA runs, may not have .0 (initial) rei file. Get rei file for base run.
         if 0 not in list(self.reifiles.keys()):
             self._read_svda()
-            self.reifiles[0] = os.path.join(self.run_folder, self.BASEPESTFILE[:-4] + '.rei')
+            if self.BASEPESTFILE is not None:
+                rei = os.path.join(self.run_folder, self.BASEPESTFILE[:-4] + '.rei')
+                if os.path.exists(rei):
+                    self.reifiles[0] = rei
+
+    def _read_svda(self):
+        """Read the base PEST control file name from the svd assist section of the
+        control file (None if this isn't an SVD-assisted run)
+        """
+        self.BASEPESTFILE = None
+        if not os.path.exists(self._Pest.pstfile):
+            return
+        with open(self._Pest.pstfile) as f:
+            for line in f:
+                if line.strip().lower() == '* svd assist':
+                    self.BASEPESTFILE = f.readline().strip()
+                    break
 
     def plot_one2ones(self, groupinfo, outpdf='', **kwds):
+        from matplotlib.backends.backend_pdf import PdfPages
 
         if len(outpdf) == 0:
             outpdf = self.basename + '_reis.pdf'
@@ -117,7 +147,7 @@ class Rei(object):
         pdf = PdfPages(outpdf)
         for i in self.reifiles.keys():
             print('{}'.format(self.reifiles[i]))
-            r = Res(self.reifiles[i])
+            r = Res(self.reifiles[i], pest=self._Pest, float32=self._float32)
             fig, ax = r.plot_one2one(groupinfo, title='Iteration {}'.format(i), **kwds)
 
             pdf.savefig(fig, **kwds)
@@ -126,33 +156,26 @@ class Rei(object):
 
     def get_phi(self):
         print('getting phi by group for each iteration...')
-        for i in self.reifiles.keys():
+        for i in sorted(self.reifiles.keys()):
             print('{}'.format(self.reifiles[i]))
-            r = Res(self.reifiles[i])
-            phi = r.phi.Weighted_Sq_Residual
-            #phi.name = i
-            self.phi[i] = phi
-            #self.phi = self.phi.append(phi.T)
-            #self.phi_by_group = self.phi_by_group.append(phi.T)
-            #self.phi_by_group.index.name = 'Pest iteration'
+            r = Res(self.reifiles[i], pest=self._Pest, float32=self._float32)
+            self.phi[i] = r.column('Weighted_Sq_Residual')
+            self.phi_by_group.loc[i] = r.phi_by_group.Weighted_Sq_Residual
+        self.phi_by_group.index.name = 'Pest iteration'
+        self.phi_by_group = self.phi_by_group.fillna(0.).astype(float)
 
         # get phi just for observation groups
-        self.phi_obs_by_group = self.phi_by_group.ix[:, self.obsgroups]
+        self.phi_obs_by_group = self.phi_by_group.loc[:, self.obsgroups]
 
         # get phi by observation type for each iteration
         for type in np.unique(self._obstypes.Type):
             typegroups = self._obstypes[self._obstypes.Type == type].index.tolist()
-            self.phi_by_type[type] = self.phi_by_group.ix[:, typegroups].sum(axis=1)
+            self.phi_by_type[type] = self.phi_by_group.loc[:, typegroups].sum(axis=1)
             self.phi_by_type.index.name = 'Pest iteration'
 
         # get phi by component for each iteration
         self.phi_by_component['Measurement Phi'] = self.phi_obs_by_group.sum(axis=1)
         if len(self.reggroups) > 0:
-            self.phi_by_component['Regularisation Phi'] = self.phi_by_group.ix[:, self.reggroups].sum(axis=1)
+            self.phi_by_component['Regularisation Phi'] = self.phi_by_group.loc[:, self.reggroups].sum(axis=1)
         self.phi_by_component['Phi Total'] = self.phi_by_component.sum(axis=1)
         self.phi_by_component.index.name = 'Pest iteration'
-
-
-
-
-
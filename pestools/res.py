@@ -1,8 +1,8 @@
-import matplotlib.pyplot as plt
 import math
 import pandas as pd
-from . import plots
-from .pest import Pest
+from .pest import Pest, _pest_context
+from .pst_handler import read_resfile
+from . import metrics
 import numpy as np
 #from pst_handler import pst as Pst
 
@@ -31,10 +31,26 @@ class Res(object):
         column in obs_info_file containing observation types (e.g. heads, fluxes, etc). A single
         type ('observation') is assigned in the absence of type information
 
+    basename_col : str, default 'basename'
+        column in obs_info_file containing the site of each observation in a time series
+
+    datetime_col : str, default 'datetime'
+        column in obs_info_file containing the time of each observation in a time series
+
+    pest : Pest, optional
+        existing Pest context to share (with its cached control file and observation
+        information) instead of creating a new one from res_file
+
+    float32 : bool, default False
+        store the residuals file values and derived columns as float32, halving
+        their memory (phi is still summed in float64)
+
     Attributes
     ----------
     df : DataFrame
-        contains all of the information from the res or rei file; is used to build phi dataframe
+        contains all of the information from the res or rei file, with the derived
+        Weighted_Residual, Absolute_Residual, Weighted_Absolute_Residual and
+        Weighted_Sq_Residual columns; is used to build phi dataframe
 
     phi : DataFrame
         contains phi contribution by group, and also a column with observation type
@@ -48,20 +64,26 @@ class Res(object):
 
     Column names in the observation information file are remapped to their default values after import
 
+    The derived columns, phi and phi_by_group are computed on first access and cached; column()
+    computes just the derived column asked for.
+
     """
 
+    _derived = ['Weighted_Residual', 'Absolute_Residual', 'Weighted_Absolute_Residual',
+                'Weighted_Sq_Residual']
+
     def __init__(self, res_file, obs_info_file=None, name_col='Name',
                  x_col='X', y_col='Y', type_col='Type',
                  basename_col='basename', datetime_col='datetime', group_cols=[],
-                 obs_info_kwds={},
+                 obs_info_kwds={}, pest=None, float32=False,
                  **kwds):
 
         # Expose the Pest class for convience but not all attributes make sense
         # when dealing with the Res class alone so make private
-        self._Pest = Pest(res_file, obs_info_file=obs_info_file, name_col=name_col,
-                                           x_col=x_col, y_col=y_col, type_col=type_col,
-                                           basename_col=basename_col, datetime_col=datetime_col,
-                                           group_cols=group_cols, obs_info_kwds=obs_info_kwds)
+        self._Pest = _pest_context(pest, res_file, obs_info_file=obs_info_file, name_col=name_col,
+                                   x_col=x_col, y_col=y_col, type_col=type_col,
+                                   basename_col=basename_col, datetime_col=datetime_col,
+                                   group_cols=group_cols, obs_info_kwds=obs_info_kwds)
         '''
         if obs_info_file is not None:
             self._Pest._read_obs_info_file(obs_info_file=obs_info_file, name_col=name_col,
@@ -79,30 +101,79 @@ class Res(object):
             #self._obstypes = pd.DataFrame({'Type': ['observation'] * len(self.obs_groups)}, index=self.obs_groups)
 
 
-        check = open(res_file, 'r')
-        line_num = 0
-        while True:
-            current_line = check.readline()
-            if "name" in current_line.lower() and "residual" in current_line.lower():
-                break
-            else:
-                line_num += 1
+        self._dtype = np.float32 if float32 else np.float64
+        self._df = read_resfile(res_file, lowercase_columns=False)
+        self._df.index = self._df['Name'].values
+        if float32:
+            for c in self._df.columns[self._df.dtypes == np.float64]:
+                self._df[c] = self._df[c].astype(np.float32)
 
-        self.df = pd.read_csv(res_file, skiprows=line_num, delim_whitespace=True)
-        self.df.index = [n.lower() for n in self.df['Name']]
+        # derived columns, phi and phi by group are computed on first access
+        self._phi = None
+        self._phi_by_group = None
+        self._spatial = None
+        self._timeseries = None
 
-        # Apply weighted residual and calculate phi contributions
-        self.df['Weighted_Residual'] = self.df['Residual'] * self.df['Weight']
-        self.df['Absolute_Residual'] = abs(self.df['Residual'])
-        self.df['Weighted_Absolute_Residual'] = self.df['Absolute_Residual'] * self.df['Weight']
+    @property
+    def df(self):
+        for name in self._derived:
+            self.column(name)
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        self._df = df
+        self._phi = None
+        self._phi_by_group = None
+        self._spatial = None
+        self._timeseries = None
+
+    def column(self, name):
+        ''' Get a column of the residuals DataFrame, computing the derived
+        residual columns on first access
 
-        # calculate phi
-        self.df['Weighted_Sq_Residual'] = self.df['Weighted_Residual']**2
-        self.phi = self.df[['Weighted_Sq_Residual']].join(self.obsinfo)
-        self.phi_by_group = self.df.groupby('Group').agg('sum')[['Weighted_Sq_Residual']]
-        self.phi_by_group['Percent'] = (self.phi_by_group['Weighted_Sq_Residual']/self.phi_by_group['Weighted_Sq_Residual'].sum())*100
-        #self.phi_by_group = self.phi_by_group.join(self._obstypes)
+        Parameters
+        ----------
+        name : str
+            column name; one of the residuals file columns or
+            Weighted_Residual, Absolute_Residual, Weighted_Absolute_Residual
+            or Weighted_Sq_Residual
 
+        Returns
+        --------
+        pandas Series
+
+        '''
+        df = self._df
+        if name not in df.columns:
+            if name == 'Weighted_Residual':
+                values = df['Residual'].values * df['Weight'].values
+            elif name == 'Absolute_Residual':
+                values = np.abs(df['Residual'].values)
+            elif name == 'Weighted_Absolute_Residual':
+                values = self.column('Absolute_Residual').values * df['Weight'].values
+            elif name == 'Weighted_Sq_Residual':
+                values = self.column('Weighted_Residual').values**2
+            else:
+                raise KeyError(name)
+            df[name] = values.astype(self._dtype, copy=False)
+        return df[name]
+
+    @property
+    def phi(self):
+        if self._phi is None:
+            self._phi = self.column('Weighted_Sq_Residual').to_frame().join(self.obsinfo)
+        return self._phi
+
+    @property
+    def phi_by_group(self):
+        if self._phi_by_group is None:
+            wss = self.column('Weighted_Sq_Residual').astype(np.float64)
+            phi_by_group = wss.groupby(self._df['Group'], observed=True).sum().to_frame()
+            phi_by_group['Percent'] = (phi_by_group['Weighted_Sq_Residual'] /
+                                       phi_by_group['Weighted_Sq_Residual'].sum()) * 100
+            self._phi_by_group = phi_by_group
+        return self._phi_by_group
 
     def group(self, group):
         ''' Get pandas DataFrame for a single group
@@ -118,7 +189,7 @@ class Res(object):
             DataFrame of residuals for group
 
         '''       
-        return self.df.ix[self.df['Group'] == group]
+        return self.df.loc[self.df['Group'] == group]
 
     def describe_data(self, data, ddof=1):
         ''' Basic desription of np array
@@ -134,43 +205,140 @@ class Res(object):
             DataFrame of residuals for group
 
         '''
-        from scipy.stats import shapiro
-
-        data = data.ravel() # flatten to one dimmensional array
-        data = data[~np.isnan(data)] # drop nans
-
-        stats = {}
-        stats['n'] = len(data)
-        stats['Range'] = np.max(data) - np.min(data)
-        stats['Max'] = np.max(data)
-        stats['Min'] = np.min(data)
-        stats['Mean'] = np.mean(data)
-        stats['Standard deviation'] = np.std(data, ddof=ddof)
-        stats['Varience'] = np.var(data, ddof=ddof)
-        stats['25%'] = np.percentile(data, 25)
-        stats['50%'] = np.percentile(data, 50)
-        stats['75%'] = np.percentile(data, 75)
-        stats['Max (absolute)'] = np.max(np.abs(data))
-        stats['Min (absolute)'] = np.min(np.abs(data))
-        stats['MAE'] = np.mean(np.abs(data))
-        stats['RMSE']= np.sqrt(((data)**2).mean())
-        stats['RMSE/range'] = stats['RMSE'] / stats['Range']
-
-        # perform the Shapiro-Wilks test for normality of the residuals
-        if stats['n'] > 2:
-            W, p = shapiro(data)
-        else:
-            p = -1
+        data = np.asarray(data, dtype=np.float64).ravel() # flatten to one dimmensional array
+        m = metrics.group_metrics(pd.DataFrame({'Residual': data}),
+                                  by=np.zeros(len(data), dtype=int), ddof=ddof, normality=True)
+        return self._describe(m).iloc[0].to_dict()
+
+    def _residual_stats(self, keys, mask, ddof=1, normality=True):
+        """ Summary statistics of the residuals for each key, for the
+        observations in mask, in the layout of Res.description
+        """
+        m = metrics.group_metrics(self._df.loc[mask, ['Residual']], by=np.asarray(keys)[mask],
+                                  ddof=ddof, normality=normality)
+        return self._describe(m)
 
-        if p > 0.05:
-            stats['Normally Distributed'] = False
-        elif 0 <= p < 0.05:
-            stats['Normally Distributed'] = True
-        else:
-            stats['Normally Distributed'] = np.nan
+    def _describe(self, m):
+        """ Res.description layout of residual metrics from group_metrics
+        """
+        stats = pd.DataFrame({'n': m['n'],
+                              'Range': m['Residual_Range'],
+                              'Max': m['Residual_Max'],
+                              'Min': m['Residual_Min'],
+                              'Mean': m['Residual_Mean'],
+                              'Standard deviation': m['Residual_Std'],
+                              'Varience': m['Residual_Std']**2,
+                              '25%': m['Residual_25%'],
+                              '50%': m['Residual_50%'],
+                              '75%': m['Residual_75%'],
+                              'Max (absolute)': m['Absolute_Residual_Max'],
+                              'Min (absolute)': m['Absolute_Residual_Min'],
+                              'MAE': m['MAE'],
+                              'RMSE': m['RMSE'],
+                              'RMSE/range': m['RMSE'] / m['Residual_Range']})
+        if 'Normality_p' in m.columns:
+            p = m['Normality_p'].fillna(-1.).values
+            normal = pd.Series(p > 0.05, index=stats.index).astype(object)
+            stats['Normally Distributed'] = normal.where(p >= 0, np.nan)
+            stats['p-value'] = p
+        stats.index.name = None
+        return stats
 
-        stats['p-value'] = p
+    def metrics(self, df=None, by='Group', groups=None, exclude_zero=False,
+                drop_regul=False, ddof=1, normality=False):
+        """ Goodness-of-fit metrics of the residuals for each group
 
+        Parameters
+        ----------
+        df : DataFrame, optional
+            residuals; default is Res.df
+
+        by : str or array, default 'Group'
+            column of df, or array of keys, to group by
+
+        groups : list, optional
+            observation groups to include. By default all groups are included.
+
+        exclude_zero : bool, default False
+            exclude zero-weighted observations
+
+        drop_regul : bool, default False
+            exclude regularisation groups
+
+        ddof : int (optional)
+            delta degrees of freedom for the standard deviations
+
+        normality : bool, default False
+            include the Shapiro-Wilk test p-value of the residuals
+
+        Returns
+        -------
+        DataFrame of metrics (columns) for each group (index); see
+        pestools.metrics.group_metrics
+        """
+        if df is None:
+            df = self._df
+        mask = np.ones(len(df), dtype=bool)
+        if groups is not None or drop_regul:
+            group = df['Group'].astype(str).str.lower()
+            if groups is not None:
+                mask &= group.isin([g.lower() for g in groups]).values
+            if drop_regul:
+                mask &= ~group.str.contains('regul').values
+        if exclude_zero:
+            mask &= df['Weight'].values > 0
+        keys = df[by].values if isinstance(by, str) else np.asarray(by)
+        columns = [c for c in ['Measured', 'Modelled', 'Residual', 'Weight'] if c in df.columns]
+        result = metrics.group_metrics(df.loc[mask, columns], by=keys[mask], ddof=ddof,
+                                       normality=normality)
+        result.index.name = by if isinstance(by, str) else None
+        return result
+
+    def describe_by_group(self, groups=None, exclude_zero=False, drop_regul=True,
+                          ddof=1, normality=True):
+        """ Summary statistics of the residuals for each observation group
+
+        Parameters
+        ----------
+        groups : list, optional
+            groups to include. By default all groups are included.
+
+        exclude_zero : bool, default False
+            exclude zero-weighted observations
+
+        drop_regul : bool, default True
+            exclude regularisation groups
+
+        ddof : int (optional)
+            delta degrees of freedom for the standard deviation and variance
+
+        normality : bool, default True
+            include the Shapiro-Wilk test for normality of the residuals
+            (p-value, and Normally Distributed if p > 0.05)
+
+        Returns
+        -------
+        DataFrame of summary statistics (columns) for each group (index)
+
+        Notes
+        ------
+        The statistics for all groups are computed from a single groupby of
+        the residuals, with the group, regularisation and zero weight filters
+        applied once as masks.
+        """
+        codes, uniques = pd.factorize(self._df['Group'])
+        names = np.array([str(g).lower() for g in uniques])
+        include = np.ones(len(uniques), dtype=bool)
+        if groups is not None:
+            include &= np.isin(names, [g.lower() for g in groups])
+        if drop_regul:
+            include &= np.array(['regul' not in g for g in names], dtype=bool)
+        mask = (codes >= 0) & include[codes]
+        if exclude_zero:
+            mask &= self._df['Weight'].values > 0
+        stats = self._residual_stats(np.asarray(uniques, dtype=object)[codes], mask,
+                                     ddof=ddof, normality=normality)
+        stats.index.name = 'Group'
         return stats
 
     def describe_groups(self, groups, exclude_zero=True, ddof=1):
@@ -188,77 +356,58 @@ class Res(object):
         -------
         Series of summary statistics for group
         """
-        from scipy.stats import shapiro
-
-        # index to supplied groups
-        if isinstance(groups, list):
-            groups = [g.lower() for g in groups]
-            inds = [True if g in groups else False for g in self.df.Group]
-            df = self.df.ix[inds, :]
-        else:
-            df = self.df.ix[self.df.Group == groups.lower(), :]
+        if not isinstance(groups, list):
+            groups = [groups]
+        groups = [g.lower() for g in groups]
+        group = self._df['Group'].str.lower()
 
-        # drop any regularisation
-        obs = [True if 'regul' not in g else False for g in df.Group]
-        df = df.ix[obs, :]
-
-        # drop zero weighted observations
+        # drop any regularisation and (optionally) zero weighted observations
+        mask = group.isin(groups).values & ~group.str.contains('regul').values
         if exclude_zero:
-            nonzero = [True if w > 0 else False for w in df.Weight]
-            df = df.ix[nonzero, :]
-
-        stats = pd.DataFrame()
-        stats = stats.append(df['Residual'].describe().copy())
-        stats.index = ['Group summary']
-        stats.columns = [c.capitalize() for c in stats.columns]
-        stats.rename(columns={'Count': 'n'}, inplace=True)
-
-        # range, variance, and std
-        stats['Range'] = stats['Max'] - stats['Min']
-        stats['Standard deviation'] = df.Residual.std(ddof=ddof)
-        stats['Varience'] = df.Residual.var(ddof=ddof)
-
-        # absolute max, min amd mean
-        stats['Max (absolute)'] = df.Absolute_Residual.max()
-        stats['Min (absolute)'] = df.Absolute_Residual.min()
-        stats['MAE'] = df.Absolute_Residual.mean()
-
-        # rmse
-        stats['RMSE'] = np.sqrt(((df['Residual'].values)**2).mean())
-        stats['RMSE/range'] = stats['RMSE'] / stats['Range']
-
-        # perform the Shapiro-Wilks test for normality of the residuals
-        if len(df.Residual) > 2:
-            W, p = shapiro(df.Residual)
-        else:
-            p = -1
-
-        if p > 0.05:
-            stats['Normally Distributed'] = False
-        elif 0 <= p < 0.05:
-            stats['Normally Distributed'] = True
-        else:
-            stats['Normally Distributed'] = np.nan
+            mask &= self._df['Weight'].values > 0
 
-        stats['p-value'] = p
-
-        # clean-up the ordering
-        stats = stats.T.ix[['n', 'Range', 'Max', 'Min', 'Mean', 'Standard deviation', 'Varience', '25%', '50%', '75%',
-                          'Max (absolute)', 'Min (absolute)', 'MAE', 'RMSE', 'RMSE/range', 'Normally Distributed', 'p-value']]
-        return stats
+        stats = self._residual_stats(np.full(len(mask), 'Group summary', dtype=object), mask,
+                                     ddof=ddof)
+        return stats.reindex(['Group summary']).T
 
     @property
-    def description(self, exclude_zero=False):
+    def description(self):
         """ Convenience method to summarize stats for each group
         """
-        groups = [g for g in np.unique(self.df.Group) if 'regul' not in g.lower()]
+        return self.describe_by_group()
 
-        df = pd.DataFrame()
-        for g in groups:
-
-            df[g] = self.describe_groups(g, exclude_zero=exclude_zero)['Group summary']
+    def _print_stats(self, group, stats):
+        print('-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*')
+        print('Observation Group: %s' % (group))
+        print('-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*')
+        print('Number of observations in group: %d' % (stats['n']))
+        print('-------Measured Stats------------------')
+        print('Minimum:   %10.4e  Maximum:   %10.4e' % (stats['Measured_Min'], stats['Measured_Max']))
+        print('Range:     %10.4e' % (stats['Measured_Range']))
+        print('-------Residual Stats------------------')
+        print('Mean:      %10.4e  Std Dev:    %10.4e' % (stats['Residual_Mean'], stats['Residual_Std']))
+        print('Minimum:   %10.4e  Maximum:    %10.4e' % (stats['Residual_Min'], stats['Residual_Max']))
+        print('RMSE:      %10.4e  RMSE/Range: %10.4e' % (stats['RMSE'], stats['RMSE/Measured_Range']))
+        print('Range:     %10.4e' % (stats['Residual_Range']))
+        print('-------Absolute Residual Stats---------')
+        print('Mean:      %10.4e  Std Dev:   %10.4e' % (stats['Absolute_Residual_Mean'],
+                                                        stats['Absolute_Residual_Std']))
+        print('Minimum:   %10.4e  Maximum:   %10.4e' % (stats['Absolute_Residual_Min'],
+                                                        stats['Absolute_Residual_Max']))
+        print('Range:     %10.4e' % (stats['Absolute_Residual_Range']))
+        print('-------Weighted Residual Stats---------')
+        print('Mean:      %10.4e  Std Dev:   %10.4e' % (stats['Weighted_Residual_Mean'],
+                                                        stats['Weighted_Residual_Std']))
+        print('Minimum:   %10.4e  Maximum:   %10.4e' % (stats['Weighted_Residual_Min'],
+                                                        stats['Weighted_Residual_Max']))
+        print('Range:     %10.4e' % (stats['Weighted_Residual_Range']))
+        print(' ')
 
-        return df.T
+    def _print_metrics(self, groups=None):
+        stats = self.metrics(groups=groups, ddof=0)
+        # RMSE/Range is undefined for groups measured at a single value
+        stats.loc[stats['Measured_Range'] <= 0, 'RMSE/Measured_Range'] = np.nan
+        return stats
 
     def print_stats(self, group):
         ''' Return stats for single group
@@ -274,65 +423,12 @@ class Res(object):
             DataFrame of statistics
             
         '''       
-        group_df = self.df.ix[self.df['Group'] == group.lower()]
-        # Basic info
-        count = group_df.count()['Group']
-        min_measured = group_df.describe()['Measured'].loc['min']
-        max_measured = group_df.describe()['Measured'].loc['max']
-        range_measured = max_measured - min_measured
-        min_model = group_df.describe()['Modelled'].loc['min']
-        max_model = group_df.describe()['Modelled'].loc['max']
-        range_model = max_model - min_model
-        
-        # Residual Stats
-        mean_res = group_df['Residual'].values.mean()
-        min_res = group_df['Residual'].values.min()
-        max_res = group_df['Residual'].values.max()
-        std_res = group_df['Residual'].values.std()
-        range_res = max_res - min_res
-            
-        # Weighted Residual Stats
-        mean_w_res = group_df['Weighted Residual'].values.mean()
-        min_w_res = group_df['Weighted Residual'].values.min()
-        max_w_res = group_df['Weighted Residual'].values.max()
-        std_w_res = group_df['Weighted Residual'].values.std()
-        range_w_res = max_w_res - min_w_res
-        
-        # Absolute Residual Stats
-        mean_abs_res = group_df['Absolute Residual'].values.mean()
-        min_abs_res = group_df['Absolute Residual'].values.min()
-        max_abs_res = group_df['Absolute Residual'].values.max()
-        std_abs_res = group_df['Absolute Residual'].values.std()
-        range_abs_res = max_abs_res - min_abs_res
-        
-        # Root Mean Square Error
-        rmse = math.sqrt(((group_df['Residual'].values)**2).mean())
-        
-        # RMSE/measured range
-        rmse_over_range = rmse/float(range_measured)
-        
-        print('-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*')
-        print('Observation Group: %s' % (group))
-        print('-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*')
-        print('Number of observations in group: %d' % (count))
-        print('-------Measured Stats------------------')
-        print('Minimum:   %10.4e  Maximum:   %10.4e' % (min_measured, max_measured))
-        print('Range:     %10.4e' % (range_measured))
-        print('-------Residual Stats------------------')
-        print('Mean:      %10.4e  Std Dev:    %10.4e' % (mean_res, std_res))
-        print('Minimum:   %10.4e  Maximum:    %10.4e' % (min_res, max_res))
-        print('RMSE:      %10.4e  RMSE/Range: %10.4e' % (rmse, rmse_over_range))
-        print('Range:     %10.4e' % (range_res))
-        print('-------Absolute Residual Stats---------')
-        print('Mean:      %10.4e  Std Dev:   %10.4e' % (mean_abs_res, std_abs_res))
-        print('Minimum:   %10.4e  Maximum:   %10.4e' % (min_abs_res, max_abs_res))
-        print('Range:     %10.4e' % (range_abs_res))
-        print('-------Weighted Residual Stats---------')
-        print('Mean:      %10.4e  Std Dev:   %10.4e' % (mean_w_res, std_w_res))
-        print('Minimum:   %10.4e  Maximum:   %10.4e' % (min_w_res, max_w_res))
-        print('Range:     %10.4e' % (range_w_res))
-        print(' ')
-        
+        stats = self._print_metrics(groups=[group])
+        if len(stats) == 0:
+            raise KeyError('observation group {} not in the residuals file'.format(group))
+        self._print_stats(group, stats.iloc[0])
+        return stats
+
     def compute_pct_diff(self, df=None):
         """Compute relative percent difference of residual compared to measured.
 
@@ -346,11 +442,8 @@ class Res(object):
         """
         if df is None:
             df = self.df
-        pct_diff = 100 * df.Residual/df.Measured
-        pct_diff[(df.Measured == 0)] = -100
-        pct_diff[(df.Modelled == 0)] = 100
-        pct_diff[(df.Measured == 0) & (df.Modelled == 0)] = 0
-        return pct_diff
+        return pd.Series(metrics.pct_diff(df['Measured'].values, df['Modelled'].values,
+                                          df['Residual'].values), index=df.index)
 
     def print_stats_all(self):
         ''' Return stats for each observation group
@@ -360,71 +453,56 @@ class Res(object):
         Stats for each group printed to screen
         
         '''
-        grouped = self.df.groupby('Group')
-        group_keys = list(grouped.groups.keys())
-        for key in group_keys:
-            group_df = self.df.ix[self.df['Group'] == key]
-            # Basic info
-            count = group_df.count()['Group']
-            min_measured = group_df.describe()['Measured'].loc['min']
-            max_measured = group_df.describe()['Measured'].loc['max']
-            range_measured = max_measured - min_measured
-            min_model = group_df.describe()['Modelled'].loc['min']
-            max_model = group_df.describe()['Modelled'].loc['max']
-            range_model = max_model - min_model
-            
-            # Residual Stats
-            mean_res = group_df['Residual'].values.mean()
-            min_res = group_df['Residual'].values.min()
-            max_res = group_df['Residual'].values.max()
-            std_res = group_df['Residual'].values.std()
-            range_res = max_res - min_res
-                
-            # Weighted Residual Stats
-            mean_w_res = group_df['Weighted Residual'].values.mean()
-            min_w_res = group_df['Weighted Residual'].values.min()
-            max_w_res = group_df['Weighted Residual'].values.max()
-            std_w_res = group_df['Weighted Residual'].values.std()
-            range_w_res = max_w_res - min_w_res
-            
-            # Absolute Residual Stats
-            mean_abs_res = group_df['Absolute Residual'].values.mean()
-            min_abs_res = group_df['Absolute Residual'].values.min()
-            max_abs_res = group_df['Absolute Residual'].values.max()
-            std_abs_res = group_df['Absolute Residual'].values.std()
-            range_abs_res = max_abs_res - min_abs_res
-            
-            # Root Mean Square Error
-            rmse = math.sqrt(((group_df['Residual'].values)**2).mean())
-            
-            # RMSE/measured range
-            if range_measured > 0.0:
-                rmse_over_range = rmse/float(range_measured)
-            else:
-                rmse_over_range = np.nan
-            
-            print('-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*')
-            print('Observation Group: %s' % (key))
-            print('-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*-*')
-            print('Number of observations in group: %d' % (count))
-            print('-------Measured Stats------------------')
-            print('Minimum:   %10.4e  Maximum:   %10.4e' % (min_measured, max_measured))
-            print('Range:     %10.4e' % (range_measured))
-            print('-------Residual Stats------------------')
-            print('Mean:      %10.4e  Std Dev:    %10.4e' % (mean_res, std_res))
-            print('Minimum:   %10.4e  Maximum:    %10.4e' % (min_res, max_res))
-            print('RMSE:      %10.4e  RMSE/Range: %10.4e' % (rmse, rmse_over_range))
-            print('Range:     %10.4e' % (range_res))
-            print('-------Absolute Residual Stats---------')
-            print('Mean:      %10.4e  Std Dev:   %10.4e' % (mean_abs_res, std_abs_res))
-            print('Minimum:   %10.4e  Maximum:   %10.4e' % (min_abs_res, max_abs_res))
-            print('Range:     %10.4e' % (range_abs_res))
-            print('-------Weighted Residual Stats---------')
-            print('Mean:      %10.4e  Std Dev:   %10.4e' % (mean_w_res, std_w_res))
-            print('Minimum:   %10.4e  Maximum:   %10.4e' % (min_w_res, max_w_res))
-            print('Range:     %10.4e' % (range_w_res))
-            print(' ')
+        stats = self._print_metrics()
+        for key, row in stats.iterrows():
+            self._print_stats(key, row)
+        return stats
+
+    def phi_contributions(self, df=None, by='Group', drop_regul=False):
+        ''' Contribution of each group to the objective function
+
+        Parameters
+        ----------
+        df : DataFrame, optional
+            residuals DataFrame, e.g. a copy of Res.df with adjusted weights.
+            Phi is computed from its Residual and Weight columns (or
+            Weighted_Residual if they aren't there). Default is Res.df
+
+        by : str, default 'Group'
+            column of df, or of the observation information, to group by
 
+        drop_regul : bool, default False
+            ignore regularisation groups
+
+        Returns
+        -------
+        pandas DataFrame
+            Phi and Percent of the total for each group, sorted by
+            decreasing contribution
+        '''
+        if df is None:
+            df = self._df
+            if 'Residual' not in df.columns:
+                df = self.df
+        if 'Residual' in df.columns and 'Weight' in df.columns:
+            wss = (df['Residual'].values * df['Weight'].values)**2
+        else:
+            wss = df['Weighted_Residual'].values**2
+        if by in df.columns:
+            keys = df[by].values
+        else:
+            keys = self.obsinfo[by].reindex(df.index).values
+
+        mask = np.ones(len(df), dtype=bool)
+        if drop_regul:
+            mask = ~df['Group'].astype(str).str.lower().str.startswith('regul').values
+        codes, uniques = pd.factorize(keys[mask])
+        observed = codes >= 0
+        phi = np.bincount(codes[observed], wss[mask][observed], minlength=len(uniques))
+
+        contributions = pd.DataFrame({'Phi': phi, 'Percent': phi / phi.sum() * 100},
+                                     index=pd.Index(np.asarray(uniques), name=by))
+        return contributions.sort_values('Phi', ascending=False, kind='mergesort')
 
     def plot_objective_contrib (self, df=None, drop_regul=False):
         ''' Plot the contribution of each group to the objective function 
@@ -439,53 +517,19 @@ class Res(object):
         Does not plot observation group is contribution is less than 1%.  This
         is to make the plot easier to read.
         '''
+        import matplotlib.pyplot as plt
 
-        # Allow any residuals dataframe to be submitted as argument
-        if df is None:
-            df = self.df.copy()
-
-
-
-
-        contributions = []
-        groups = []
-        grouped = df.groupby('Group')
-        group_keys = list(grouped.groups.keys())
-        for key in group_keys:
-            if drop_regul:
-                if key.lower().startswith('regul'):
-                    pass
-                else:
-                    contributions.append((grouped.get_group(key)['Weighted_Residual']**2).sum())
-                    groups.append(key)
-            else:
-                contributions.append((grouped.get_group(key)['Weighted_Residual']**2).sum())
-                groups.append(key)
-        percents = (contributions / sum(contributions))*100
-        groups = np.array(groups)
-        data = np.rec.fromarrays([percents, groups])
-        data.sort()
-        data.dtype.names = ('Percent', 'Group')
-        # Get data where percent is greater than 1
         # Won't plot groups that fall into less than 1 percent category
-        greater_1_values = []
-        greater_1_groups = []
-        for i in data:
-            if i[0] > 1.0:
-                greater_1_values.append(i[0])
-                greater_1_groups.append(i[1]) 
+        contributions = self.phi_contributions(df, drop_regul=drop_regul)
+        contributions = contributions[contributions['Percent'] > 1.0].iloc[::-1]
+
         # Assign colors for each group
         color_map = plt.get_cmap('Set3')
-        color_dict = dict()
-        for i in range(len(greater_1_groups)):
-            color = color_map(1.*i/len(greater_1_groups))
-            color_dict[greater_1_groups[i]] = color
-        colors = []
-        for group in greater_1_groups:            
-            colors.append(color_dict[group])
+        colors = [color_map(1.*i/len(contributions)) for i in range(len(contributions))]
         retfig = plt.figure()
         cax = retfig.add_subplot(111, aspect='equal')
-        plt.pie(greater_1_values, labels=greater_1_groups, autopct='%1.1f%%', colors = colors, startangle=90)
+        plt.pie(contributions['Percent'].values, labels=contributions.index.tolist(),
+                autopct='%1.1f%%', colors=colors, startangle=90)
         return retfig
         
     def objective_contrib(self, df=None, return_data=False):
@@ -494,6 +538,9 @@ class Res(object):
         
         Parameters
         ----------
+        df : DataFrame, optional
+            residuals DataFrame (see phi_contributions); default is Res.df
+
         return_data : {False, True}, optional
             if True return data as a numpy structured array
             
@@ -501,31 +548,16 @@ class Res(object):
         -------
         None or Numpy array
         '''
-        # Allow any residuals dataframe to be submitted as argument
-        if df is None:
-            df = self.df
-
-        contributions = []
-        groups = []
-        grouped = self.df.groupby('Group')
-        group_keys = list(grouped.groups.keys())
-        for key in group_keys:
-            contributions.append((grouped.get_group(key)['Weighted_Residual']**2).sum())
-            groups.append(key)
-        percents = (contributions / sum(contributions))*100
-        groups = np.array(groups)
-        #it = np.nditer(percents, flags = ['multi_index'])
-        #while not it.finished:
-            #print percents[it.multi_index], groups[it.multi_index]
-            #it.iternext()
-        data = np.rec.fromarrays([percents, groups])
-        data.dtype.names = ('Percent', 'Group')
-        #data = np.rec.fromarrays([percents, groups], dtype = [('Percent', float), ('Group', str)])
-        data.sort()
-        for item in data:
-            print('%.2f%%   %s' % (item[0], item[1]))
+        contributions = self.phi_contributions(df)
+        percents = contributions['Percent'].values
+        groups = contributions.index.values.astype(str)
+        # increasing contribution, ties by group name
+        order = np.lexsort((groups, percents))
+        percents, groups = percents[order], groups[order]
+        for group, percent in zip(groups, percents):
+            print('%.2f%%   %s' % (percent, group))
         if return_data == True:
-            return data
+            return np.rec.fromarrays([percents, groups], names=('Percent', 'Group'))
         else:
             return None
 
@@ -549,6 +581,7 @@ class Res(object):
             matplotlib plot
 
         '''          
+        import matplotlib.pyplot as plt
         if groups == None:
             measured = self.df['Measured'].values
             modeled = self.df['Modelled'].values
@@ -615,6 +648,7 @@ class Res(object):
             matplotlib plot
         
         '''
+        import matplotlib.pyplot as plt
         if groups == None:
             measured = self.df['Measured'].values
             if weighted == False:
@@ -719,6 +753,7 @@ class Res(object):
         ------
 
         """
+        from . import plots
 
         # join in the obsinfo stuff if going to need error bars
         if error_bars_obs:
@@ -733,7 +768,7 @@ class Res(object):
 
         if len(print_stats) > 0:
 
-            stats = self.describe_groups(plot_obj.groups, exclude_zero=exclude_zero_stats).ix[print_stats]
+            stats = self.describe_groups(plot_obj.groups, exclude_zero=exclude_zero_stats).loc[print_stats]
             if not abbreviations:
                 stats.rename(index={'Mean': 'Mean error',
                                     'MAE': 'Mean absolute error',
@@ -797,12 +832,13 @@ class Res(object):
         ------
 
         """
+        from . import plots
         plot_obj = plots.HexbinPlot(self.df, 'Measured', 'Modelled', groupinfo, title=title,
                                     line_kwds=line_kwds, **kwds)
         plot_obj.generate()
 
         if len(print_stats) > 0:
-            stats = self.describe_groups(plot_obj.groups, exclude_zero=exclude_zero_stats).ix[print_stats]
+            stats = self.describe_groups(plot_obj.groups, exclude_zero=exclude_zero_stats).loc[print_stats]
             text = ''.join(['{}: {:{fmt}}\n'.format(i, r['Group summary'], fmt=print_format) for i, r in stats.iterrows()])
             plot_obj.ax.text(0.05, 0.95, text, transform=plot_obj.ax.transAxes, va='top', ha='left')
 
@@ -836,6 +872,7 @@ class Res(object):
         ------
 
         """
+        from . import plots
         kwds.update({'ylabel': 'Number of Observations', 'xlabel': 'Error',
                      })
         if df is None:
@@ -849,6 +886,382 @@ class Res(object):
         return plot_obj.fig, plot_obj.ax
 
 
+    def _spatial_index(self, groups=None):
+        """ KD-tree of the observation coordinates in obsinfo, and the positions
+        (rows of df) of the observations in the tree. The tree for all groups is
+        built once and cached.
+        """
+        if groups is None and self._spatial is not None:
+            return self._spatial
+        from scipy.spatial import cKDTree
+
+        if 'X' not in self.obsinfo.columns or 'Y' not in self.obsinfo.columns:
+            raise ValueError('spatial queries need observation X and Y coordinates; '
+                             'supply an obs_info_file with X and Y columns')
+        xy = self.obsinfo[['X', 'Y']].reindex(self._df.index).values.astype(np.float64)
+        located = ~np.isnan(xy).any(axis=1)
+        if groups is not None:
+            if isinstance(groups, str):
+                groups = [groups]
+            located &= self._df['Group'].isin([g.lower() for g in groups]).values
+        positions = np.flatnonzero(located)
+        spatial = (cKDTree(xy[positions]), positions)
+        if groups is None:
+            self._spatial = spatial
+        return spatial
+
+    def _spatial_result(self, positions, distances=None):
+        df = self.df.iloc[positions].copy()
+        if distances is not None:
+            df['Distance'] = distances
+        return df
+
+    def within_radius(self, x, y, radius, groups=None):
+        ''' Residuals of the observations within a distance of a point
+
+        Parameters
+        ----------
+        x, y : float
+            coordinates of the point (e.g. a pumping well)
+
+        radius : float
+            search distance, in the units of the obsinfo coordinates
+
+        groups : str or list, optional
+            only search these observation groups
+
+        Returns
+        --------
+        pandas DataFrame
+            residuals, with the distance to the point, sorted by distance
+        '''
+        tree, positions = self._spatial_index(groups)
+        found = np.array(tree.query_ball_point([x, y], radius), dtype=int)
+        distances = np.hypot(tree.data[found, 0] - x, tree.data[found, 1] - y)
+        order = np.argsort(distances, kind='mergesort')
+        return self._spatial_result(positions[found[order]], distances[order])
+
+    def nearest(self, x, y, k=1, groups=None):
+        ''' Residuals of the k observations nearest to a point
+
+        Parameters
+        ----------
+        x, y : float
+            coordinates of the point
+
+        k : int, default 1
+            number of observations
+
+        groups : str or list, optional
+            only search these observation groups
+
+        Returns
+        --------
+        pandas DataFrame
+            residuals, with the distance to the point, sorted by distance
+        '''
+        tree, positions = self._spatial_index(groups)
+        k = min(k, len(positions))
+        distances, found = tree.query([x, y], k=k)
+        distances, found = np.atleast_1d(distances), np.atleast_1d(found)
+        return self._spatial_result(positions[found], distances)
+
+    def within_bbox(self, xmin, ymin, xmax, ymax, groups=None):
+        ''' Residuals of the observations within a bounding box (e.g. the
+        extent of a model zone)
+
+        Returns
+        --------
+        pandas DataFrame
+            residuals of the observations in the box
+        '''
+        tree, positions = self._spatial_index(groups)
+        x, y = tree.data[:, 0], tree.data[:, 1]
+        inside = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+        return self._spatial_result(positions[inside])
+
+    def _spatial_pairs(self, col, groups, max_distance):
+        """ values of col at the located observations, and the pairs of
+        observations (i < j) within max_distance of each other with their
+        distances
+        """
+        tree, positions = self._spatial_index(groups)
+        values = self.column(col).values[positions].astype(np.float64)
+        pairs = tree.sparse_distance_matrix(tree, max_distance, output_type='ndarray')
+        pairs = pairs[pairs['i'] < pairs['j']]
+        return values, pairs['i'], pairs['j'], pairs['v']
+
+    def _default_max_distance(self, groups):
+        tree, positions = self._spatial_index(groups)
+        return np.hypot(*np.ptp(tree.data, axis=0)) / 2.
+
+    def semivariogram(self, col='Residual', bins=15, max_distance=None, groups=None):
+        ''' Experimental (binned) semivariogram of the residuals
+
+        Parameters
+        ----------
+        col : str, default 'Residual'
+            column of df (e.g. 'Weighted_Residual')
+
+        bins : int or sequence, default 15
+            number of equal distance bins up to max_distance, or the bin edges
+
+        max_distance : float, optional
+            largest separation distance; default is half the diagonal of the
+            extent of the observations
+
+        groups : str or list, optional
+            only use these observation groups
+
+        Returns
+        --------
+        pandas DataFrame
+            number of pairs, mean separation distance and semivariance for
+            each distance bin (index is the bin centre)
+
+        Notes
+        ------
+        The pairs of observations within max_distance are found with one
+        KD-tree query, and the semivariance of every bin is computed from them
+        at once.
+        '''
+        if max_distance is None:
+            max_distance = self._default_max_distance(groups)
+        if np.isscalar(bins):
+            edges = np.linspace(0., max_distance, int(bins) + 1)
+        else:
+            edges = np.asarray(bins, dtype=np.float64)
+            max_distance = edges[-1]
+        values, i, j, distances = self._spatial_pairs(col, groups, max_distance)
+        valid = ~np.isnan(values[i]) & ~np.isnan(values[j])
+        i, j, distances = i[valid], j[valid], distances[valid]
+
+        bin_index = np.searchsorted(edges, distances, side='right') - 1
+        bin_index[distances == edges[-1]] = len(edges) - 2
+        inside = (bin_index >= 0) & (bin_index < len(edges) - 1)
+        bin_index = bin_index[inside]
+        n_bins = len(edges) - 1
+        n = np.bincount(bin_index, minlength=n_bins)
+        sq_diff = (values[i[inside]] - values[j[inside]])**2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gamma = 0.5 * np.bincount(bin_index, sq_diff, minlength=n_bins) / n
+            lag = np.bincount(bin_index, distances[inside], minlength=n_bins) / n
+        return pd.DataFrame({'n_pairs': n, 'Distance': lag, 'Semivariance': gamma},
+                            index=pd.Index((edges[:-1] + edges[1:]) / 2., name='Bin'))
+
+    def morans_i(self, col='Residual', distance=None, groups=None):
+        ''' Moran's I spatial autocorrelation of the residuals
+
+        Parameters
+        ----------
+        col : str, default 'Residual'
+            column of df (e.g. 'Weighted_Residual')
+
+        distance : float, optional
+            observations within this distance of each other are neighbours
+            (binary weights); default is the distance at which the average
+            observation has about 8 neighbours
+
+        groups : str or list, optional
+            only use these observation groups
+
+        Returns
+        --------
+        pandas Series
+            I, its expected value, variance and z-score under the normality
+            assumption, the two-sided p-value, and the number of observations
+            and neighbour pairs
+        '''
+        tree, positions = self._spatial_index(groups)
+        if distance is None:
+            k = min(9, len(positions))
+            distance = np.median(tree.query(tree.data, k=k)[0][:, -1])
+        values, i, j, distances = self._spatial_pairs(col, groups, distance)
+        valid = ~np.isnan(values)
+        keep = valid[i] & valid[j]
+        i, j = i[keep], j[keep]
+        # renumber the observations with values
+        index = np.cumsum(valid) - 1
+        i, j = index[i], index[j]
+        z = values[valid] - values[valid].mean()
+        n = len(z)
+
+        # binary symmetric weights: each pair counts in both directions
+        W = 2. * len(i)
+        I = n / W * 2. * np.sum(z[i] * z[j]) / np.sum(z**2)
+        expected = -1. / (n - 1)
+        neighbours = np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+        S1 = 2. * W
+        S2 = np.sum((2. * neighbours)**2)
+        variance = (n**2 * S1 - n * S2 + 3 * W**2) / ((n**2 - 1) * W**2) - expected**2
+        zscore = (I - expected) / np.sqrt(variance)
+        return pd.Series({'I': I, 'Expected I': expected, 'Variance': variance,
+                          'z-score': zscore, 'p-value': math.erfc(abs(zscore) / math.sqrt(2.)),
+                          'n': n, 'n_pairs': len(i), 'Distance': distance})
+
+    @property
+    def timeseries(self):
+        ''' Residuals of the observations with a site (basename) and time
+        (datetime) in obsinfo, indexed by a sorted (basename, datetime)
+        MultiIndex. Built on first access and cached.
+        '''
+        if self._timeseries is None:
+            if 'basename' not in self.obsinfo.columns or 'datetime' not in self.obsinfo.columns:
+                raise ValueError('time series need observation basename and datetime columns; '
+                                 'supply an obs_info_file with basename and datetime columns')
+            info = self.obsinfo[['basename', 'datetime']].reindex(self._df.index)
+            located = info.notnull().all(axis=1).values
+            df = self._df.loc[located, ['Name', 'Group', 'Measured', 'Modelled', 'Residual',
+                                        'Weight']].copy()
+            df.index = pd.MultiIndex.from_arrays([info['basename'].values[located],
+                                                  info['datetime'].values[located]],
+                                                 names=['basename', 'datetime'])
+            self._timeseries = df.sort_index()
+        return self._timeseries
+
+    def _sites(self, groups=None):
+        ts = self.timeseries
+        if groups is not None:
+            if isinstance(groups, str):
+                groups = [groups]
+            ts = ts[ts['Group'].isin([g.lower() for g in groups]).values]
+        return ts
+
+    def _site_codes(self, ts):
+        """ site number of each row of a (sorted) time series DataFrame, and the
+        site names
+        """
+        codes = ts.index.codes[0]
+        used = np.unique(codes)
+        return np.searchsorted(used, codes), ts.index.levels[0][used]
+
+    def timeseries_stats(self, groups=None):
+        ''' Residual statistics for each site (basename)
+
+        Parameters
+        ----------
+        groups : str or list, optional
+            only use these observation groups
+
+        Returns
+        --------
+        pandas DataFrame
+            number of observations, start and end times, bias (mean residual,
+            measured - modelled), MAE, RMSE, Nash-Sutcliffe efficiency and the
+            correlation between measured and modelled values for each site
+
+        Notes
+        ------
+        The time series are sorted by site, so the statistics for all sites
+        come from sums (bincounts) over the site numbers of the rows.
+        '''
+        ts = self._sites(groups)
+        codes, sites = self._site_codes(ts)
+        n_sites = len(sites)
+        measured = ts['Measured'].values
+        modelled = ts['Modelled'].values
+        residual = ts['Residual'].values
+
+        def site_sum(values):
+            return np.bincount(codes, values, minlength=n_sites)
+
+        n = np.bincount(codes, minlength=n_sites)
+        # deviations from the site means for the variance terms
+        dm = measured - (site_sum(measured) / n)[codes]
+        ds = modelled - (site_sum(modelled) / n)[codes]
+        sq_residual = site_sum(residual**2)
+        mm = site_sum(dm * dm)
+        times = ts.index.get_level_values('datetime')
+        starts = np.searchsorted(codes, np.arange(n_sites))
+
+        stats = pd.DataFrame({'n': n,
+                              'Start': times[starts],
+                              'End': times[np.append(starts[1:], len(codes)) - 1],
+                              'Bias': site_sum(residual) / n,
+                              'MAE': site_sum(np.abs(residual)) / n,
+                              'RMSE': np.sqrt(sq_residual / n)},
+                             index=pd.Index(sites, name='basename'))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats['NSE'] = 1. - sq_residual / mm
+            stats['Correlation'] = site_sum(dm * ds) / np.sqrt(mm * site_sum(ds * ds))
+        return stats
+
+    def lag_correlation(self, lags=range(-5, 6), groups=None):
+        ''' Correlation between the measured values and the modelled values
+        shifted in time, for each site. A peak at a positive lag means the
+        model responds later than the measurements.
+
+        Parameters
+        ----------
+        lags : sequence of int, default -5 to 5
+            shifts, in time steps (observations) of each site
+
+        groups : str or list, optional
+            only use these observation groups
+
+        Returns
+        --------
+        pandas DataFrame
+            correlation for each site (index) and lag (columns)
+        '''
+        ts = self._sites(groups)
+        codes, sites = self._site_codes(ts)
+        n_sites = len(sites)
+        measured = ts['Measured'].values
+        modelled = ts['Modelled'].values
+
+        result = {}
+        for lag in lags:
+            # pair each measurement with the modelled value lag rows later at the same site
+            if lag >= 0:
+                i = np.arange(len(codes) - lag)
+            else:
+                i = np.arange(-lag, len(codes))
+            j = i + lag
+            same = codes[i] == codes[j]
+            i, j = i[same], j[same]
+            m, s, c = measured[i], modelled[j], codes[i]
+            n = np.bincount(c, minlength=n_sites).astype(float)
+            sum_m = np.bincount(c, m, minlength=n_sites)
+            sum_s = np.bincount(c, s, minlength=n_sites)
+            cov = np.bincount(c, m * s, minlength=n_sites) - sum_m * sum_s / n
+            var_m = np.bincount(c, m * m, minlength=n_sites) - sum_m**2 / n
+            var_s = np.bincount(c, s * s, minlength=n_sites) - sum_s**2 / n
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[lag] = cov / np.sqrt(var_m * var_s)
+        df = pd.DataFrame(result, index=pd.Index(sites, name='basename'))
+        df.columns.name = 'lag'
+        return df
+
+    def resample(self, rule, how='mean', columns=['Measured', 'Modelled', 'Residual'],
+                 groups=None):
+        ''' Resample the residual time series of each site
+
+        Parameters
+        ----------
+        rule : str
+            pandas offset alias for the new time step (e.g. 'MS' for monthly,
+            'YS' for annual)
+
+        how : str, default 'mean'
+            aggregation (e.g. 'mean', 'median', 'max', 'count')
+
+        columns : list
+            columns of the time series to resample
+
+        groups : str or list, optional
+            only use these observation groups
+
+        Returns
+        --------
+        pandas DataFrame
+            resampled values indexed by (basename, datetime)
+        '''
+        ts = self._sites(groups)
+        grouped = ts[columns].groupby([pd.Grouper(level='basename'),
+                                       pd.Grouper(level='datetime', freq=rule)])
+        return grouped.agg(how).dropna(how='all')
+
     def plot_spatial(self, groupinfo={},
                      colorby='graduated',
                      overunder_colors=('Red', 'Navy'),
@@ -906,6 +1319,7 @@ class Res(object):
         Notes
         ------
         """
+        from . import plots
         kwds.update({
                      })
 
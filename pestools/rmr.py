@@ -33,11 +33,18 @@ class Rmr(object):
         node_average : list
           List of tuples.  Within each tuple index 1 is the node and index 2 
           is the average runtime in seconds
+
+        runs : DataFrame
+          Each completed run, with the node, start and end times and
+          runtime in seconds
           
         Notes
         ------
         Currently only tested with BeoPEST.  PEST may have a different format
         for printing date-time to the .rmr file.
+
+        The file offset is kept so update() only reads runs appended to the
+        .rmr file of a running case.
            
         '''
         if basename is not None:
@@ -47,67 +54,98 @@ class Rmr(object):
                 self.directory = os.getcwd()
                        
         self.rmr_file = os.path.join(self.directory, self.basename + '.rmr')
-        rmr = open(self.rmr_file)    
-        node_index = dict()
-        run_starts = dict()
-        run_stats = dict()
-               
-        for line in rmr:
+
+        self._offset = 0
+        self._node_index = dict()
+        self._run_starts = dict()
+        self._run_stats = dict()
+        self._runs = []
+        self.update()
+
+    def _parse_time(self, time):
+        # if seconds are 60 change to 59 then add second
+        if time.split(':')[-1].split('.')[0] == '60':
+            time = time.split(':')[0]+':'+time.split(':')[1]+':59.00'
+            time = datetime.datetime.strptime(time, '%d %b %H:%M:%S.%f')
+            time = time + datetime.timedelta(seconds=1)
+        else:
+            time = datetime.datetime.strptime(time, '%d %b %H:%M:%S.%f')
+        return time.replace(year = datetime.datetime.now().year)
+
+    def update(self):
+        ''' Read lines appended to the .rmr file since the last update
+
+        Only complete lines are consumed; a partially written last line is
+        left for the next update.
+
+        Returns
+        -------
+        DataFrame
+            Runs completed since the last update, with columns Node,
+            Start, End and Runtime (seconds)
+        '''
+        with open(self.rmr_file, 'rb') as rmr:
+            rmr.seek(self._offset)
+            appended = rmr.read()
+        complete = appended.rfind(b'\n') + 1
+        self._offset += complete
+        node_index = self._node_index
+        run_starts = self._run_starts
+        run_stats = self._run_stats
+        n_runs = len(self._runs)
+
+        for line in appended[:complete].decode('ascii', 'replace').splitlines():
             # Update node_index if necessary
             if "index of" in line:
                 node = int(line.split('index of')[1].strip().split(' ')[0])
                 directory = line.split('at working directory')[1].strip().split('"')[1]
                 node_index[node] = directory
             if "commencing on node" in line:
-                time = line.strip().split(':-')[0]
-                # if seconds are 60 change to 59 then add second
-                if time.split(':')[-1].split('.')[0] == '60':
-                    time = time.split(':')[0]+':'+time.split(':')[1]+':59.00'
-                    time = datetime.datetime.strptime(time, '%d %b %H:%M:%S.%f')
-                    time = time + datetime.timedelta(seconds=1)
-                else:
-                    time = datetime.datetime.strptime(time, '%d %b %H:%M:%S.%f')
-                time = time.replace(year = datetime.datetime.now().year)
+                time = self._parse_time(line.strip().split(':-')[0])
                 node = int(line.strip().split('commencing on node ')[1].strip().split('.')[0])
                 run_starts[node_index[node]] = time
             if "completed on node" in line:
-                time = line.replace('; old run so results not needed.','').strip().split(':-')[0]
-                # if seconds are 60 change to 59 then add second
-                if time.split(':')[-1].split('.')[0] == '60':
-                    time = time.split(':')[0]+':'+time.split(':')[1]+':59.00'
-                    time = datetime.datetime.strptime(time, '%d %b %H:%M:%S.%f')
-                    time = time + datetime.timedelta(seconds=1)
-                else:
-                    time = datetime.datetime.strptime(time, '%d %b %H:%M:%S.%f')
-                time = time.replace(year = datetime.datetime.now().year)
-                node = int(line.replace('; old run so results not needed.','').strip().split('completed on node ')[1].strip(' .'))
+                line = line.replace('; old run so results not needed.','')
+                time = self._parse_time(line.strip().split(':-')[0])
+                node = int(line.strip().split('completed on node ')[1].strip(' .'))
                 start = run_starts[node_index[node]]
                 length_seconds = (time - start).total_seconds()
-                if node_index[node] in run_stats:        
+                if node_index[node] in run_stats:
                     run_stats[node_index[node]].append(length_seconds)
                 else:
-                    run_stats[node_index[node]] = [length_seconds,]           
-        
-        self._run_stats = run_stats        
-        self._node_index = node_index
-        self._run_starts = run_starts
-        # Process Run Stats     
+                    run_stats[node_index[node]] = [length_seconds,]
+                self._runs.append((node_index[node], start, time, length_seconds))
+
+        if len(self._runs) > n_runs or n_runs == 0:
+            self._summarize()
+        return pd.DataFrame(self._runs[n_runs:],
+                            columns=['Node', 'Start', 'End', 'Runtime'])
+
+    @property
+    def runs(self):
+        ''' DataFrame of all completed runs, with columns Node, Start, End
+        and Runtime (seconds)
+        '''
+        return pd.DataFrame(self._runs, columns=['Node', 'Start', 'End', 'Runtime'])
+
+    def _summarize(self):
+        run_stats = self._run_stats
+        # Process Run Stats
         self._node_list = []
         for node in run_stats:
             self._node_list.append(node)
         self._node_list.sort()
-        self.nodes = pd.DataFrame(self._node_list)
-        self.nodes.columns = ['Node']
-        
+        self.nodes = pd.DataFrame(self._node_list, columns=['Node'])
+
         self.data = []
         self.node_average = []
         for node in self._node_list:
             self.data.append(run_stats[node])
-            
+
             average = np.array(run_stats[node]).mean()
             self.node_average.append((node, average))
-        self.node_average = pd.DataFrame(self.node_average)
-        self.node_average.columns = ['Node', 'Average Runtime']
+        self.node_average = pd.DataFrame(self.node_average,
+                                         columns=['Node', 'Average Runtime'])
 
 # Need to move this to the plots class as some point            
     def boxplot(self):
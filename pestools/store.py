@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar store of residuals from many PEST runs
+
+Residual (.res) and interim residual (.rei.N) files are parsed once and
+kept in a Parquet dataset keyed by run and iteration, so that comparisons
+across runs are column reads instead of text parses.  Observation names
+and groups are stored as integer codes into name and group dictionaries
+shared by all runs.  Requires pyarrow.
+
+Example
+-------
+    from pestools.store import ResStore
+    store = ResStore('residuals.store')
+    store.add('cc/columbia.res')
+    store.add_case('cc/columbia_svda')
+    store.phi_by_group()
+    store.observation('7089222501_b')
+"""
+import glob
+import os
+import numpy as np
+import pandas as pd
+from .pest import _stamp
+from .pst_handler import read_resfile
+
+
+class ResStore(object):
+    def __init__(self, path):
+        ''' Open (or create) a residual store
+
+        Parameters
+        ----------
+        path : str
+            folder for the store
+
+        Attributes
+        ----------
+        runs : DataFrame
+            residual files in the store, with their run name, iteration
+            (-1 for a final .res file), number of observations and the
+            modification time and size of the file when it was added
+
+        names : Index
+            observation names; the store keeps their positions (codes)
+
+        groups : Index
+            observation groups; the store keeps their positions (codes)
+
+        Notes
+        ------
+        Each residual file is written to its own Parquet file (part) in
+        path/residuals, with columns part, obs and group (int codes) and
+        measured, modelled, residual and weight.  Queries read the whole
+        folder as one dataset, selecting columns and filtering rows by part
+        and obs codes.
+        '''
+        self.path = path
+        self._residuals = os.path.join(path, 'residuals')
+        if not os.path.exists(self._residuals):
+            os.makedirs(self._residuals)
+
+        self.names = self._read_dictionary('names')
+        self.groups = self._read_dictionary('groups')
+        runs_file = os.path.join(path, 'runs.parquet')
+        if os.path.exists(runs_file):
+            self.runs = pd.read_parquet(runs_file)
+        else:
+            self.runs = pd.DataFrame({'run': pd.Series(dtype=object),
+                                      'iteration': pd.Series(dtype=np.int32),
+                                      'file': pd.Series(dtype=object),
+                                      'n_obs': pd.Series(dtype=np.int64),
+                                      'mtime_ns': pd.Series(dtype=np.int64),
+                                      'size': pd.Series(dtype=np.int64)},
+                                     index=pd.Index([], dtype=np.int32, name='part'))
+
+    def _read_dictionary(self, name):
+        filename = os.path.join(self.path, name + '.parquet')
+        if os.path.exists(filename):
+            return pd.Index(pd.read_parquet(filename)[name].values, name=name)
+        return pd.Index([], dtype=object, name=name)
+
+    def _write_dictionary(self, name):
+        index = getattr(self, name)
+        pd.DataFrame({name: index.values}).to_parquet(
+            os.path.join(self.path, name + '.parquet'), index=False)
+
+    def _codes(self, name, values):
+        """codes of values in the names or groups dictionary, adding any new
+        values to it
+        """
+        index = getattr(self, name)
+        codes = index.get_indexer(values)
+        new = codes < 0
+        if new.any():
+            added = pd.unique(np.asarray(values)[new])
+            index = index.append(pd.Index(added, name=name))
+            setattr(self, name, index)
+            self._write_dictionary(name)
+            codes = index.get_indexer(values)
+        return codes
+
+    def _part_file(self, part):
+        return os.path.join(self._residuals, 'part-{:06d}.parquet'.format(part))
+
+    def add(self, res_file, run=None, iteration=None, overwrite=False):
+        ''' Add a residuals file to the store
+
+        Parameters
+        ----------
+        res_file : str
+            .res or .rei file
+
+        run : str, optional
+            name of the run; default is the basename of res_file
+
+        iteration : int, optional
+            PEST iteration of the residuals; default is N for .rei.N files
+            and -1 for .res files
+
+        overwrite : bool, default False
+            replace residuals already in the store for the run and
+            iteration.  A file that hasn't changed since it was added is
+            never read again.
+
+        Returns
+        -------
+        int
+            part number of the residuals in the store
+
+        Raises
+        ------
+        IOError if res_file doesn't exist
+        '''
+        if not os.path.isfile(res_file):
+            raise IOError('residuals file not found: {}'.format(res_file))
+        filename = os.path.split(res_file)[-1]
+        if run is None:
+            run = filename.split('.')[0]
+        if iteration is None:
+            ext = filename.split('.')[-1]
+            iteration = int(ext) if ext.isdigit() else -1
+
+        stamp = _stamp(res_file)
+        existing = self.runs.index[(self.runs['run'] == run).values &
+                                   (self.runs['iteration'] == iteration).values]
+        if len(existing) > 0:
+            part = existing[0]
+            entry = self.runs.loc[part]
+            if stamp == (entry['mtime_ns'], entry['size']):
+                return part
+            if not overwrite:
+                raise ValueError('run {} iteration {} is already in the store; use '
+                                 'overwrite=True to replace it'.format(run, iteration))
+        else:
+            part = int(self.runs.index.max()) + 1 if len(self.runs) > 0 else 0
+
+        res_df = read_resfile(res_file)
+        df = pd.DataFrame({'part': np.full(len(res_df), part, dtype=np.int32),
+                           'obs': self._codes('names', res_df['name'].values).astype(np.int32),
+                           'group': self._codes('groups', res_df['group'].astype(str).values)
+                           .astype(np.int32)})
+        for c in ['measured', 'modelled', 'residual', 'weight']:
+            df[c] = res_df[c].values
+        df.to_parquet(self._part_file(part), index=False)
+
+        self.runs.loc[part] = [run, iteration, os.path.abspath(res_file), len(df),
+                               stamp[0], stamp[1]]
+        self.runs = self.runs.sort_index()
+        self.runs.to_parquet(os.path.join(self.path, 'runs.parquet'))
+        return part
+
+    def add_case(self, basename, run=None, overwrite=False):
+        ''' Add the .res file and all .rei.N files of a PEST case
+
+        Returns
+        -------
+        list
+            part numbers of the residuals in the store
+        '''
+        if run is None:
+            run = os.path.split(basename)[-1].split('.')[0]
+        parts = []
+        for f in sorted(glob.glob(basename + '.rei.*')):
+            if f.split('.')[-1].isdigit():
+                parts.append(self.add(f, run=run, overwrite=overwrite))
+        if os.path.exists(basename + '.res'):
+            parts.append(self.add(basename + '.res', run=run, overwrite=overwrite))
+        return parts
+
+    def _parts(self, runs=None, iterations=None):
+        """part numbers for the runs and iterations
+        """
+        select = np.ones(len(self.runs), dtype=bool)
+        if runs is not None:
+            if isinstance(runs, str):
+                runs = [runs]
+            select &= self.runs['run'].isin(runs).values
+        if iterations is not None:
+            if np.isscalar(iterations):
+                iterations = [iterations]
+            select &= self.runs['iteration'].isin(iterations).values
+        return self.runs.index[select]
+
+    def read(self, runs=None, iterations=None, names=None, groups=None,
+             columns=None):
+        ''' Read residuals from the store
+
+        Parameters
+        ----------
+        runs : str or list, optional
+            runs to read; default is all runs
+
+        iterations : int or list, optional
+            iterations to read (-1 for the final .res); default is all
+
+        names : str or list, optional
+            observations to read; default is all
+
+        groups : str or list, optional
+            observation groups to read; default is all
+
+        columns : list, optional
+            columns to read out of measured, modelled, residual and weight;
+            default is all
+
+        Returns
+        -------
+        DataFrame
+            run, iteration, name, group and the residual columns, with
+            name and group as categoricals over the store dictionaries
+        '''
+        parts = self._parts(runs, iterations)
+        if columns is None:
+            columns = ['measured', 'modelled', 'residual', 'weight']
+        filters = []
+        if len(parts) < len(self.runs):
+            filters.append(('part', 'in', [int(p) for p in parts]))
+        if names is not None:
+            if isinstance(names, str):
+                names = [names]
+            codes = self.names.get_indexer([n.lower() for n in names])
+            filters.append(('obs', 'in', [int(c) for c in codes[codes >= 0]]))
+        if groups is not None:
+            if isinstance(groups, str):
+                groups = [groups]
+            codes = self.groups.get_indexer([g.lower() for g in groups])
+            filters.append(('group', 'in', [int(c) for c in codes[codes >= 0]]))
+
+        if len(parts) == 0:
+            df = pd.DataFrame(columns=['part', 'obs', 'group'] + list(columns))
+        else:
+            df = pd.read_parquet(self._residuals, columns=['part', 'obs', 'group'] + list(columns),
+                                 filters=filters if len(filters) > 0 else None)
+        part = df['part'].values.astype(np.int64)
+        result = pd.DataFrame({'run': self.runs['run'].reindex(part).values,
+                               'iteration': self.runs['iteration'].reindex(part).values,
+                               'name': pd.Categorical.from_codes(df['obs'].values.astype(np.int64),
+                                                                 categories=self.names),
+                               'group': pd.Categorical.from_codes(df['group'].values.astype(np.int64),
+                                                                  categories=self.groups)})
+        for c in columns:
+            result[c] = df[c].values
+        return result
+
+    def phi_by_group(self, runs=None, iterations=None):
+        ''' Phi contribution of each observation group for each run and
+        iteration
+
+        Returns
+        -------
+        DataFrame
+            groups (columns) for each run and iteration (index)
+        '''
+        parts = self._parts(runs, iterations)
+        if len(parts) == 0:
+            return pd.DataFrame()
+        filters = None
+        if len(parts) < len(self.runs):
+            filters = [('part', 'in', [int(p) for p in parts])]
+        df = pd.read_parquet(self._residuals, columns=['part', 'group', 'residual', 'weight'],
+                             filters=filters)
+
+        # sum the squared weighted residuals by part and group codes at once
+        n_groups = len(self.groups)
+        row = pd.Index(parts).get_indexer(df['part'].values)
+        key = row * n_groups + df['group'].values.astype(np.int64)
+        wss = (df['residual'].values * df['weight'].values)**2
+        phi = np.bincount(key, wss, minlength=len(parts) * n_groups)\
+            .reshape(len(parts), n_groups)
+        counts = np.bincount(df['group'].values.astype(np.int64), minlength=n_groups)
+
+        index = pd.MultiIndex.from_arrays([self.runs.loc[parts, 'run'].values,
+                                           self.runs.loc[parts, 'iteration'].values],
+                                          names=['run', 'iteration'])
+        result = pd.DataFrame(phi, index=index, columns=pd.Index(self.groups, name='group'))
+        return result.loc[:, counts > 0]
+
+    def phi(self, runs=None, iterations=None):
+        ''' Total phi for each run and iteration
+        '''
+        return self.phi_by_group(runs, iterations).sum(axis=1)
+
+    def observation(self, name, column='residual'):
+        ''' Values of one observation across runs and iterations
+
+        Parameters
+        ----------
+        name : str
+            observation name
+
+        column : str or list, default 'residual'
+            column(s) to return (measured, modelled, residual or weight)
+
+        Returns
+        -------
+        Series (or DataFrame for a list of columns) indexed by run and
+        iteration
+        '''
+        columns = [column] if isinstance(column, str) else list(column)
+        df = self.read(names=name, columns=columns).set_index(['run', 'iteration'])\
+            .sort_index()
+        return df[column]
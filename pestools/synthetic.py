@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic PEST cases for benchmarking and stress testing
+
+Writes a consistent set of files for a made-up PEST run: control file
+(.pst), residuals (.res and .rei.N for each iteration), binary jacobian
+(.jco), parameter values (.par and .par.N), run management record (.rmr)
+and run record (.rec).  Observation data are generated and written in
+chunks, so cases with millions of observations can be written without
+holding them in memory.
+
+Example
+-------
+    from pestools.synthetic import SyntheticCase
+    case = SyntheticCase('big/case', n_par=200, n_obs=10**6)
+    case.write()
+"""
+import datetime
+import os
+import numpy as np
+from .mat_handler import jco as Jco
+
+
+class SyntheticCase(object):
+    def __init__(self, basename, n_par=100, n_obs=10000, n_par_groups=5,
+                 n_obs_groups=10, n_regul_groups=1, n_iterations=3,
+                 n_lambdas=4, n_nodes=10, density=0.05, seed=0,
+                 chunksize=100000):
+        ''' Create a synthetic PEST case
+
+        Parameters
+        ----------
+        basename : str
+            basename for the case files, including path
+
+        n_par, n_obs : int
+            number of parameters and observations
+
+        n_par_groups, n_obs_groups : int
+            number of parameter and observation groups
+
+        n_regul_groups : int, default 1
+            number of the observation groups that are regularisation groups
+            (named regul_*)
+
+        n_iterations : int, default 3
+            number of optimisation iterations in the .rec, .rei.N, .par.N
+            and .rmr files
+
+        n_lambdas : int, default 4
+            Marquardt lambdas tested each iteration
+
+        n_nodes : int, default 10
+            number of BeoPEST nodes in the .rmr file
+
+        density : float, default 0.05
+            fraction of non-zero jacobian entries
+
+        seed : int, default 0
+            random seed; the same arguments always give the same files
+
+        chunksize : int, default 100000
+            number of observations generated and written at a time
+
+        Notes
+        ------
+        Residuals shrink by a constant factor each iteration, so the phi
+        contributions in the .rec file are consistent with the .rei.N files,
+        and the .res file is the last iteration.
+        '''
+        self.basename = basename
+        self.n_par = n_par
+        self.n_obs = n_obs
+        self.n_par_groups = n_par_groups
+        self.n_obs_groups = n_obs_groups
+        self.n_regul_groups = n_regul_groups
+        self.n_iterations = n_iterations
+        self.n_lambdas = n_lambdas
+        self.n_nodes = n_nodes
+        self.density = density
+        self.seed = seed
+        self.chunksize = chunksize
+        self.decay = 0.8
+
+        self.par_names = ['p{:06d}'.format(i) for i in range(n_par)]
+        self.par_groups = ['pg{}'.format(i) for i in range(n_par_groups)]
+        self.obs_groups = ['og{}'.format(i) for i in range(n_obs_groups - n_regul_groups)] + \
+                          ['regul_{}'.format(i) for i in range(n_regul_groups)]
+
+        rng = self._rng(0)
+        self._par_group = rng.randint(0, n_par_groups, n_par)
+        self._log = rng.random_sample(n_par) < 0.5
+        self._lower = 10**rng.uniform(-3, 0, n_par)
+        self._upper = self._lower * 10**rng.uniform(1, 3, n_par)
+        self._group_sd = 10**rng.uniform(-1, 1, n_obs_groups)
+
+        # parameter values at the start of each iteration and at the end,
+        # with some parameters hitting their bounds
+        values = [np.sqrt(self._lower * self._upper)]
+        for i in range(n_iterations):
+            step = 10**rng.normal(0, 0.3, n_par)
+            values.append(np.clip(values[-1] * step, self._lower, self._upper))
+        self._par_values = np.array(values)
+
+        self._phi_by_group = None
+
+    def _rng(self, stream, chunk=0):
+        """random state for one stream of values, so that chunks can be
+        generated independently and in any order
+        """
+        return np.random.RandomState([self.seed, stream, chunk])
+
+    def _chunks(self):
+        for chunk, start in enumerate(range(0, self.n_obs, self.chunksize)):
+            yield chunk, start, min(start + self.chunksize, self.n_obs)
+
+    def _obs_chunk(self, chunk, start, stop):
+        """names, group numbers, measured values, weights and initial
+        residuals of a chunk of observations
+        """
+        rng = self._rng(1, chunk)
+        n = stop - start
+        names = ['o{:08d}'.format(i) for i in range(start, stop)]
+        groups = rng.randint(0, self.n_obs_groups, n)
+        measured = 100. + 10. * rng.standard_normal(n)
+        weights = 1. / self._group_sd[groups]
+        residuals = 3. * self._group_sd[groups] * rng.standard_normal(n)
+        return names, groups, measured, weights, residuals
+
+    def write(self):
+        ''' Write all of the case files
+
+        Returns
+        -------
+        list
+            files written
+        '''
+        files = [self.write_pst(), self.write_jco()]
+        files += [self.write_res(i) for i in range(self.n_iterations + 1)]
+        files.append(self.write_res())
+        files += [self.write_par(i) for i in range(1, self.n_iterations + 1)]
+        files.append(self.write_par())
+        files += [self.write_rmr(), self.write_rec()]
+        return files
+
+    def write_pst(self):
+        ''' Write the control file (.pst)
+        '''
+        pst_file = self.basename + '.pst'
+        with open(pst_file, 'w') as f:
+            f.write('pcf\n* control data\nrestart regularisation\n')
+            f.write('{} {} {} 0 {}\n'.format(self.n_par, self.n_obs, self.n_par_groups,
+                                             self.n_obs_groups))
+            f.write('1 1 double point 1 0 0\n')
+            f.write('20.0 -3.0 0.3 0.01 {} 999 lamforgive\n'.format(self.n_lambdas))
+            f.write('10.0 10.0 0.001\n0.1 noaui\n')
+            f.write('{} 0.005 4 4 0.005 4\n0 0 0 REISAVEITN PARSAVEITN\n'.format(self.n_iterations))
+            f.write('* parameter groups\n')
+            for group in self.par_groups:
+                f.write('{} relative 0.01 0.0 switch 2.0 parabolic\n'.format(group))
+            f.write('* parameter data\n')
+            for i, name in enumerate(self.par_names):
+                f.write('{} {} relative {:.6e} {:.6e} {:.6e} {} 1.0 0.0 1\n'.format(
+                    name, 'log' if self._log[i] else 'none', self._par_values[0, i],
+                    self._lower[i], self._upper[i], self.par_groups[self._par_group[i]]))
+            f.write('* observation groups\n')
+            f.write(''.join(group + '\n' for group in self.obs_groups))
+            f.write('* observation data\n')
+            for chunk, start, stop in self._chunks():
+                names, groups, measured, weights, residuals = self._obs_chunk(chunk, start, stop)
+                obs_groups = np.array(self.obs_groups)[groups]
+                f.write(''.join('{} {:.8g} {:.8g} {}\n'.format(*row) for row in
+                                zip(names, measured, weights, obs_groups)))
+            f.write('* model command line\nmodel.bat\n')
+            f.write('* model input/output\nmodel.tpl model.in\nmodel.ins model.out\n')
+            f.write('* regularisation\n1.0e10 1.05e10 0.1\n1.0 1.0e-10 1.0e10\n1.3 1.0e-2 1\n')
+        return pst_file
+
+    def write_res(self, iteration=None):
+        ''' Write a residuals file
+
+        Parameters
+        ----------
+        iteration : int, optional
+            write the interim residuals file (.rei.N) for this iteration;
+            by default the final residuals (.res) are written
+
+        Returns
+        -------
+        str
+            file written
+        '''
+        if iteration is None:
+            res_file = self.basename + '.res'
+            factor = self.decay**self.n_iterations
+        else:
+            res_file = self.basename + '.rei.{}'.format(iteration)
+            factor = self.decay**iteration
+        phi_by_group = np.zeros(self.n_obs_groups)
+        with open(res_file, 'w') as f:
+            if iteration is not None:
+                f.write(' MODEL OUTPUTS AT END OF OPTIMISATION ITERATION NO. {:3d}:-\n\n\n'
+                        .format(iteration))
+            f.write(' Name                 Group          Measured         Modelled'
+                    '         Residual         Weight\n')
+            for chunk, start, stop in self._chunks():
+                names, groups, measured, weights, residuals = self._obs_chunk(chunk, start, stop)
+                residuals = residuals * factor
+                phi_by_group += np.bincount(groups, (residuals * weights)**2,
+                                            minlength=self.n_obs_groups)
+                obs_groups = np.array(self.obs_groups)[groups]
+                f.write(''.join(' {:<20s} {:<12s} {:16.7g} {:16.7g} {:16.7g} {:16.7g}\n'
+                                .format(*row) for row in
+                                zip(names, obs_groups, measured, measured - residuals,
+                                    residuals, weights)))
+        if self._phi_by_group is None:
+            self._phi_by_group = phi_by_group / factor**2
+        return res_file
+
+    def phi_by_group(self, iteration=0):
+        ''' Phi contribution of each observation group at an iteration
+
+        Returns
+        -------
+        ndarray
+            phi of each group in obs_groups
+        '''
+        if self._phi_by_group is None:
+            phi_by_group = np.zeros(self.n_obs_groups)
+            for chunk, start, stop in self._chunks():
+                names, groups, measured, weights, residuals = self._obs_chunk(chunk, start, stop)
+                phi_by_group += np.bincount(groups, (residuals * weights)**2,
+                                            minlength=self.n_obs_groups)
+            self._phi_by_group = phi_by_group
+        return self._phi_by_group * self.decay**(2 * iteration)
+
+    def write_jco(self):
+        ''' Write the jacobian in PEST binary format (.jco)
+
+        The jacobian is generated in chunks of observations.  When it fits in
+        one chunk it is written with mat_handler.matrix.to_binary(); larger
+        jacobians are streamed to the same format.
+        '''
+        jco_file = self.basename + '.jco'
+        jco = Jco()
+        rows = max(1, min(self.chunksize, 10**7 // self.n_par))
+
+        def block(chunk, start, stop):
+            rng = self._rng(2, chunk)
+            x = rng.standard_normal((stop - start, self.n_par))
+            x[rng.random_sample((stop - start, self.n_par)) > self.density] = 0.
+            return x
+
+        if rows >= self.n_obs:
+            x = block(0, 0, self.n_obs)
+            Jco(x=x, row_names=['o{:08d}'.format(i) for i in range(self.n_obs)],
+                col_names=self.par_names).to_binary(jco_file)
+            return jco_file
+
+        with open(jco_file, 'wb') as f:
+            # the number of non-zero entries in the header is filled in last
+            header = np.zeros(1, dtype=jco.binary_header_dt)
+            header['itemp1'] = -self.n_par
+            header['itemp2'] = -self.n_obs
+            header.tofile(f)
+            nnz = 0
+            for chunk, start in enumerate(range(0, self.n_obs, rows)):
+                x = block(chunk, start, min(start + rows, self.n_obs))
+                row_idxs, col_idxs = np.nonzero(x)
+                data = np.zeros(len(row_idxs), dtype=jco.binary_rec_dt)
+                data['j'] = start + row_idxs + 1 + col_idxs * self.n_obs
+                data['dtemp'] = x[row_idxs, col_idxs]
+                data.tofile(f)
+                nnz += len(data)
+            for name in self.par_names:
+                f.write(name[:jco.par_length].ljust(jco.par_length).encode())
+            for start in range(0, self.n_obs, self.chunksize):
+                stop = min(start + self.chunksize, self.n_obs)
+                f.write(''.join('o{:08d}'.format(i).ljust(jco.obs_length)
+                                for i in range(start, stop)).encode())
+            f.seek(0)
+            header['icount'] = nnz
+            header.tofile(f)
+        return jco_file
+
+    def write_par(self, iteration=None):
+        ''' Write a parameter value file: the final values (.par) or those at
+        the end of an iteration (.par.N)
+        '''
+        if iteration is None:
+            par_file = self.basename + '.par'
+            iteration = self.n_iterations
+        else:
+            par_file = self.basename + '.par.{}'.format(iteration)
+        with open(par_file, 'w') as f:
+            f.write('single point\n')
+            f.write(''.join(' {:<12s} {:16.9g} {:12.6f} {:12.6f}\n'.format(name, value, 1., 0.)
+                            for name, value in zip(self.par_names,
+                                                   self._par_values[iteration])))
+        return par_file
+
+    def _runs(self):
+        """start and end times and node of every model run: a jacobian run
+        for each parameter and the lambda runs, each iteration
+        """
+        rng = self._rng(3)
+        speed = rng.uniform(0.8, 1.5, self.n_nodes)
+        node_free = np.zeros(self.n_nodes)
+        runs = []
+        for i in range(self.n_iterations):
+            for batch in [self.n_par, self.n_lambdas]:
+                batch_start = node_free.max()
+                node_free[:] = batch_start
+                for r in range(batch):
+                    node = int(np.argmin(node_free))
+                    start = node_free[node] + rng.uniform(0.1, 2.)
+                    end = start + 600. * speed[node] * rng.lognormal(0., 0.1)
+                    node_free[node] = end
+                    runs.append((start, end, node + 1))
+        return runs
+
+    def write_rmr(self):
+        ''' Write a BeoPEST run management record (.rmr)
+        '''
+        rmr_file = self.basename + '.rmr'
+        t0 = datetime.datetime(2015, 12, 17, 22, 0, 0)
+
+        def stamp(seconds):
+            return (t0 + datetime.timedelta(seconds=seconds)).strftime('%d %b %H:%M:%S.%f')[:-4]
+
+        events = []
+        for run, (start, end, node) in enumerate(self._runs()):
+            events.append((start, 1, 'model run {} commencing on node {}.'.format(run + 1, node)))
+            events.append((end, 0, 'model run {} completed on node {}.'.format(run + 1, node)))
+        events.sort()
+        with open(rmr_file, 'w') as f:
+            f.write('                    PEST RUN MANAGEMENT RECORD: CASE {}\n\n'
+                    .format(os.path.split(self.basename)[-1]))
+            f.write(' RUN MANAGEMENT UNDERTAKEN USING BEOPEST.\n\n')
+            for node in range(1, self.n_nodes + 1):
+                f.write('   {}:- index of {} assigned to node at working directory '
+                        '"node{}\\\\C:\\work\\dir_{}".\n'.format(stamp(0.), node, node, node))
+            f.write(''.join('   {}:- {}\n'.format(stamp(t), text) for t, order, text in events))
+        return rmr_file
+
+    def write_rec(self):
+        ''' Write the run record (.rec) with an optimisation iteration block
+        per iteration
+        '''
+        rec_file = self.basename + '.rec'
+        runs_per_iteration = self.n_par + self.n_lambdas
+        with open(rec_file, 'w') as f:
+            f.write('                    PEST RUN RECORD: CASE {}\n\n\n'
+                    .format(os.path.split(self.basename)[-1]))
+            f.write(' PEST run mode:-\n\n    Regularisation mode\n\n\n')
+            f.write(' Case dimensions:-\n\n')
+            f.write('    Number of parameters                           : {:6d}\n'.format(self.n_par))
+            f.write('    Number of observations                         : {:6d}\n'.format(self.n_obs))
+            f.write('    Number of prior estimates                      : {:6d}\n\n\n'.format(0))
+            regul = np.array([g.startswith('regul') for g in self.obs_groups])
+            for i in range(1, self.n_iterations + 1):
+                phi = self.phi_by_group(i - 1)
+                f.write('\n OPTIMISATION ITERATION NO.        : {}\n'.format(i))
+                f.write('    Model calls so far             : {}\n'.format((i - 1) * runs_per_iteration))
+                f.write('    Current value of measurement objective function          : {:11.5G}\n'
+                        .format(phi[~regul].sum()))
+                f.write('    Current value of regularisation objective function       : {:11.5G}\n \n'
+                        .format(phi[regul].sum()))
+                f.write('    Starting phi for this iteration                          : {:11.5G}\n'
+                        .format(phi.sum()))
+                for group, value in zip(self.obs_groups, phi):
+                    f.write('    Contribution to phi from observation group {:<14s}: {:11.5G}\n'
+                            .format('"{}"'.format(group), value))
+                f.write('\n')
+                new = self.phi_by_group(i)
+                lambdas = 20. * 3.**-np.arange(self.n_lambdas)
+                for j, lam in enumerate(lambdas):
+                    # the last lambda gives the phi at the start of the next iteration
+                    ratio = self.decay**2 + (self.n_lambdas - 1 - j) * 0.05
+                    f.write('        Lambda = {:10.5G} ----->\n'.format(lam))
+                    f.write('           Phi = {:10.5G}  ({:7.3f} of starting phi)\n'
+                            .format(phi.sum() * ratio, ratio))
+                    f.write('     Meas. fn. = {:10.5G}\n'.format(phi[~regul].sum() * ratio))
+                    f.write('    Regul. fn. = {:10.5G}\n\n'.format(phi[regul].sum() * ratio))
+                f.write('    No more lambdas: phi is less than 0.4000 of starting phi\n\n')
+                f.write('    Lowest phi this iteration: {:11.5G}\n\n'.format(new.sum()))
+                f.write('       Current parameter values                 Previous parameter values\n')
+                current = self._par_values[i]
+                previous = self._par_values[i - 1]
+                for name, c, p in zip(self.par_names, current, previous):
+                    f.write('       {:<12s} {:12.6G}                 {:<12s} {:12.6G}\n'
+                            .format(name, c, name, p))
+                change = np.abs(current - previous) / np.abs(previous)
+                f.write('    Maximum relative change: {:10.4G} ["{}"]\n\n'
+                        .format(change.max(), self.par_names[int(np.argmax(change))]))
+            f.write('\n    Optimisation complete: the maximum number of optimisation iterations\n')
+            f.write('    has been carried out.\n')
+            f.write('    Total model calls:  {}\n'.format(self.n_iterations * runs_per_iteration))
+        return rec_file
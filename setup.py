@@ -20,7 +20,8 @@ def run():
         license="MIT",
         author="Evan Christianson, Andrew Leaf, Jeremy White, Mike Fienen",
         maintainer_email="",
-        packages=["pestools"])
+        packages=["pestools"],
+        entry_points={"console_scripts": ["pestools = pestools.cli:main"]})
 
 if __name__ == "__main__":
     run()
@@ -0,0 +1,12 @@
+import pytest
+from pestools.synthetic import SyntheticCase
+
+
+@pytest.fixture(scope='module')
+def basename(tmp_path_factory):
+    """control and residuals files of a small synthetic case"""
+    basename = str(tmp_path_factory.mktemp('case') / 'case')
+    case = SyntheticCase(basename, n_par=10, n_obs=500, n_iterations=1)
+    case.write_pst()
+    case.write_res()
+    return basename
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from pestools import metrics
+from pestools.res import Res
+
+
+def _residuals():
+    rng = np.random.RandomState(2)
+    n = 300
+    measured = rng.normal(10, 3, n)
+    modelled = measured + rng.normal(0.5, 1, n)
+    df = pd.DataFrame({'Group': rng.choice(['b', 'a', 'c'], n),
+                       'Measured': measured, 'Modelled': modelled,
+                       'Residual': measured - modelled,
+                       'Weight': rng.uniform(0, 2, n)})
+    df.loc[::37, 'Residual'] = np.nan
+    return df
+
+
+def test_pct_diff():
+    measured = np.array([2., 0., 4., 0., -5.])
+    modelled = np.array([1., 3., 0., 0., -4.])
+    assert np.allclose(metrics.pct_diff(measured, modelled), [50., -100., 100., 0., 20.])
+
+
+def test_group_metrics():
+    df = _residuals()
+    stats = metrics.group_metrics(df, ddof=1)
+    assert list(stats.index) == ['a', 'b', 'c']
+    assert stats.index.name == 'Group'
+    for group, g in df.dropna(subset=['Residual']).groupby('Group'):
+        row = stats.loc[group]
+        r, m, s, w = g['Residual'], g['Measured'], g['Modelled'], g['Weight']
+        assert row['n'] == len(g)
+        assert np.isclose(row['Residual_Mean'], r.mean())
+        assert np.isclose(row['Residual_Std'], r.std(ddof=1))
+        assert np.isclose(row['Residual_Range'], r.max() - r.min())
+        assert np.isclose(row['Residual_50%'], r.median())
+        assert np.isclose(row['Absolute_Residual_Max'], r.abs().max())
+        assert np.isclose(row['Measured_Std'], m.std(ddof=1))
+        assert np.isclose(row['Modelled_Mean'], s.mean())
+        assert np.isclose(row['MAE'], r.abs().mean())
+        assert np.isclose(row['RMSE'], np.sqrt((r**2).mean()))
+        assert np.isclose(row['Pct_Diff_Mean'], (100 * r / m).mean())
+        assert np.isclose(row['NSE'], 1 - (r**2).sum() / ((m - m.mean())**2).sum())
+        cc = np.corrcoef(m, s)[0, 1]
+        assert np.isclose(row['R2'], cc**2)
+        kge = 1 - np.sqrt((cc - 1)**2 + (s.std() / m.std() - 1)**2 + (s.mean() / m.mean() - 1)**2)
+        assert np.isclose(row['KGE'], kge)
+        assert np.isclose(row['Weighted_Residual_Mean'], (w * r).mean())
+        assert np.isclose(row['Weighted_Bias'], np.average(r, weights=w**2))
+        assert np.isclose(row['Phi'], ((w * r)**2).sum())
+
+
+def test_group_metrics_keys():
+    df = _residuals()[['Residual']]
+    keys = np.where(np.arange(len(df)) < 100, 'x', 'y')
+    stats = metrics.group_metrics(df, by=keys, ddof=0, quantiles=())
+    assert 'Measured_Mean' not in stats.columns and 'Phi' not in stats.columns
+    expected = df['Residual'].groupby(keys).std(ddof=0)
+    assert np.allclose(stats['Residual_Std'], expected.values)
+
+
+def test_res_metrics(basename):
+    res = Res(basename + '.res')
+    stats = res.metrics(exclude_zero=True, drop_regul=True)
+    df = res.df[(res.df['Weight'] > 0) & (res.df['Group'] != 'regul_0')]
+    assert list(stats.index) == sorted(df['Group'].unique())
+    assert np.allclose(stats['Phi'], df.groupby('Group', observed=True)['Weighted_Sq_Residual'].sum())
+    stats = res.metrics(groups=['OG1', 'og2'])
+    assert list(stats.index) == ['og1', 'og2']
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from pestools.Obs import Obs
+
+
+@pytest.fixture(scope='module')
+def obs(basename):
+    return Obs(basename)
+
+
+def recomputed_phi(obs):
+    return np.sum((obs._weight * obs._residual)**2)
+
+
+def test_set_weights_duplicates(obs):
+    obs.reset()
+    name = obs._names[3]
+    obs.set_weights([name, name.upper(), obs._names[4]], [2., 5., 3.])
+    assert obs.weights[name] == 5.
+    assert np.isclose(obs.phi, recomputed_phi(obs))
+    obs.scale_weights([name, name], 2.)
+    assert obs.weights[name] == 10.
+    assert np.isclose(obs.phi, recomputed_phi(obs))
+    sum_sq_weights = np.bincount(obs._codes, obs._weight**2)
+    assert np.allclose(obs.sum_sq_weights.values, sum_sq_weights)
+
+
+def test_export_weights(obs):
+    obs.reset()
+    name = obs._names[0]
+    obs.set_weights(name, 123.)
+    before = obs.pst.observation_data['weight'].copy()
+    copy = obs.export_weights(inplace=False)
+    assert (obs.pst.observation_data['weight'] == before).all()
+
+    exported = obs.export_weights()
+    assert exported is obs.pst.observation_data
+    for df in [copy, exported]:
+        weights = df.set_index(df['obsnme'].str.lower())['weight']
+        assert weights[name] == 123.
+        assert (weights.reindex(obs._names).values == obs._weight).all()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pestools.par import ParSets, find_par_files
+from pestools.pst_handler import pst as Pst, read_par_file
+from pestools.synthetic import SyntheticCase
+
+
+@pytest.fixture(scope='module')
+def case(tmp_path_factory):
+    basename = str(tmp_path_factory.mktemp('par') / 'case')
+    case = SyntheticCase(basename, n_par=20, n_obs=100, n_iterations=3)
+    case.write_pst()
+    for iteration in range(1, 4):
+        case.write_par(iteration)
+    return basename
+
+
+def write_par(filename, names, values):
+    with open(filename, 'w') as f:
+        f.write('single point\n')
+        for name, value in zip(names, values):
+            f.write(' {0:<12s} {1:20.10e} 1.0 0.0\n'.format(name, value))
+
+
+def test_par_sets(case):
+    parameter_data = Pst(case + '.pst').parameter_data
+    files = find_par_files(case)
+    assert [f.split('.')[-1] for f in files] == ['1', '2', '3']
+    sets = ParSets(files, parameter_data=parameter_data)
+    assert list(sets.sets) == [1, 2, 3]
+    for i, f in enumerate(files):
+        values = read_par_file(f)['parval'].reindex(sets.parnme).values
+        assert np.array_equal(sets.values[i], values)
+    diff = sets.differences()
+    assert np.isnan(diff.values[0]).all()
+    assert np.allclose(diff.values[1:], np.diff(sets.values, axis=0))
+
+
+def test_par_sets_at_bounds(case, tmp_path):
+    parameter_data = Pst(case + '.pst').parameter_data
+    names = parameter_data['parnme'].values
+    lower = parameter_data['parlbnd'].values.astype(float)
+    upper = parameter_data['parubnd'].values.astype(float)
+    middle = np.sqrt(lower * upper)
+    first = middle.copy()
+    first[[0, 5]] = lower[[0, 5]]
+    first[7] = upper[7]
+    second = middle.copy()
+    second[3] = upper[3] * (1. + 1e-7)      # within the default rtol
+    second[4] = lower[4] * (1. + 1e-3)      # only within rtol=1e-2
+    files = [str(tmp_path / 'a.par.1'), str(tmp_path / 'a.par.2')]
+    write_par(files[0], names, first)
+    write_par(files[1], names, second)
+    sets = ParSets(files, parameter_data=parameter_data)
+
+    expected = np.zeros((2, len(names)), dtype=int)
+    expected[0, [0, 5]] = -1
+    expected[0, 7] = 1
+    expected[1, 3] = 1
+    assert np.array_equal(sets.at_bounds.values, expected)
+    assert list(sets.at_bounds.columns) == list(sets.parnme)
+    assert sets.n_at_bounds.loc[1].tolist() == [2, 1]
+    assert sets.n_at_bounds.loc[2].tolist() == [0, 1]
+
+    expected[1, 4] = -1
+    assert np.array_equal(sets.get_at_bounds(rtol=1e-2).values, expected)
+    assert sets.get_n_at_bounds(rtol=1e-2).loc[2].tolist() == [1, 1]
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pestools.parsen import ParSen
+
+
+@pytest.fixture(scope='module')
+def inputs():
+    """jacobian, residuals and parameter data of a small random problem"""
+    rng = np.random.RandomState(3)
+    n_obs, n_par = 200, 12
+    x = rng.standard_normal((n_obs, n_par))
+    x[rng.random_sample((n_obs, n_par)) > 0.3] = 0.
+    obs = ['Ob{}'.format(i) for i in range(n_obs)]
+    pars = ['par{}'.format(j) for j in range(n_par)]
+    jco_df = pd.DataFrame(x, index=obs, columns=pars)
+    weights = rng.random_sample(n_obs)
+    weights[::7] = 0.
+    groups = np.array(['heads', 'flux', 'regul_1'])[rng.randint(0, 3, n_obs)]
+    # residuals in a different order than the jacobian rows
+    res_df = pd.DataFrame({'name': [o.lower() for o in obs], 'group': groups,
+                           'residual': rng.standard_normal(n_obs),
+                           'weight': weights}).iloc[rng.permutation(n_obs)]
+    parameter_data = pd.DataFrame({'parnme': pars,
+                                   'pargp': ['PG{}'.format(j % 3) for j in range(n_par)]})
+    return jco_df, res_df, parameter_data
+
+
+def column_norms(jco_df, res_df, keep=None):
+    """sensitivities from the norm of each weighted jacobian column"""
+    res = res_df.set_index('name').reindex(jco_df.index.str.lower())
+    weights = res['weight'].values.copy()
+    if keep is not None:
+        weights[~keep(res)] = 0.
+    n_nonzero = np.count_nonzero(weights)
+    return np.array([np.linalg.norm(jco_df[c].values * weights) / n_nonzero
+                     for c in jco_df.columns])
+
+
+def test_sensitivity(inputs):
+    jco_df, res_df, parameter_data = inputs
+    sen = ParSen(jco_df=jco_df, res_df=res_df, parameter_data=parameter_data)
+    assert list(sen.df.index) == list(jco_df.columns)
+    assert np.allclose(sen.df['Sensitivity'], column_norms(jco_df, res_df))
+    assert list(sen.df['Parameter Group']) == ['pg{}'.format(j % 3) for j in range(12)]
+    assert np.allclose(sen.calc_sensitivity(chunksize=7)['Sensitivity'], sen.df['Sensitivity'])
+
+
+def test_sensitivity_sparse(inputs):
+    jco_df, res_df, parameter_data = inputs
+    sparse = jco_df.astype(pd.SparseDtype(np.float64, 0.))
+    sen = ParSen(jco_df=sparse, res_df=res_df, parameter_data=parameter_data)
+    assert np.allclose(sen.df['Sensitivity'], column_norms(jco_df, res_df))
+
+
+def test_sensitivity_filters(inputs):
+    jco_df, res_df, parameter_data = inputs
+    sen = ParSen(jco_df=jco_df, res_df=res_df, parameter_data=parameter_data,
+                 drop_regul=True)
+    expected = column_norms(jco_df, res_df, keep=lambda res: ~res['group'].str.contains('regul'))
+    assert np.allclose(sen.df['Sensitivity'], expected)
+
+    sen = ParSen(jco_df=jco_df, res_df=res_df, parameter_data=parameter_data,
+                 keep_groups=['heads'])
+    expected = column_norms(jco_df, res_df, keep=lambda res: res['group'] == 'heads')
+    assert np.allclose(sen.df['Sensitivity'], expected)
+
+    sen.drop_groups(['heads'])
+    assert np.all(sen.df['Sensitivity'].isnull())
+
+
+def test_missing_observations(inputs):
+    jco_df, res_df, parameter_data = inputs
+    with pytest.raises(KeyError):
+        ParSen(jco_df=jco_df, res_df=res_df.iloc[1:], parameter_data=parameter_data)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from pestools.pest import Pest
+from pestools.synthetic import SyntheticCase
+
+
+def test_cov_scaled_by_pst_phi(tmp_path):
+    # the synthetic case has a regul_ observation group, which counts in phi
+    basename = str(tmp_path / 'case')
+    case = SyntheticCase(basename, n_par=20, n_obs=3000, n_iterations=1)
+    case.write_pst()
+    case.write_res()
+    case.write_jco()
+    p = Pest(basename)
+    assert (p.pst.observation_data['obgnme'] == 'regul_0').any()
+
+    jco = p._jco
+    weights = p.res_df.set_index('name')['weight'].reindex(jco.row_names).values
+    xtqx = np.dot(jco.x.T * weights**2, jco.x)
+    expected = p.pst.phi / (np.count_nonzero(weights) - jco.shape[1]) * np.linalg.inv(xtqx)
+    assert np.allclose(p._cov.x, expected)
+
+
+def test_cov_jco_rows_missing_from_residuals(tmp_path):
+    basename = str(tmp_path / 'case')
+    case = SyntheticCase(basename, n_par=10, n_obs=500, n_iterations=1)
+    case.write_pst()
+    case.write_res()
+    case.write_jco()
+    # a stale residuals file without the last observations
+    with open(basename + '.res') as f:
+        lines = f.readlines()
+    with open(basename + '.res', 'w') as f:
+        f.writelines(lines[:-5])
+    with pytest.raises(KeyError, match='not in the residuals'):
+        Pest(basename)._cov
+
+
+def test_cached_frames_not_modified(tmp_path):
+    basename = str(tmp_path / 'case')
+    case = SyntheticCase(basename, n_par=10, n_obs=500, n_iterations=1)
+    case.write_pst()
+    case.write_res()
+    case.write_jco()
+    p = Pest(basename)
+    res_df = p.res_df.copy()
+    obs_index = p.pst.observation_data.index.copy()
+    observation_data = p.observation_data
+    assert (observation_data.index == observation_data['obsnme']).all()
+    p.ParSen()
+    p.ObSen()
+    assert p.res_df.index.equals(res_df.index)
+    assert p.res_df.columns.equals(res_df.columns)
+    assert p.pst.observation_data.index.equals(obs_index)
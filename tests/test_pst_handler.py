@@ -0,0 +1,157 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+from pestools.pst_handler import pst as Pst, prior as PriorInfo, read_resfile
+
+CC = os.path.join(os.path.dirname(__file__), '..', 'cc')
+
+
+def test_adjust_weights_overlapping_entries(basename):
+    p = Pst(basename + '.pst')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        p.adjust_weights_by_group(obsgrp_dict={'og1': 100.},
+                                  obsgrp_prefix_dict={'og': 1000.}, max_iter=200)
+    phi = p.phi_components
+    assert np.isclose(phi['og1'], 100., rtol=1e-4)
+    assert np.isclose(sum(v for k, v in phi.items() if k.startswith('og')), 1000., rtol=1e-4)
+
+
+def test_adjust_weights_not_converged(basename):
+    p = Pst(basename + '.pst')
+    # the same observations with two different targets
+    with pytest.warns(UserWarning, match='did not converge'):
+        p.adjust_weights_by_group(obsgrp_dict={'og1': 100.},
+                                  obsgrp_phrase_dict={'g1': 500.})
+
+
+def test_adjust_weights_zero_phi(basename):
+    p = Pst(basename + '.pst')
+    obs = p.observation_data
+    obs.loc[obs['obgnme'] == 'og2', 'weight'] = 0.
+    with pytest.warns(UserWarning, match='zero phi'):
+        p.adjust_weights_by_group(obsgrp_dict={'og2': 100., 'og3': 100.})
+    assert np.isclose(p.phi_components['og3'], 100.)
+
+
+def test_write_round_trip(tmp_path):
+    # the Columbia control file has prior information equations
+    p = Pst(os.path.join(CC, 'Columbia.pst'))
+    parameter_data = p.parameter_data.copy()
+    filename = str(tmp_path / 'columbia.pst')
+    p.write(filename)
+    q = Pst(filename)
+
+    pd.testing.assert_frame_equal(p.parameter_data, parameter_data)
+    pd.testing.assert_frame_equal(q.parameter_data, p.parameter_data, check_dtype=False)
+    pd.testing.assert_frame_equal(q.observation_data, p.observation_data, check_dtype=False)
+    assert q.nprior == p.nprior > 0
+    for attr in ['pilbl', 'obgnme', 'weight', 'rhs', 'islog']:
+        assert (getattr(q.prior, attr) == getattr(p.prior, attr)).all()
+    assert q.prior.par_names == p.prior.par_names
+    assert abs(q.prior.coef - p.prior.coef).max() == 0.
+
+
+def test_phi_components(basename):
+    p = Pst(basename + '.pst')
+    res = read_resfile(basename + '.res').set_index('name')
+    obs = p.observation_data
+    residual = res['residual'].reindex(obs['obsnme'].str.lower()).values
+    phi = pd.Series((residual * obs['weight'].values)**2).groupby(obs['obgnme'].values).sum()
+    components = p.phi_components
+    assert sorted(components) == sorted(phi.index)
+    for group, contribution in components.items():
+        assert np.isclose(contribution, phi[group])
+    assert np.isclose(p.phi, phi.sum())
+
+    components, by_obs = p.get_phi_components(by_obs=True)
+    assert np.allclose(by_obs['phi'].values, (residual * obs['weight'].values)**2)
+
+
+def test_zero_order_tikhonov():
+    p = Pst(os.path.join(CC, 'Columbia.pst'))
+    pdata = p.parameter_data
+    pdata.loc[pdata.index[:3], 'partrans'] = ['fixed', 'tied', 'fixed']
+    p.zero_order_tikhonov()
+
+    adjustable = pdata.iloc[3:]
+    islog = (adjustable['partrans'] == 'log').values
+    value = adjustable['parval1'].values.astype(float)
+    lower = adjustable['parlbnd'].values.astype(float)
+    upper = adjustable['parubnd'].values.astype(float)
+    value[islog], lower[islog], upper[islog] = \
+        np.log10(value[islog]), np.log10(lower[islog]), np.log10(upper[islog])
+
+    prior = p.prior
+    assert list(prior.pilbl) == list(adjustable['parnme'])
+    assert (prior.obgnme == 'regul').all()
+    assert np.allclose(prior.rhs, value, rtol=1e-6)
+    assert np.allclose(prior.weight, 1. / (upper - lower))
+    # one equation per parameter, 1.0 * par (or log(par)) = preferred value
+    coef = prior.coef.toarray()
+    columns = pd.Index(prior.par_names).get_indexer(adjustable['parnme'])
+    assert np.array_equal(coef[np.arange(len(columns)), columns], np.ones(len(columns)))
+    assert np.count_nonzero(coef) == len(columns)
+    assert np.array_equal(prior.islog[columns], islog)
+
+
+def test_prior_residuals_and_keep():
+    prior_information = pd.DataFrame({
+        'pilbl': ['pi1', 'pi2', 'pi3'],
+        'equation': ['1.0 * log(k1) = 1.0',
+                     '2.0 * k2 - 1.5 * log(k1) = 3.0',
+                     '1.0 * k3 + 1.0d0 * k2 = 4.0'],
+        'obgnme': ['regul_k', 'regul_k', 'regul_r'],
+        'weight': [1., 2., 3.]})
+    prior = PriorInfo(prior_information, par_names=['k1', 'k2', 'k3'])
+    values = {'K1': 100., 'k2': 2., 'k3': 0.5}
+    res = prior.residuals(values)
+    modelled = np.array([2., 2. * 2. - 1.5 * 2., 0.5 + 2.])
+    assert np.allclose(res['modelled'].values, modelled)
+    assert np.allclose(res['residual'].values, np.array([1., 3., 4.]) - modelled)
+    assert list(res.index) == ['pi1', 'pi2', 'pi3']
+    assert list(res['group']) == ['regul_k', 'regul_k', 'regul_r']
+    # an equation with a parameter that has no value can't be evaluated
+    assert np.isnan(prior.residuals({'k1': 100., 'k2': 2.})['modelled'].values[2])
+
+    assert list(prior.keep(['k1', 'K2'])) == [True, True, False]
+    assert list(prior.keep(['k2', 'k3'])) == [False, False, True]
+    subset = prior.get(['k3', 'k2'])
+    assert list(subset.pilbl) == ['pi3']
+    assert np.allclose(subset.residuals(values)['modelled'].values, [2.5])
+
+
+def test_get_subset(basename):
+    p = Pst(basename + '.pst')
+    obs_names = list(p.observation_data['obsnme'].values[[7, 3, 11]])
+    par_names = list(p.parameter_data['parnme'].values[:4])
+    sub = p.get(par_names, obs_names)
+    assert list(sub.parameter_data['parnme']) == par_names
+    assert list(sub.observation_data['obsnme']) == obs_names
+    # the residuals are read once by the parent and subset, not re-read
+    assert p._pst__res is not None
+    assert list(sub._pst__res['name']) == obs_names
+    assert np.allclose(sub.res['residual'].values,
+                       p.res.set_index('name').loc[obs_names, 'residual'].values)
+    assert np.isclose(sub.phi, sum(((p.res.set_index('name').loc[obs_names, 'residual'] *
+                                     p.observation_data.set_index('obsnme')
+                                     .loc[obs_names, 'weight'])**2)))
+
+    # frames that aren't subset are shared, not copied
+    whole = p.get()
+    assert np.shares_memory(whole.parameter_data['parval1'].values,
+                            p.parameter_data['parval1'].values)
+    assert np.shares_memory(whole.observation_data['weight'].values,
+                            p.observation_data['weight'].values)
+
+
+def test_get_subset_prior_information():
+    p = Pst(os.path.join(CC, 'Columbia.pst'))
+    par_names = list(p.parameter_data['parnme'].values[:50])
+    sub = p.get(par_names)
+    keep = p.prior.keep(par_names)
+    assert sub.nprior == keep.sum() > 0
+    assert list(sub.prior_information['pilbl']) == list(p.prior.pilbl[keep])
+    assert set(sub.prior.par_names) == set(par_names)
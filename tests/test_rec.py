@@ -0,0 +1,71 @@
+import os
+import pandas as pd
+import pytest
+from pestools.rec import Rec, _ITERATION_HEADER
+from pestools.synthetic import SyntheticCase
+
+
+@pytest.fixture
+def rec_text(tmp_path):
+    basename = str(tmp_path / 'case')
+    SyntheticCase(basename, n_par=10, n_obs=500, n_iterations=3).write_rec()
+    with open(basename + '.rec', 'rb') as f:
+        return basename + '.rec', f.read()
+
+
+def write(filename, text, mtime_ns=None):
+    with open(filename, 'wb') as f:
+        f.write(text)
+    if mtime_ns is not None:
+        os.utime(filename, ns=(mtime_ns, mtime_ns))
+
+
+def test_update_shrunk_file(rec_text):
+    # PEST restarted: the file is rewritten with fewer iterations
+    rec_file, text = rec_text
+    rec = Rec(rec_file=rec_file)
+    assert rec.iterations.index.tolist() == [1, 2, 3]
+    second = text.index(_ITERATION_HEADER, text.index(_ITERATION_HEADER) + 1)
+    write(rec_file, text[:second])
+    assert rec.update() == [1]
+    assert rec.iterations.index.tolist() == [1]
+    assert rec.phi_components.index.tolist() == [1]
+
+
+def test_update_rewritten_same_size(rec_text):
+    rec_file, text = rec_text
+    rec = Rec(rec_file=rec_file)
+    mtime_ns = os.stat(rec_file).st_mtime_ns
+    write(rec_file, text.replace(b'"og0"         :      558.74', b'"og0"         :      558.75'),
+          mtime_ns=mtime_ns + 10**9)
+    assert rec.update() == [1, 2, 3]
+    assert rec.phi_components.loc[1, 'og0'] == 558.75
+
+
+def test_update_rewritten_headers_moved(rec_text):
+    # a larger file whose iteration headers aren't at the indexed offsets
+    rec_file, text = rec_text
+    rec = Rec(rec_file=rec_file)
+    write(rec_file, b'\n' * 10 + text)
+    assert rec.update() == [1, 2, 3]
+    assert rec.iterations.loc[1, 'offset'] == text.index(_ITERATION_HEADER) + 10
+
+
+def test_update_appended_file(rec_text):
+    # the file as it is while PEST is writing iteration 2
+    rec_file, text = rec_text
+    full = Rec(rec_file=rec_file)
+    second = text.index(_ITERATION_HEADER, text.index(_ITERATION_HEADER) + 1)
+    middle = second + (len(text) - second) // 3
+    write(rec_file, text[:middle])
+    rec = Rec(rec_file=rec_file)
+    assert rec.iterations.index.tolist() == [1, 2]
+    assert rec.update() == []
+
+    # the incomplete last iteration is parsed again with the new ones
+    write(rec_file, text)
+    assert rec.update() == [2, 3]
+    pd.testing.assert_frame_equal(rec.iterations, full.iterations)
+    pd.testing.assert_frame_equal(rec.phi_components, full.phi_components)
+    pd.testing.assert_frame_equal(rec.lambdas, full.lambdas)
+    pd.testing.assert_frame_equal(rec.parameters, full.parameters)
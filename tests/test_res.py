@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import shapiro
+from pestools.res import Res
+
+
+@pytest.fixture(scope='module')
+def res(basename):
+    return Res(basename + '.res')
+
+
+@pytest.fixture(scope='module')
+def located(basename):
+    """residuals with random coordinates for all but every tenth observation"""
+    names = Res(basename + '.res').df['Name'].values
+    rng = np.random.RandomState(0)
+    info = pd.DataFrame({'Name': names,
+                         'X': rng.uniform(0, 1000, len(names)),
+                         'Y': rng.uniform(0, 500, len(names))})
+    info_file = basename + '_obsinfo.csv'
+    info.iloc[::10, 1:] = np.nan
+    info.to_csv(info_file, index=False)
+    return Res(basename + '.res', obs_info_file=info_file)
+
+
+@pytest.fixture(scope='module')
+def series(basename):
+    """residuals as time series at 8 sites, with a few observations not at a site"""
+    names = Res(basename + '.res').df['Name'].values
+    rng = np.random.RandomState(1)
+    info = pd.DataFrame({'Name': names,
+                         'basename': ['Site{}'.format(i) for i in rng.randint(0, 8, len(names))],
+                         'datetime': pd.Timestamp('2000-01-01') +
+                         pd.to_timedelta(rng.permutation(len(names)) * 3, unit='D')})
+    info.loc[::25, 'basename'] = np.nan
+    info_file = basename + '_timeseries.csv'
+    info.to_csv(info_file, index=False)
+    return Res(basename + '.res', obs_info_file=info_file)
+
+
+def _sites(res, groups=None):
+    df = res.df.join(res.obsinfo[['basename', 'datetime']]).dropna(subset=['basename'])
+    if groups is not None:
+        df = df[df['Group'].isin(groups)]
+    return df.sort_values(['basename', 'datetime'])
+
+
+def _coordinates(res, groups=None):
+    xy = res.obsinfo[['X', 'Y']].reindex(res.df.index).dropna()
+    if groups is not None:
+        xy = xy[res.df.loc[xy.index, 'Group'].isin(groups)]
+    return xy
+
+
+def test_describe_by_group(res):
+    df = res.df
+    stats = res.describe_by_group(exclude_zero=True)
+    df = df[(df['Weight'] > 0) & ~df['Group'].astype(str).str.contains('regul')]
+    assert list(stats.index) == sorted(df['Group'].astype(str).unique())
+    for group, row in stats.iterrows():
+        r = df.loc[df['Group'] == group, 'Residual']
+        assert row['n'] == len(r)
+        assert np.isclose(row['Mean'], r.mean())
+        assert np.isclose(row['Standard deviation'], r.std(ddof=1))
+        assert np.isclose(row['Varience'], r.var(ddof=1))
+        assert np.isclose(row['Range'], r.max() - r.min())
+        assert np.isclose(row['50%'], r.median())
+        assert np.isclose(row['Max (absolute)'], r.abs().max())
+        assert np.isclose(row['MAE'], r.abs().mean())
+        assert np.isclose(row['RMSE'], np.sqrt((r**2).mean()))
+        p = shapiro(r.values)[1]
+        assert np.isclose(row['p-value'], p)
+        assert row['Normally Distributed'] == (p > 0.05)
+
+
+def test_describe_groups(res):
+    groups = list(res.df['Group'].astype(str).unique()[:2])
+    stats = res.describe_groups(groups, ddof=0)
+    df = res.df
+    r = df.loc[df['Group'].isin(groups) & (df['Weight'] > 0), 'Residual']
+    assert stats.loc['n', 'Group summary'] == len(r)
+    assert np.isclose(stats.loc['Standard deviation', 'Group summary'], r.std(ddof=0))
+
+
+def test_within_radius(located):
+    xy = _coordinates(located)
+    d = np.hypot(xy['X'] - 400., xy['Y'] - 200.)
+    expected = d[d <= 150.].sort_values(kind='mergesort')
+    found = located.within_radius(400., 200., 150.)
+    assert list(found.index) == list(expected.index)
+    assert np.allclose(found['Distance'], expected.values)
+    assert np.allclose(found['Residual'], located.df.loc[expected.index, 'Residual'])
+
+
+def test_nearest(located):
+    xy = _coordinates(located, groups=['og1', 'og2'])
+    d = np.hypot(xy['X'] - 400., xy['Y'] - 200.).sort_values()
+    found = located.nearest(400., 200., k=5, groups=['og1', 'og2'])
+    assert list(found.index) == list(d.index[:5])
+    assert np.allclose(found['Distance'], d.values[:5])
+    assert len(located.nearest(400., 200., k=1000, groups='og1')) == \
+        len(_coordinates(located, groups=['og1']))
+
+
+def test_within_bbox(located):
+    xy = _coordinates(located)
+    inside = xy[(xy['X'] >= 100) & (xy['X'] <= 300) & (xy['Y'] >= 50) & (xy['Y'] <= 250)]
+    found = located.within_bbox(100, 50, 300, 250)
+    assert sorted(found.index) == sorted(inside.index)
+
+
+def _pairs(located, col='Residual'):
+    """brute force distances and values of all pairs of located observations"""
+    xy = _coordinates(located)
+    values = located.df.loc[xy.index, col].values
+    i, j = np.triu_indices(len(xy), k=1)
+    d = np.hypot(xy['X'].values[i] - xy['X'].values[j], xy['Y'].values[i] - xy['Y'].values[j])
+    return values, i, j, d
+
+
+def test_semivariogram(located):
+    values, i, j, d = _pairs(located)
+    edges = np.linspace(0, 300, 7)
+    sv = located.semivariogram(bins=edges)
+    assert np.allclose(sv.index, (edges[:-1] + edges[1:]) / 2)
+    for k, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        in_bin = (d >= lo) & (d < hi)
+        assert sv['n_pairs'].iloc[k] == in_bin.sum()
+        assert np.isclose(sv['Distance'].iloc[k], d[in_bin].mean())
+        assert np.isclose(sv['Semivariance'].iloc[k],
+                          0.5 * np.mean((values[i[in_bin]] - values[j[in_bin]])**2))
+
+
+def test_morans_i(located):
+    values, i, j, d = _pairs(located)
+    n = len(values)
+    neighbours = d <= 60.
+    W = np.zeros((n, n))
+    W[i[neighbours], j[neighbours]] = 1.
+    W += W.T
+    z = values - values.mean()
+    S0 = W.sum()
+    I = n / S0 * z.dot(W).dot(z) / z.dot(z)
+    S1 = 0.5 * ((W + W.T)**2).sum()
+    S2 = ((W.sum(axis=0) + W.sum(axis=1))**2).sum()
+    expected = -1. / (n - 1)
+    variance = (n**2 * S1 - n * S2 + 3 * S0**2) / ((n**2 - 1) * S0**2) - expected**2
+
+    result = located.morans_i(distance=60.)
+    assert result['n'] == n
+    assert result['n_pairs'] == neighbours.sum()
+    assert np.isclose(result['I'], I)
+    assert np.isclose(result['Expected I'], expected)
+    assert np.isclose(result['Variance'], variance)
+
+
+def test_timeseries(series):
+    ts = series.timeseries
+    df = _sites(series)
+    assert ts.index.names == ['basename', 'datetime']
+    assert ts.index.is_monotonic_increasing
+    assert list(ts['Name']) == list(df['Name'])
+    assert list(ts.index.get_level_values(0)) == list(df['basename'])
+
+
+def test_timeseries_stats(series):
+    groups = ['og0', 'og1', 'og2', 'og3']
+    stats = series.timeseries_stats(groups=groups)
+    df = _sites(series, groups)
+    assert list(stats.index) == sorted(df['basename'].unique())
+    for site, g in df.groupby('basename'):
+        row = stats.loc[site]
+        r = g['Residual']
+        assert row['n'] == len(g)
+        assert row['Start'] == g['datetime'].min()
+        assert row['End'] == g['datetime'].max()
+        assert np.isclose(row['Bias'], r.mean())
+        assert np.isclose(row['MAE'], r.abs().mean())
+        assert np.isclose(row['RMSE'], np.sqrt((r**2).mean()))
+        m = g['Measured']
+        assert np.isclose(row['NSE'], 1 - (r**2).sum() / ((m - m.mean())**2).sum())
+        assert np.isclose(row['Correlation'], np.corrcoef(m, g['Modelled'])[0, 1])
+
+
+def test_lag_correlation(series):
+    lags = [-3, 0, 2]
+    corr = series.lag_correlation(lags=lags)
+    df = _sites(series)
+    assert list(corr.columns) == lags
+    for site, g in df.groupby('basename'):
+        m, s = g['Measured'].values, g['Modelled'].values
+        for lag in lags:
+            if lag >= 0:
+                expected = np.corrcoef(m[:len(m) - lag], s[lag:])[0, 1]
+            else:
+                expected = np.corrcoef(m[-lag:], s[:len(s) + lag])[0, 1]
+            assert np.isclose(corr.loc[site, lag], expected)
+
+
+def test_resample(series):
+    resampled = series.resample('YS', how='mean', groups='og4')
+    df = _sites(series, ['og4'])
+    for site, g in df.groupby('basename'):
+        expected = g.set_index('datetime')[['Measured', 'Modelled', 'Residual']] \
+            .resample('YS').mean().dropna(how='all')
+        result = resampled.loc[site]
+        assert list(result.index) == list(expected.index)
+        assert np.allclose(result.values, expected.values)
+    assert set(resampled.index.get_level_values(0)) == set(df['basename'])
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from pestools.pst_handler import read_resfile
+from pestools.store import ResStore
+from pestools.synthetic import SyntheticCase
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture(scope='module')
+def case(tmp_path_factory):
+    basename = str(tmp_path_factory.mktemp('store') / 'case')
+    case = SyntheticCase(basename, n_par=10, n_obs=2000, n_iterations=2)
+    for iteration in range(3):
+        case.write_res(iteration)
+    case.write_res()
+    return case
+
+
+def test_phi_by_group(case, tmp_path):
+    store = ResStore(str(tmp_path / 'store'))
+    parts = store.add_case(case.basename, run='a')
+    assert len(parts) == 4
+    phi = store.phi_by_group()
+    assert list(phi.index) == [('a', 0), ('a', 1), ('a', 2), ('a', -1)]
+    for iteration in [0, 1, 2, -1]:
+        expected = case.phi_by_group(case.n_iterations if iteration < 0 else iteration)
+        row = phi.loc[('a', iteration), [g.lower() for g in case.obs_groups]]
+        assert np.allclose(row.values, expected, rtol=1e-5)
+    assert np.allclose(store.phi(iterations=-1).values, phi.loc[[('a', -1)]].sum(axis=1).values)
+
+    # a reopened store reads the same catalog, and unchanged files aren't added again
+    reopened = ResStore(store.path)
+    assert reopened.add(case.basename + '.res', run='a') == parts[-1]
+    assert len(reopened.runs) == 4
+    with pytest.raises(ValueError):
+        reopened.add(case.basename + '.rei.1', run='a', iteration=-1)
+
+
+def test_read_and_observation(case, tmp_path):
+    store = ResStore(str(tmp_path / 'store'))
+    store.add(case.basename + '.rei.1', run='a')
+    store.add(case.basename + '.res', run='b')
+    res = read_resfile(case.basename + '.res')
+    name = res['name'].values[5]
+
+    df = store.read(runs='b', names=[name.upper()], columns=['residual', 'weight'])
+    assert len(df) == 1
+    assert df['residual'].values[0] == res['residual'].values[5]
+
+    group = str(res['group'].values[0])
+    df = store.read(runs='b', groups=group)
+    assert len(df) == (res['group'] == group).sum()
+
+    series = store.observation(name)
+    assert list(series.index) == [('a', 1), ('b', -1)]
+    assert series.loc[('b', -1)] == res['residual'].values[5]
+
+
+def test_missing_file(tmp_path):
+    store = ResStore(str(tmp_path / 'store'))
+    with pytest.raises(IOError, match='not found'):
+        store.add(str(tmp_path / 'missing.rei.1'))